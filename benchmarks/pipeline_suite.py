@@ -0,0 +1,178 @@
+"""
+End-to-end benchmark of the replay data pipeline on synthetic sessions.
+
+Builds synthetic race and qualifying sessions (benchmarks/synthetic_session.py) of several
+sizes and runs the real get_race_telemetry / get_quali_telemetry on them, so the whole pipeline
+can be timed offline and without a FastF1 cache. For each size and session it reports:
+- the wall time of each pipeline stage, taken from the progress events (see src/lib/progress.py):
+  race: drivers (Pool workers), resample (plus track status, weather and lap table),
+  frames (frame assembly and chunk writes), save (cache file); qualifying: drivers, save
+- the total time of the rebuild (--refresh-data)
+- cache load: the same call again, reading the replay cache
+- frame read: reading every frame chunk of the loaded race cache
+- the size of the cache on disk
+
+Caches are written to a temporary directory, not to computed_data.
+
+Usage:
+    python benchmarks/pipeline_suite.py                            # small, medium and full
+    python benchmarks/pipeline_suite.py --sizes full --sessions race --red-flags 1
+    python benchmarks/pipeline_suite.py --hz 8 --json pipeline_suite.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from multiprocessing import cpu_count
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_session import make_session
+from src.f1_data import get_quali_telemetry, get_race_telemetry, get_telemetry_cache_path
+from src.lib import progress
+from src.lib.frame_store import find_chunk_dir
+
+# Race sizes; qualifying uses the same number of drivers
+SIZES = {
+    "small": {"n_drivers": 10, "n_laps": 10},
+    "medium": {"n_drivers": 20, "n_laps": 25},
+    "full": {"n_drivers": 20, "n_laps": 57},
+}
+
+def set_refresh(refresh):
+    # The pipeline rebuilds its caches when --refresh-data is on the command line
+    while "--refresh-data" in sys.argv:
+        sys.argv.remove("--refresh-data")
+    if refresh:
+        sys.argv.append("--refresh-data")
+
+def run_stages(func, *args):
+    """Runs func(*args) and returns (result, {stage: wall seconds}, total wall seconds)."""
+    marks = []
+
+    def on_event(event):
+        if not marks or marks[-1][0] != event["stage"]:
+            marks.append((event["stage"], time.perf_counter()))
+
+    progress.add_sink(on_event)
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+    finally:
+        progress.remove_sink(on_event)
+    end = time.perf_counter()
+
+    stages = {}
+    if marks and marks[0][1] > start:
+        stages["setup"] = marks[0][1] - start
+    for (stage, stage_start), (_, stage_end) in zip(marks, marks[1:] + [(None, end)]):
+        stages[stage] = stages.get(stage, 0.0) + stage_end - stage_start
+    return result, stages, end - start
+
+def cache_size_mb(cache_path):
+    size = os.path.getsize(cache_path) if os.path.exists(cache_path) else 0
+    chunk_dir = find_chunk_dir(cache_path)
+    if chunk_dir and os.path.isdir(chunk_dir):
+        size += sum(entry.stat().st_size for entry in os.scandir(chunk_dir))
+    return size / 1e6
+
+def bench_session(name, size, session_type, hz, red_flags):
+    start = time.perf_counter()
+    session = make_session(session_type, hz=hz, red_flags=red_flags, **size)
+    generate_s = time.perf_counter() - start
+    pipeline = get_race_telemetry if session_type == 'R' else get_quali_telemetry
+
+    set_refresh(True)
+    data, stages, build_s = run_stages(pipeline, session, session_type)
+    set_refresh(False)
+    n_frames = len(data["frames"]) if session_type == 'R' else None
+    data = None
+
+    start = time.perf_counter()
+    data = pipeline(session, session_type)
+    load_s = time.perf_counter() - start
+
+    read_s = None
+    if session_type == 'R':
+        frames = data["frames"]
+        start = time.perf_counter()
+        if hasattr(frames, "iter_chunks"):
+            for _ in frames.iter_chunks():
+                pass
+        else:
+            for _ in frames:
+                pass
+        read_s = time.perf_counter() - start
+
+    def rounded(value):
+        return round(value, 3) if value is not None else None
+
+    return {
+        "size": name,
+        "session": "race" if session_type == 'R' else "quali",
+        "drivers": size["n_drivers"],
+        "laps": size["n_laps"] if session_type == 'R' else None,
+        "frames": n_frames,
+        "generate_s": rounded(generate_s),
+        "stages": {stage: rounded(seconds) for stage, seconds in stages.items()},
+        "build_s": rounded(build_s),
+        "cache_load_s": rounded(load_s),
+        "frame_read_s": rounded(read_s),
+        "cache_mb": round(cache_size_mb(get_telemetry_cache_path(session, session_type)), 1),
+    }
+
+def print_result(result):
+    stages = "  ".join(f"{stage} {seconds:6.2f}s" for stage, seconds in result["stages"].items())
+    frames = f"{result['frames']} frames, " if result["frames"] is not None else ""
+    read = f"  read {result['frame_read_s']:6.2f}s" if result["frame_read_s"] is not None else ""
+    print(f"{result['size']:>6} {result['session']:<5} ({frames}{result['cache_mb']:.1f} MB)")
+    print(f"       {stages}")
+    print(f"       build {result['build_s']:7.2f}s  load {result['cache_load_s']:6.2f}s{read}"
+          f"  (session generated in {result['generate_s']:.2f}s)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--sessions", nargs="+", choices=["race", "quali"], default=["race", "quali"])
+    parser.add_argument("--hz", type=float, default=4.0, help="telemetry sample rate (default: 4)")
+    parser.add_argument("--red-flags", type=int, default=0,
+                        help="red flags of 10 minutes, spread over the race (default: 0)")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    work_dir = tempfile.mkdtemp(prefix="pipeline_suite_")
+    cwd = os.getcwd()
+    argv = list(sys.argv)
+    print(f"{cpu_count()} cores available, telemetry at {args.hz:g} Hz, caches in {work_dir}")
+
+    results = []
+    try:
+        # computed_data/ is relative to the working directory
+        os.chdir(work_dir)
+        for name in args.sizes:
+            size = SIZES[name]
+            # Red flags evenly spaced over the race distance, at about 90 s a lap
+            race_s = size["n_laps"] * 90.0
+            red_flags = [(race_s * (i + 1) / (args.red_flags + 1), 600.0) for i in range(args.red_flags)]
+            for session in args.sessions:
+                result = bench_session(name, size, 'R' if session == "race" else 'Q', args.hz,
+                                       red_flags if session == "race" else [])
+                results.append(result)
+                print_result(result)
+    finally:
+        os.chdir(cwd)
+        sys.argv[:] = argv
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"cores": cpu_count(), "hz": args.hz, "red_flags": args.red_flags,
+                       "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Scaling benchmark for the post-Pool stages of get_race_telemetry.
+
+Times step 3 (resampling every driver onto the replay timeline, thread pool) and step 5
+(frame assembly, chunked across processes) for several worker counts, on synthetic
+telemetry of the size of a real race, and reports the speed-up over one worker.
+
+Usage:
+    python benchmarks/race_pipeline.py                          # 1, 4, 8 and 16 workers
+    python benchmarks/race_pipeline.py --workers 1 2 4 --minutes 30
+    python benchmarks/race_pipeline.py --json race_pipeline.json
+
+Worker counts above the number of cores of the machine are still run, but cannot be faster
+than using every core, so measure scaling on a machine with at least as many cores.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import cpu_count
+
+import numpy as np
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from src.f1_data import DT, RESAMPLED_CHANNELS, assemble_frames, resample_drivers
+
+def make_driver_data(n_drivers, minutes, hz=8.0, seed=0):
+    """Raw per-driver channels (time-sorted, irregularly sampled) as the Pool workers return them"""
+    rng = np.random.default_rng(seed)
+    duration = minutes * 60.0
+    driver_data = {}
+    for d in range(n_drivers):
+        n = int(duration * hz)
+        t = np.sort(rng.uniform(0.0, duration, n))
+        lap_s = 90.0 + d * 0.2
+        angle = t / lap_s * 2 * np.pi
+        data = {"t": t}
+        for channel in RESAMPLED_CHANNELS:
+            data[channel] = rng.random(n) * 100
+        data["x"], data["y"] = 3000 * np.cos(angle), 2000 * np.sin(angle)
+        data["dist"] = t * 60.0
+        data["lap"] = np.floor(t / lap_s) + 1
+        driver_data[f"D{d:02d}"] = data
+    return driver_data, duration
+
+def time_run(driver_data, timeline, workers):
+    start = time.perf_counter()
+    resampled = resample_drivers(driver_data, timeline, 0.0, workers=workers)
+    resample_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frames = assemble_frames(timeline, resampled, None, workers=workers)
+    assemble_s = time.perf_counter() - start
+    return resample_s, assemble_s, len(frames)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--drivers", type=int, default=20)
+    parser.add_argument("--minutes", type=float, default=95.0, help="race duration (default: 95)")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    driver_data, duration = make_driver_data(args.drivers, args.minutes)
+    timeline = np.arange(0.0, duration, DT)
+    print(f"{args.drivers} drivers, {len(timeline)} frames, {cpu_count()} cores available")
+
+    results = []
+    baseline = None
+    for workers in args.workers:
+        resample_s, assemble_s, n_frames = time_run(driver_data, timeline, workers)
+        total = resample_s + assemble_s
+        baseline = baseline or total
+        results.append({
+            "workers": workers,
+            "resample_s": round(resample_s, 3),
+            "assemble_s": round(assemble_s, 3),
+            "total_s": round(total, 3),
+            "speedup": round(baseline / total, 2),
+            "frames": n_frames,
+        })
+        note = "" if workers <= cpu_count() else "  (more workers than cores)"
+        print(f"{workers:>3} workers: resample {resample_s:7.2f}s  assemble {assemble_s:7.2f}s  "
+              f"total {total:7.2f}s  speed-up x{baseline / total:.2f}{note}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"cores": cpu_count(), "drivers": args.drivers, "frames": len(timeline),
+                       "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
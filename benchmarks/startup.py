@@ -0,0 +1,149 @@
+"""
+Startup benchmark for each main.py entry mode.
+
+Runs main.py under `python -X importtime` and reports, per mode:
+- import: total time spent importing modules (sum of the top-level import tree)
+- ready: wall time until the mode is usable (first prompt / window shown / listing printed),
+  taken from the "ready" event on the --progress channel
+
+Each mode has a time-to-ready budget. The script exits with status 1 when a mode goes over
+budget, so startup regressions show up in CI or before a release.
+
+Usage:
+    python benchmarks/startup.py                      # all modes, 3 runs each
+    python benchmarks/startup.py --modes cli gui --runs 5
+    python benchmarks/startup.py --json startup.json --offscreen
+
+The replay mode needs a warm replay cache for the chosen event to be meaningful, and
+replay-rebuild a warm FastF1 cache (it ignores the replay cache and rebuilds it).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+MAIN_PATH = os.path.join(ROOT, 'main.py')
+sys.path.insert(0, ROOT)
+
+from src.lib.progress import ProgressServer
+
+# "event" modes signal readiness over the --progress channel, "exit" modes are ready once they exit
+MODES = {
+    "list-rounds": {"args": ["--year", "2025", "--list-rounds"], "ready": "exit", "budget": 4.0},
+    "cli": {"args": ["--cli"], "ready": "event", "budget": 1.5},
+    "gui": {"args": ["--gui"], "ready": "event", "budget": 3.0},
+    "replay": {"args": ["--year", "2025", "--round", "12"], "ready": "event", "budget": 10.0},
+    # Warm FastF1 cache, replay data rebuilt: race and qualifying session loads + pipeline
+    "replay-rebuild": {"args": ["--year", "2025", "--round", "12", "--refresh-data"], "ready": "event", "budget": 240.0},
+}
+
+HEAVY_MODULES = ("fastf1", "pandas", "arcade", "PySide6", "questionary", "matplotlib")
+
+def parse_importtime(stderr_text):
+    """Returns (total import seconds, {top-level module: cumulative seconds}) from -X importtime output."""
+    top_level = {}
+    for line in stderr_text.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            fields = line[len("import time:"):].split("|")
+            cumulative_us = int(fields[1].strip())
+            name = fields[2]
+        except (ValueError, IndexError):
+            continue
+        # Top-level imports are not indented in the import tree
+        if name.startswith(" ") and not name.startswith("  "):
+            top_level[name.strip()] = cumulative_us / 1_000_000
+    return sum(top_level.values()), top_level
+
+def run_mode(mode, timeout, env):
+    spec = MODES[mode]
+    ready = threading.Event()
+    server = ProgressServer(lambda event: ready.set() if event.get("stage") == "ready" else None)
+    cmd = [sys.executable, "-X", "importtime", MAIN_PATH] + spec["args"] + ["--progress", server.address]
+
+    with tempfile.TemporaryFile(mode="w+") as err_file:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.DEVNULL, stderr=err_file, text=True)
+        ready_s = None
+        try:
+            while time.perf_counter() - start < timeout:
+                if spec["ready"] == "event" and ready.is_set():
+                    ready_s = time.perf_counter() - start
+                    break
+                if proc.poll() is not None:
+                    if spec["ready"] == "exit" and proc.returncode == 0:
+                        ready_s = time.perf_counter() - start
+                    break
+                time.sleep(0.01)
+        finally:
+            if proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+            server.close()
+
+        err_file.seek(0)
+        import_s, top_level = parse_importtime(err_file.read())
+
+    heavy = sorted(name for name in top_level if name.split(".")[0] in HEAVY_MODULES)
+    return {"import_s": import_s, "ready_s": ready_s, "heavy_imports": heavy}
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup-time benchmark for main.py entry modes")
+    # replay-rebuild takes minutes, so it only runs when asked for
+    parser.add_argument("--modes", nargs="+", choices=list(MODES),
+                        default=[mode for mode in MODES if mode != "replay-rebuild"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", dest="json_path", help="write the results to this JSON file")
+    parser.add_argument("--offscreen", action="store_true", help="run Qt with the offscreen platform plugin")
+    parser.add_argument("--no-budget", action="store_true", help="report only, never fail on budgets")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+
+    results = {}
+    over_budget = []
+    print(f"{'mode':<15} {'import (s)':>10} {'ready (s)':>10} {'budget (s)':>10}  heavy imports")
+    for mode in args.modes:
+        timeout = max(args.timeout, MODES[mode]["budget"])
+        runs = [run_mode(mode, timeout, env) for _ in range(args.runs)]
+        ready_times = [r["ready_s"] for r in runs if r["ready_s"] is not None]
+        result = {
+            "import_s": statistics.median(r["import_s"] for r in runs),
+            "ready_s": statistics.median(ready_times) if ready_times else None,
+            "budget_s": MODES[mode]["budget"],
+            "failed_runs": len(runs) - len(ready_times),
+            "heavy_imports": runs[-1]["heavy_imports"],
+        }
+        results[mode] = result
+
+        ready_str = f"{result['ready_s']:.2f}" if result["ready_s"] is not None else "n/a"
+        print(f"{mode:<15} {result['import_s']:>10.2f} {ready_str:>10} {result['budget_s']:>10.1f}  "
+              f"{', '.join(result['heavy_imports']) or '-'}")
+
+        if result["ready_s"] is None or result["ready_s"] > result["budget_s"]:
+            over_budget.append(mode)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if over_budget and not args.no_budget:
+        print(f"Over budget (or never ready): {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
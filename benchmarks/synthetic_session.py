@@ -0,0 +1,446 @@
+"""
+Synthetic FastF1 sessions for offline benchmarks.
+
+make_session() builds a real fastf1.core.Session (with its Laps, SessionResults and car/position
+Telemetry) from generated data instead of the F1 live timing API, so the replay pipeline in
+src/f1_data.py runs on it unchanged: laps.pick_drivers(), lap.get_telemetry(),
+laps.split_qualifying_sessions(), pick_fastest(), track_status, weather_data, session_status,
+race_control_messages and results all behave as on a loaded session. No network access or
+FastF1 cache is needed.
+
+Cars drive a closed 5 km circuit with a speed profile that varies along the lap. Race sessions
+have a standing start, one pit stop per driver (tyre change), per-lap positions and sector times;
+qualifying sessions have Q1/Q2/Q3 with out-laps, flying laps and in-laps and eliminations after
+Q1 and Q2. Red flags stop every car where it is for their duration and are recorded in the track
+status, session status and race control messages.
+
+    from benchmarks.synthetic_session import make_session
+
+    race = make_session(n_drivers=20, n_laps=57, hz=4.0, red_flags=[(1800.0, 600.0)])
+    quali = make_session(session_type='Q', n_drivers=20)
+
+Sessions are marked as fully loaded (see f1_data.ensure_session_loaded), so never call
+session.load() on them.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from fastf1.core import Laps, Session, SessionResults, Telemetry
+from fastf1.events import Event
+from fastf1.plotting._backend import Constants
+
+from src.f1_data import LOAD_PROFILES
+
+# 2025 grid: real driver and team names let fastf1.plotting assign team colours offline
+GRID = [
+    ("1", "VER", "Max Verstappen", "Red Bull Racing"),
+    ("4", "NOR", "Lando Norris", "McLaren"),
+    ("81", "PIA", "Oscar Piastri", "McLaren"),
+    ("16", "LEC", "Charles Leclerc", "Ferrari"),
+    ("44", "HAM", "Lewis Hamilton", "Ferrari"),
+    ("63", "RUS", "George Russell", "Mercedes"),
+    ("12", "ANT", "Andrea Kimi Antonelli", "Mercedes"),
+    ("22", "TSU", "Yuki Tsunoda", "Red Bull Racing"),
+    ("14", "ALO", "Fernando Alonso", "Aston Martin"),
+    ("18", "STR", "Lance Stroll", "Aston Martin"),
+    ("10", "GAS", "Pierre Gasly", "Alpine"),
+    ("43", "COL", "Franco Colapinto", "Alpine"),
+    ("23", "ALB", "Alexander Albon", "Williams"),
+    ("55", "SAI", "Carlos Sainz", "Williams"),
+    ("27", "HUL", "Nico Hulkenberg", "Kick Sauber"),
+    ("5", "BOR", "Gabriel Bortoleto", "Kick Sauber"),
+    ("31", "OCO", "Esteban Ocon", "Haas F1 Team"),
+    ("87", "BEA", "Oliver Bearman", "Haas F1 Team"),
+    ("30", "LAW", "Liam Lawson", "Racing Bulls"),
+    ("6", "HAD", "Isack Hadjar", "Racing Bulls"),
+]
+
+TRACK_LENGTH_M = 5000.0
+# Session time (s) of the race start and of the start of Q1
+START_S = 120.0
+PIT_LOSS_S = 22.0
+# Speed variation along the lap: speed ~ 1 + SPEED_SWING * cos(6 pi phase)
+SPEED_SWING = 0.35
+SECTOR_SPLITS = (0.32, 0.68)
+
+def _event(year):
+    names = ["Practice 1", "Practice 2", "Practice 3", "Qualifying", "Race"]
+    day = pd.Timestamp(f"{year}-07-06")
+    info = {
+        "RoundNumber": 1, "Country": "Synthetic", "Location": "Synthetic Circuit",
+        "OfficialEventName": "Synthetic Grand Prix", "EventName": "Synthetic Grand Prix",
+        "EventDate": day, "EventFormat": "conventional", "F1ApiSupport": True,
+    }
+    for i, name in enumerate(names, 1):
+        date = day - pd.Timedelta(days=max(0, 4 - i) // 2)
+        info[f"Session{i}"] = name
+        info[f"Session{i}Date"] = date + pd.Timedelta(hours=15)
+        info[f"Session{i}DateUtc"] = date + pd.Timedelta(hours=14)
+    return Event(pd.Series(info), year=year)
+
+def _to_session_time(r, red_flags):
+    """Running time (the clock that stops during red flags) -> session time."""
+    s = np.asarray(r, dtype=float).copy()
+    for start, duration in red_flags:
+        s = np.where(s >= start, s + duration, s)
+    return s
+
+def _to_running_time(s, red_flags):
+    r = np.asarray(s, dtype=float).copy()
+    for start, duration in red_flags:
+        r -= np.clip(s - start, 0.0, duration)
+    return r
+
+def _track_xy(u):
+    """Position on the circuit at lap fraction u (a closed, non-convex loop)."""
+    angle = 2 * np.pi * u
+    x = 3000 * np.cos(angle) + 400 * np.cos(3 * angle)
+    y = 1800 * np.sin(angle) + 300 * np.sin(2 * angle)
+    return x, y
+
+def _drive(r, lap_starts, lap_ends):
+    """
+    Car state at running times r for a driver whose laps run over [lap_starts[k], lap_ends[k]).
+    Between laps (before the start, in the garage, after the flag) the car stands at the line.
+    """
+    k = np.searchsorted(lap_starts, r, side="right") - 1
+    on_lap = (k >= 0) & (r < lap_ends[np.maximum(k, 0)])
+    kk = np.maximum(k, 0)
+    duration = lap_ends[kk] - lap_starts[kk]
+    phase = np.where(on_lap, (r - lap_starts[kk]) / duration, 0.0)
+    swing = SPEED_SWING / (6 * np.pi)
+    u = phase + swing * np.sin(6 * np.pi * phase)
+    speed = np.where(on_lap, TRACK_LENGTH_M / duration * 3.6 * (1 + SPEED_SWING * np.cos(6 * np.pi * phase)), 0.0)
+    return u, speed, on_lap
+
+def _telemetry(session, driver_no, lap_starts_r, lap_ends_r, s_end, hz, red_flags, rng):
+    s = np.arange(0.0, s_end, 1.0 / hz)
+
+    def channels(times):
+        # A red flag freezes running time: the car keeps its position with zero speed
+        u, speed, on_lap = _drive(_to_running_time(times, red_flags), lap_starts_r, lap_ends_r)
+        frozen = np.zeros(len(times), dtype=bool)
+        for start, duration in red_flags:
+            frozen |= (times >= start) & (times < start + duration)
+        speed = np.where(frozen, 0.0, speed)
+        return u, speed, on_lap & ~frozen
+
+    t0 = session._t0_date
+    # Car and position data come from separate streams with their own sample times (each stream
+    # samples every car at once, as the live timing feed does)
+    car_s = s + 0.37 / hz
+    u, speed, moving = channels(car_s)
+    decelerating = np.sin(6 * np.pi * u) > 0.6
+    car = pd.DataFrame({
+        "Date": t0 + pd.to_timedelta(car_s, unit="s"),
+        "SessionTime": pd.to_timedelta(car_s, unit="s"),
+        "Time": pd.to_timedelta(car_s, unit="s"),
+        "Speed": np.round(speed + rng.normal(0.0, 0.5, len(s)) * moving, 1).clip(0.0),
+        "RPM": np.where(moving, 9000 + speed * 15, 4000.0),
+        "nGear": np.where(moving, np.clip(speed // 42 + 1, 1, 8), 0).astype(int),
+        "Throttle": np.where(moving & ~decelerating, 100.0, 0.0),
+        "Brake": moving & decelerating,
+        "DRS": np.where(moving & (u % 1.0 > 0.05) & (u % 1.0 < 0.15), 12, 0),
+        "Source": "car",
+    })
+
+    u, _, _ = channels(s)
+    x, y = _track_xy(u)
+    pos = pd.DataFrame({
+        "Date": t0 + pd.to_timedelta(s, unit="s"),
+        "SessionTime": pd.to_timedelta(s, unit="s"),
+        "Time": pd.to_timedelta(s, unit="s"),
+        "X": np.round(x, 0),
+        "Y": np.round(y, 0),
+        "Z": np.zeros(len(s)),
+        "Status": "OnTrack",
+        "Source": "pos",
+    })
+    return Telemetry(car, session=session, driver=driver_no), Telemetry(pos, session=session, driver=driver_no)
+
+def _lap_rows(driver_no, code, team, starts_s, ends_s, lap_numbers, compounds, stints, tyre_life,
+              pit_in, pit_out, timed):
+    rows = []
+    best = np.inf
+    for i in range(len(starts_s)):
+        lap_time = ends_s[i] - starts_s[i]
+        personal_best = bool(timed[i] and lap_time < best)
+        if personal_best:
+            best = lap_time
+        s1 = lap_time * SECTOR_SPLITS[0]
+        s2 = lap_time * (SECTOR_SPLITS[1] - SECTOR_SPLITS[0])
+        rows.append({
+            "Time": pd.Timedelta(seconds=ends_s[i]),
+            "Driver": code,
+            "DriverNumber": driver_no,
+            "Team": team,
+            "LapTime": pd.Timedelta(seconds=lap_time),
+            "LapNumber": float(lap_numbers[i]),
+            "Stint": float(stints[i]),
+            "PitOutTime": pd.Timedelta(seconds=starts_s[i]) if pit_out[i] else pd.NaT,
+            "PitInTime": pd.Timedelta(seconds=ends_s[i]) if pit_in[i] else pd.NaT,
+            "Sector1Time": pd.Timedelta(seconds=s1),
+            "Sector2Time": pd.Timedelta(seconds=s2),
+            "Sector3Time": pd.Timedelta(seconds=lap_time - s1 - s2),
+            "Sector1SessionTime": pd.Timedelta(seconds=starts_s[i] + s1),
+            "Sector2SessionTime": pd.Timedelta(seconds=starts_s[i] + s1 + s2),
+            "Sector3SessionTime": pd.Timedelta(seconds=ends_s[i]),
+            "IsPersonalBest": personal_best,
+            "Compound": compounds[i],
+            "TyreLife": float(tyre_life[i]),
+            "FreshTyre": tyre_life[i] == 1,
+            "LapStartTime": pd.Timedelta(seconds=starts_s[i]),
+            "TrackStatus": "1",
+            "IsAccurate": bool(timed[i]),
+        })
+    return rows
+
+def _race_plan(n_drivers, n_laps, lap_s, retirements, rng):
+    """Per driver: running-time lap boundaries, tyres and pit laps of a race."""
+    plans = []
+    retiring = set(range(n_drivers - retirements, n_drivers))
+    for d in range(n_drivers):
+        pace = lap_s * (1 + 0.003 * d)
+        lap_times = pace + rng.normal(0.0, 0.4, n_laps)
+        lap_times[0] += 6.0  # standing start
+        pit_lap = min(n_laps - 1, max(1, n_laps // 2 + int(rng.integers(-3, 4)))) if n_laps >= 3 else None
+        if pit_lap is not None:
+            lap_times[pit_lap - 1] += PIT_LOSS_S / 2   # in-lap
+            lap_times[pit_lap] += PIT_LOSS_S / 2       # out-lap
+        laps_run = n_laps
+        if d in retiring:
+            laps_run = int(rng.integers(1, max(2, n_laps)))
+        ends = START_S + np.cumsum(lap_times[:laps_run])
+        starts = np.concatenate([[START_S], ends[:-1]])
+        lap_no = np.arange(1, laps_run + 1)
+        after_pit = lap_no > pit_lap if pit_lap is not None else np.zeros(laps_run, dtype=bool)
+        plans.append({
+            "starts": starts,
+            "ends": ends,
+            "lap_numbers": lap_no,
+            "compounds": np.where(after_pit, "HARD", "MEDIUM"),
+            "stints": np.where(after_pit, 2, 1),
+            "tyre_life": np.where(after_pit, lap_no - (pit_lap or 0), lap_no),
+            "pit_in": lap_no == pit_lap,
+            "pit_out": lap_no == (pit_lap or 0) + 1,
+            "timed": np.ones(laps_run, dtype=bool),
+            # A retired car stops at the end of its last lap, short of the flag
+            "retired": d in retiring,
+        })
+    return plans
+
+def _quali_plan(n_drivers, lap_s, rng):
+    """Per driver: running-time laps of Q1/Q2/Q3 (out, flying, cool-down, flying, in) and segment times."""
+    segment_s = 7.0 * lap_s
+    gap_s = 2.0 * lap_s
+    segment_starts = [START_S + i * (segment_s + gap_s) for i in range(3)]
+    advancing = [n_drivers, int(np.ceil(n_drivers * 0.75)), int(np.ceil(n_drivers * 0.5))]
+    pace = lap_s * (1 + 0.002 * np.arange(n_drivers)) + rng.normal(0.0, 0.15, n_drivers)
+    kinds = ("out", "flying", "cool", "flying", "in")
+
+    plans = [{"starts": [], "ends": [], "timed": [], "pit_in": [], "pit_out": []} for _ in range(n_drivers)]
+    best = [[None] * 3 for _ in range(n_drivers)]
+    order = np.arange(n_drivers)
+    for q, segment_start in enumerate(segment_starts):
+        running = order[:advancing[q]]
+        for rank, d in enumerate(running):
+            r = segment_start + 5.0 + rank * 4.0
+            for kind in kinds:
+                duration = pace[d] * (1.0 if kind == "flying" else 1.35) + rng.normal(0.0, 0.1)
+                if kind == "flying":
+                    duration -= 0.15 * q   # track evolution
+                    best[d][q] = min(best[d][q] or np.inf, duration)
+                plan = plans[d]
+                plan["starts"].append(r)
+                plan["ends"].append(r + duration)
+                plan["timed"].append(kind == "flying")
+                plan["pit_out"].append(kind == "out")
+                plan["pit_in"].append(kind == "in")
+                r += duration
+        # The order of this segment decides who goes through to the next
+        ranked = sorted(running, key=lambda d: best[d][q])
+        order = np.array(ranked + [d for d in order if d not in running])
+
+    for plan in plans:
+        n = len(plan["starts"])
+        for key in ("starts", "ends", "timed", "pit_in", "pit_out"):
+            plan[key] = np.asarray(plan[key])
+        plan["lap_numbers"] = np.arange(1, n + 1)
+        plan["compounds"] = np.full(n, "SOFT")
+        plan["stints"] = np.cumsum(plan["pit_out"])
+        plan["tyre_life"] = np.arange(1, n + 1)
+        plan["retired"] = False
+    segments = [(start, start + segment_s) for start in segment_starts]
+    return plans, segments, best, order
+
+def make_session(session_type='R', n_drivers=20, n_laps=57, hz=4.0, lap_s=90.0, red_flags=(),
+                 retirements=0, year=2025, seed=0):
+    """
+    A loaded synthetic race ('R') or qualifying ('Q') session.
+
+    n_drivers   1-20, taken from the 2025 grid in order
+    n_laps      race distance (qualifying runs its own Q1/Q2/Q3 programme)
+    hz          sample rate of the car and position data (real sessions: about 4 Hz)
+    lap_s       lap time of the fastest car, in seconds
+    red_flags   (session time, duration) pairs in seconds; all cars stop for the duration
+    retirements number of drivers (from the back of the grid) that stop before the flag
+    """
+    if session_type not in ('R', 'Q'):
+        raise ValueError("session_type must be 'R' or 'Q'")
+    if str(year) not in Constants:
+        raise ValueError(f"No FastF1 team constants for {year}")
+    if not 1 <= n_drivers <= len(GRID):
+        raise ValueError(f"n_drivers must be between 1 and {len(GRID)}")
+    rng = np.random.default_rng(seed)
+    red_flags = sorted((float(start), float(duration)) for start, duration in red_flags)
+
+    session = Session(_event(year), "Race" if session_type == 'R' else "Qualifying", f1_api_support=True)
+    session._t0_date = pd.Timestamp(session.date) - pd.Timedelta(seconds=START_S)
+    session._session_start_time = pd.Timedelta(0)
+    session._session_info = {"Meeting": {"Name": "Synthetic Grand Prix"}}
+
+    grid = GRID[:n_drivers]
+    if session_type == 'R':
+        plans = _race_plan(n_drivers, n_laps, lap_s, retirements, rng)
+        segments = None
+    else:
+        plans, segments, best, order = _quali_plan(n_drivers, lap_s, rng)
+
+    rows = []
+    session._car_data, session._pos_data = {}, {}
+    for plan in plans:
+        plan["starts_s"] = _to_session_time(plan["starts"], red_flags)
+        plan["ends_s"] = _to_session_time(plan["ends"], red_flags)
+    last_lap_end = max(plan["ends_s"][-1] for plan in plans)
+    session_end = last_lap_end + 60.0
+
+    for d, ((driver_no, code, _, team), plan) in enumerate(zip(grid, plans)):
+        rows += _lap_rows(driver_no, code, team, plan["starts_s"], plan["ends_s"], plan["lap_numbers"],
+                          plan["compounds"], plan["stints"], plan["tyre_life"], plan["pit_in"],
+                          plan["pit_out"], plan["timed"])
+        car, pos = _telemetry(session, driver_no, plan["starts"], plan["ends"], session_end, hz,
+                              red_flags, rng)
+        session._car_data[driver_no], session._pos_data[driver_no] = car, pos
+
+    laps = pd.DataFrame(rows)
+    if session_type == 'R':
+        # Position at the end of each lap: order of crossing the line on that lap
+        laps["Position"] = laps.groupby("LapNumber")["Time"].rank(method="first")
+    else:
+        laps["Position"] = np.nan
+    session._laps = Laps(laps, session=session, _force_default_cols=True)
+
+    results = pd.DataFrame({
+        "DriverNumber": [g[0] for g in grid],
+        "BroadcastName": [g[2].split()[-1].upper() for g in grid],
+        "Abbreviation": [g[1] for g in grid],
+        "DriverId": [g[2].split()[-1].lower() for g in grid],
+        "TeamName": [g[3] for g in grid],
+        "TeamColor": ["" for _ in grid],
+        "FirstName": [" ".join(g[2].split()[:-1]) for g in grid],
+        "LastName": [g[2].split()[-1] for g in grid],
+        "FullName": [g[2] for g in grid],
+    }, index=[g[0] for g in grid])
+    if session_type == 'R':
+        finish = laps.sort_values(["LapNumber", "Time"], ascending=[False, True]).drop_duplicates("DriverNumber")
+        results["Position"] = finish.set_index("DriverNumber").index.get_indexer(results.index) + 1.0
+        results["Status"] = ["Retired" if plan["retired"] else "Finished" for plan in plans]
+    else:
+        results["Position"] = np.argsort(order) + 1.0
+        for q in range(3):
+            results[f"Q{q + 1}"] = [pd.Timedelta(seconds=b[q]) if b[q] is not None else pd.NaT for b in best]
+    session._results = SessionResults(results.sort_values("Position"), _force_default_cols=True)
+    session._total_laps = n_laps if session_type == 'R' else None
+
+    session._track_status, session._session_status, session._race_control_messages = \
+        _status_tables(session, session_type, red_flags, segments, last_lap_end, n_laps)
+    session._session_split_times = ([pd.Timedelta(seconds=start) for start, _ in segments]
+                                    if segments else None)
+    session._weather_data = _weather(session_end, rng)
+
+    _register_driver_colors(session, grid)
+
+    # ensure_session_loaded() treats the session as loaded for every replay profile
+    session._replay_loaded_parts = {part: True for profile in LOAD_PROFILES.values() for part in profile}
+    return session
+
+def _register_driver_colors(session, grid):
+    """
+    fastf1.plotting builds its driver -> team colour mapping from the driver list of the live
+    timing API; register the one of the synthetic grid instead, built the same way from the
+    season's team constants.
+    """
+    from fastf1.plotting import _interface
+    from fastf1.plotting._base import Driver, DriverTeamMapping, Team, _normalize_string
+
+    year = str(session.event["EventDate"].year)
+    teams = {name: Team(normalized_name=name, short_name=constants.short_name, colors=constants.colors.model_copy())
+             for name, constants in Constants[year].teams.items()}
+    for _, code, name, team_name in sorted(grid):
+        team = next(team for normalized, team in teams.items()
+                    if normalized in _normalize_string(team_name).lower())
+        team.name = team_name
+        team.add_driver(Driver(team=team, abbreviation=code, name=name,
+                               normalized_name=_normalize_string(name).lower()))
+    _interface._DRIVER_TEAM_MAPPINGS[session.api_path] = DriverTeamMapping(
+        year=year, teams=[team for team in teams.values() if team.drivers])
+
+def _status_tables(session, session_type, red_flags, segments, last_lap_end, n_laps):
+    track = [(0.0, "1", "AllClear")]
+    status = []
+    messages = []
+
+    def message(t, category, text, flag=None, scope=None, lap=None):
+        messages.append({"Time": session._t0_date + pd.Timedelta(seconds=t), "Category": category,
+                         "Message": text, "Status": None, "Flag": flag, "Scope": scope, "Sector": None,
+                         "RacingNumber": None, "Lap": lap})
+
+    if session_type == 'R':
+        status.append((START_S, "Started"))
+        message(START_S - 60.0, "Other", "GREEN LIGHT - PIT EXIT OPEN", "GREEN", "Track", 1)
+        message(START_S + 180.0, "Drs", "DRS ENABLED", lap=3)
+    else:
+        for start, end in segments:
+            start_s, end_s = _to_session_time([start, end], red_flags)
+            status += [(start_s, "Started"), (end_s, "Finished")]
+            message(start_s, "Flag", "GREEN LIGHT - PIT EXIT OPEN", "GREEN", "Track")
+            message(end_s, "Flag", "CHEQUERED FLAG", "CHEQUERED", "Track")
+
+    for start, duration in red_flags:
+        track += [(start, "5", "Red"), (start + duration, "1", "AllClear")]
+        status += [(start, "Aborted"), (start + duration, "Started")]
+        message(start, "Flag", "RED FLAG", "RED", "Track")
+        message(start + min(60.0, duration / 2), "Other", "RESUMPTION WILL BE AT "
+                f"{(session._t0_date + pd.Timedelta(seconds=start + duration)).strftime('%H:%M')}")
+        message(start + duration, "Other", "GREEN LIGHT - PIT EXIT OPEN", "GREEN", "Track")
+
+    if session_type == 'R':
+        message(last_lap_end - 5.0, "Flag", "CHEQUERED FLAG", "CHEQUERED", "Track", n_laps)
+    status += [(last_lap_end, "Finished"), (last_lap_end + 30.0, "Finalised"), (last_lap_end + 60.0, "Ends")]
+
+    track = pd.DataFrame(sorted(track), columns=["Time", "Status", "Message"])
+    track["Time"] = pd.to_timedelta(track["Time"], unit="s")
+    status = pd.DataFrame(sorted(status, key=lambda row: row[0]), columns=["Time", "Status"])
+    status["Time"] = pd.to_timedelta(status["Time"], unit="s")
+    messages = pd.DataFrame(messages).sort_values("Time", kind="stable").reset_index(drop=True)
+    return track, status, messages
+
+def _weather(session_end, rng):
+    times = np.arange(0.0, session_end + 60.0, 60.0)
+    n = len(times)
+    return pd.DataFrame({
+        "Time": pd.to_timedelta(times, unit="s"),
+        "AirTemp": 22.0 + np.cumsum(rng.normal(0.0, 0.05, n)),
+        "Humidity": np.full(n, 55.0),
+        "Pressure": np.full(n, 1005.0),
+        "Rainfall": np.zeros(n, dtype=bool),
+        "TrackTemp": 38.0 + np.cumsum(rng.normal(0.0, 0.1, n)),
+        "WindDirection": rng.integers(0, 360, n),
+        "WindSpeed": np.abs(2.0 + rng.normal(0.0, 0.5, n)),
+    })
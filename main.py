@@ -1,27 +1,35 @@
-from src.f1_data import get_race_telemetry, enable_cache, get_circuit_rotation, load_session, get_quali_telemetry, list_rounds, list_sprints
-from src.arcade_replay import run_arcade_replay
-
-from src.interfaces.qualifying import run_qualifying_replay
 import sys
-from src.cli.race_selection import cli_load
-from src.gui.race_selection import RaceSelectionWindow
-from PySide6.QtWidgets import QApplication
 
-def main(year=None, round_number=None, playback_speed=1, session_type='R', visible_hud=True, ready_file=None):
-  print(f"Loading F1 {year} Round {round_number} Session '{session_type}'")
-  session = load_session(year, round_number, session_type)
+# Heavy modules (PySide6, arcade, fastf1, pandas, questionary) are imported inside the entry
+# mode that needs them, so --list-rounds doesn't load Qt and --gui doesn't load arcade.
+# benchmarks/startup.py tracks the startup cost of each mode.
 
-  print(f"Loaded session: {session.event['EventName']} - {session.event['RoundNumber']} - {session_type}")
+def main(year=None, round_number=None, playback_speed=1, session_type='R', visible_hud=True, start_lap=None,
+         live_file=None):
+  from src.f1_data import enable_cache, get_session, get_circuit_layout
 
   # Enable cache for fastf1
   enable_cache()
 
+  print(f"Loading F1 {year} Round {round_number} Session '{session_type}'")
+
+  # Resolve the session from the event schedule only. FastF1 data is loaded lazily, with the
+  # load profile of the requested mode, and not at all when the replay cache is warm.
+  session = get_session(year, round_number, session_type)
+
+  print(f"Resolved session: {session.event['EventName']} - {session.event['RoundNumber']} - {session_type}")
+
   if session_type == 'Q' or session_type == 'SQ':
 
+    from src.f1_data import get_quali_telemetry
+    from src.interfaces.qualifying import run_qualifying_replay
+
     # Get the drivers who participated and their lap times
 
     qualifying_session_data = get_quali_telemetry(session, session_type=session_type)
 
+    circuit_layout = get_circuit_layout(session, session_type=session_type)
+
     # Run the arcade screen showing qualifying results
 
     title = f"{session.event['EventName']} - {'Sprint Qualifying' if session_type == 'SQ' else 'Qualifying Results'}"
@@ -30,73 +38,115 @@ def main(year=None, round_number=None, playback_speed=1, session_type='R', visib
       session=session,
       data=qualifying_session_data,
       title=title,
-      ready_file=ready_file,
+      circuit_layout=circuit_layout,
     )
 
-  else:
+  elif live_file:
 
-    # Get the drivers who participated in the race
+    from src.live_feed import LiveFeedIngestor
+    from src.arcade_replay import run_arcade_replay
 
-    race_telemetry = get_race_telemetry(session, session_type=session_type)
+    # Follow a recorded live-timing feed: frames are built from the recording as it grows, and
+    # the session only provides the circuit layout
+    feed = LiveFeedIngestor(live_file)
+    print(f"Reading live timing from {live_file}...")
+    feed.wait_for_frames()
+    feed.start()
 
-    # Get example lap for track layout
-    # Qualifying lap preferred for DRS zones (fallback to fastest race lap (no DRS data))
-    example_lap = None
-    
+    circuit_layout = get_circuit_layout(session, session_type=session_type)
+
+    run_arcade_replay(
+      frames=feed.frames,
+      track_statuses=feed.replay_track_statuses(),
+      circuit_layout=circuit_layout,
+      drivers=list(feed.frames[0]['drivers'].keys()),
+      playback_speed=playback_speed,
+      driver_colors=feed.driver_colors_by_code(),
+      title=f"{session.event['EventName']} - Live",
+      total_laps=feed.total_laps,
+      visible_hud=visible_hud,
+      start_lap=start_lap,
+      live_feed=feed
+    )
+
+  else:
+
+    from src.f1_data import load_replay_data
+    from src.arcade_replay import run_arcade_replay
+
+    # Get the drivers who participated in the race, and the track layout (reference lap, DRS
+    # zones and rotation), cached per circuit and year. Qualifying lap preferred for DRS zones
+    # (fallback to fastest race lap (no DRS data)). The layout and its qualifying session load
+    # in the background while the race telemetry is read or built.
     try:
-        print("Attempting to load qualifying session for track layout...")
-        quali_session = load_session(year, round_number, 'Q')
-        if quali_session is not None and len(quali_session.laps) > 0:
-            fastest_quali = quali_session.laps.pick_fastest()
-            if fastest_quali is not None:
-                quali_telemetry = fastest_quali.get_telemetry()
-                if 'DRS' in quali_telemetry.columns:
-                    example_lap = quali_telemetry
-                    print(f"Using qualifying lap from driver {fastest_quali['Driver']} for DRS Zones")
-    except Exception as e:
-        print(f"Could not load qualifying session: {e}")
-
-    # fallback: Use fastest race lap
-    if example_lap is None:
-        fastest_lap = session.laps.pick_fastest()
-        if fastest_lap is not None:
-            example_lap = fastest_lap.get_telemetry()
-            print("Using fastest race lap (DRS detection may use speed-based fallback)")
-        else:
-            print("Error: No valid laps found in session")
-            return
-
-    drivers = session.drivers
-
-    # Get circuit rotation
-
-    circuit_rotation = get_circuit_rotation(session)
+      race_telemetry, circuit_layout = load_replay_data(session, session_type=session_type)
+    except ValueError as e:
+      print(f"Error: {e}")
+      return
+
+    frames = race_telemetry['frames']
+    drivers = list(frames[0]['drivers'].keys()) if frames else []
 
     # Run the arcade replay
 
     run_arcade_replay(
       frames=race_telemetry['frames'],
       track_statuses=race_telemetry['track_statuses'],
-      example_lap=example_lap,
+      circuit_layout=circuit_layout,
       drivers=drivers,
       playback_speed=playback_speed,
       driver_colors=race_telemetry['driver_colors'],
       title=f"{session.event['EventName']} - {'Sprint' if session_type == 'S' else 'Race'}",
       total_laps=race_telemetry['total_laps'],
-      circuit_rotation=circuit_rotation,
-      visible_hud=visible_hud
-      ,ready_file=ready_file
+      lap_table=race_telemetry.get('lap_table'),
+      race_order=race_telemetry.get('race_order'),
+      sector_timing=race_telemetry.get('sector_timing'),
+      race_control=race_telemetry.get('race_control'),
+      visible_hud=visible_hud,
+      start_lap=start_lap
     )
 
 if __name__ == "__main__":
 
+  from src.lib import progress
+
+  # Optional progress channel (host:port) used when spawned from the GUI/CLI launcher (or a
+  # benchmark). Pipeline stages and the final "ready" event are sent over it.
+  if "--progress" in sys.argv:
+    idx = sys.argv.index("--progress") + 1
+    if idx < len(sys.argv):
+      progress.connect(sys.argv[idx])
+
+  # Stage profiler: JSON report + Chrome trace (and a cProfile dump with --cprofile) written to
+  # computed_data/profiles/ once the replay window is up
+  if "--profile" in sys.argv:
+    from src.lib import profiler
+
+    profiler.enable(cprofile="--cprofile" in sys.argv)
+
+  if "--service" in sys.argv:
+    from src.replay_service import run_service, DEFAULT_ADDRESS
+
+    address = DEFAULT_ADDRESS
+    if "--service-address" in sys.argv:
+      address = sys.argv[sys.argv.index("--service-address") + 1]
+
+    run_service(address)
+    sys.exit(0)
+
   if "--gui" in sys.argv:
+    from PySide6.QtWidgets import QApplication
+    from src.gui.race_selection import RaceSelectionWindow
+
     app = QApplication(sys.argv)
     win = RaceSelectionWindow()
     win.show()
+    progress.report("ready")
     sys.exit(app.exec())
   
   if "--cli" in sys.argv:
+    from src.cli.race_selection import cli_load
+
     cli_load()
     sys.exit(0)
   # Get the year and round number from user input
@@ -114,9 +164,15 @@ if __name__ == "__main__":
     round_number = 12  # Default round number
 
   if "--list-rounds" in sys.argv:
+    from src.f1_data import list_rounds
+
     list_rounds(year)
+    sys.exit(0)
   elif "--list-sprints" in sys.argv:
+    from src.f1_data import list_sprints
+
     list_sprints(year)
+    sys.exit(0)
   else:
     playback_speed = 1
   
@@ -124,14 +180,18 @@ if __name__ == "__main__":
   if "--no-hud" in sys.argv:
     visible_hud = False
 
+  # Open the race replay at the start of this lap (only the frame chunks around it are read first)
+  start_lap = None
+  if "--start-lap" in sys.argv:
+    start_lap = int(sys.argv[sys.argv.index("--start-lap") + 1])
+
+  # Recorded live-timing file (python -m fastf1.livetiming save <file>) to follow as it grows
+  live_file = None
+  if "--live-file" in sys.argv:
+    live_file = sys.argv[sys.argv.index("--live-file") + 1]
+
   # Session type selection
   session_type = 'SQ' if "--sprint-qualifying" in sys.argv else ('S' if "--sprint" in sys.argv else ('Q' if "--qualifying" in sys.argv else 'R'))
 
-  # Optional ready-file path used when spawned from the GUI to signal ready state
-  ready_file = None
-  if "--ready-file" in sys.argv:
-    idx = sys.argv.index("--ready-file") + 1
-    if idx < len(sys.argv):
-      ready_file = sys.argv[idx]
-
-  main(year, round_number, playback_speed, session_type=session_type, visible_hud=visible_hud, ready_file=ready_file)
\ No newline at end of file
+  main(year, round_number, playback_speed, session_type=session_type, visible_hud=visible_hud, start_lap=start_lap,
+       live_file=live_file)
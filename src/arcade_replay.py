@@ -1,27 +1,29 @@
-import os
 import arcade
 from src.interfaces.race_replay import F1RaceReplayWindow
+from src.lib import progress
 
-def run_arcade_replay(frames, track_statuses, example_lap, drivers, title,
-                      playback_speed=1.0, driver_colors=None, circuit_rotation=0.0, total_laps=None,
-                      visible_hud=True, ready_file=None):
+def run_arcade_replay(frames, track_statuses, circuit_layout, drivers, title,
+                      playback_speed=1.0, driver_colors=None, total_laps=None,
+                      lap_table=None, visible_hud=True, start_lap=None, live_feed=None,
+                      race_order=None, sector_timing=None, race_control=None):
+    progress.report("window")
     window = F1RaceReplayWindow(
         frames=frames,
         track_statuses=track_statuses,
-        example_lap=example_lap,
+        circuit_layout=circuit_layout,
         drivers=drivers,
         playback_speed=playback_speed,
         driver_colors=driver_colors,
         title=title,
         total_laps=total_laps,
-        circuit_rotation=circuit_rotation,
+        lap_table=lap_table,
         visible_hud=visible_hud,
+        start_lap=start_lap,
+        live_feed=live_feed,
+        race_order=race_order,
+        sector_timing=sector_timing,
+        race_control=race_control,
     )
-    # Signal readiness to parent process (if requested) after window created
-    if ready_file:
-        try:
-            with open(ready_file, 'w') as f:
-                f.write('ready')
-        except Exception:
-            pass
+    # Signal readiness to the launcher (if connected) after window created
+    progress.report("ready")
     arcade.run()
@@ -1,12 +1,73 @@
 from questionary import Style, select, Choice
 from rich.console import Console
 from rich.markdown import Markdown
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from src.f1_data import get_race_weekends_by_year
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+from src.f1_data import get_race_weekends_by_year, prefetch_event_schedules, prepare_replay_data
+from src.lib import progress as pipeline_progress
+from src import replay_service
+from src.lib.speculative import SpeculativeLoader, DEFAULT_SPECULATIVE_SESSION
+import queue
+import threading
 import sys
 import os
 import subprocess
 
+def _render_progress(events, console, is_running):
+    """Renders pipeline progress events until the "ready" event or until is_running() is False."""
+    with Progress(
+        SpinnerColumn(style="bold red"),
+        TextColumn("[bold]{task.description}"),
+        BarColumn(),
+        console=console,
+        transient=True,
+    ) as progress:
+        task = progress.add_task("Starting replay…", total=None)
+        while is_running():
+            try:
+                event = events.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if event.get("stage") == "ready":
+                break
+            progress.update(
+                task,
+                description=pipeline_progress.describe(event),
+                completed=event.get("current") or 0,
+                total=event.get("total"),
+            )
+
+def _run_with_progress(cmd, console):
+    """Runs the replay process and renders its pipeline progress events until its window is ready."""
+    events = queue.Queue()
+    server = pipeline_progress.ProgressServer(events.put)
+    proc = subprocess.Popen(cmd + ["--progress", server.address])
+    _render_progress(events, console, lambda: proc.poll() is None)
+    server.close()
+    proc.wait()
+
+def _open_in_service(params, console):
+    """Asks the running replay service to open the session; returns False if that failed."""
+    events = queue.Queue()
+    server = pipeline_progress.ProgressServer(events.put)
+    response = {}
+
+    def _request():
+        try:
+            response.update(replay_service.request("open", progress=server.address, **params))
+        except (OSError, ValueError) as e:
+            response.update({"ok": False, "error": str(e)})
+
+    thread = threading.Thread(target=_request, daemon=True)
+    thread.start()
+    # The request returns once the window process is started, the "ready" event follows
+    _render_progress(events, console,
+                     lambda: thread.is_alive() or (response.get("ok") and replay_service.window_alive(response["pid"])))
+    server.close()
+    if not response.get("ok"):
+        console.print(f"[red]Replay service could not open the session: {response.get('error')}")
+        return False
+    return True
+
 def cli_load():
     current_year = 2025
     style = Style([
@@ -20,6 +81,12 @@ def cli_load():
     console.print(Markdown("# F1 Race Replay 🏎️"))
 
     years = [str(year) for year in range(current_year, 2009, -1)]
+
+    # Warm the schedule cache for the most likely years while the user is choosing
+    threading.Thread(target=prefetch_event_schedules, args=([current_year, current_year - 1],), daemon=True).start()
+
+    # Signal readiness (used by benchmarks/startup.py) once the first prompt is about to show
+    pipeline_progress.report("ready")
     year = select("Choose a year", choices=years, qmark="🗓️ ", style=style).ask()
     if not year:
         sys.exit(0)
@@ -39,6 +106,10 @@ def cli_load():
     if not round_number:
         sys.exit(0)
 
+    # Start building the replay cache of the likely session while the remaining questions are asked
+    speculative = SpeculativeLoader(prepare_replay_data)
+    speculative.start(year, round_number, DEFAULT_SPECULATIVE_SESSION)
+
     sessions = ["Qualifying", "Race"]
     for row in data:
         if row['round_number'] == round_number:
@@ -58,13 +129,36 @@ def cli_load():
         hud = True
 
     flag = None
+    session_code = 'R'
     match session:
         case "Qualifying":
             flag = "--qualifying" 
+            session_code = 'Q'
         case "Sprint Qualifying":
-            flag = "--qualifying --sprint"  
+            flag = "--sprint-qualifying"
+            session_code = 'SQ'
         case "Sprint":
             flag = "--sprint"     
+            session_code = 'S'
+    # Let a matching background load finish (it is cancelled when another session was chosen)
+    if speculative.running(year, round_number, session_code):
+        with Progress(
+            SpinnerColumn(style="bold red"),
+            TextColumn(f"[bold]{pipeline_progress.STAGE_LABELS['speculative']}…"),
+            console=console,
+            transient=True,
+        ) as progress:
+            progress.add_task("speculative", total=None)
+            speculative.wait(year, round_number, session_code)
+    else:
+        speculative.cancel()
+
+    # A running replay service (main.py --service) prepares the session and opens the window
+    if replay_service.is_running():
+        params = {"year": year, "round": round_number, "session_type": session_code, "visible_hud": bool(hud)}
+        if _open_in_service(params, console):
+            return
+
     main_path = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'main.py'))
     cmd = [sys.executable, main_path]
     if year is not None:
@@ -75,4 +169,4 @@ def cli_load():
         cmd.append(flag)
     if not hud:
         cmd.append("--no-hud")
-    subprocess.run(cmd)
+    _run_with_progress(cmd, console)
@@ -1,23 +1,40 @@
 import os
 import sys
-import fastf1
-import fastf1.plotting
 from multiprocessing import Pool, cpu_count
 import numpy as np
 import json
 import pickle
-from datetime import timedelta
-import requests
+import shutil
+import threading
+import time
+import weakref
 from src.lib.weather import resample_weather
 from src.lib.weather import build_weather_snapshot
+from src.lib.circuit import build_circuit_layout, load_circuit_layout, save_circuit_layout
 
 
-from src.lib.tyres import get_tyre_compound_int
 from src.lib.time import parse_time_string, format_time
-
-import pandas as pd
+from src.lib import progress, profiler
+from src.lib.frame_store import (
+    FrameChunkWriter, CHUNK_FRAMES, load_replay_cache, new_chunk_dir, remove_stale_chunk_dirs,
+)
+from src.lib.export import EXPORT_CHANNELS
+from src.lib.memory_budget import get_memory_limit_mb, plan_race_pipeline
+from src.lib.cache_io import atomic_pickle_dump
+from src.lib.snapshot import restore_session_snapshot, save_session_snapshot
+from src.lib.laps import build_lap_table
+from src.lib.race_events import build_race_order
+from src.lib.sectors import build_sector_timing
+from src.lib.race_control import build_race_control
+from src.lib.telemetry import extract_lap_channels, resample_channels, format_track_statuses
+from src.lib.shared_telemetry import SharedTelemetryBlock, CHANNELS as SHARED_CHANNELS, allocate_blocks, release_blocks
+
+# fastf1, pandas and requests are imported inside the functions that use them, so that
+# entry modes which never touch FastF1 (menus, cached replays) don't pay for the imports.
 
 def enable_cache():
+    import fastf1
+
     # Check if cache folder exists
     if not os.path.exists('.fastf1-cache'):
         os.makedirs('.fastf1-cache')
@@ -30,7 +47,9 @@ DT = 1 / FPS
 
 def _process_single_driver(args):
     """Process telemetry data for a single driver - must be top-level for multiprocessing"""
-    driver_no, session, driver_code = args
+    # block_spec is (shared memory name, capacity) of this driver's block, or None
+    driver_no, session, driver_code, block_spec = args
+    timer = profiler.WorkerTimer("driver", driver_code)
     
     print(f"Getting telemetry for driver: {driver_code}")
 
@@ -40,111 +59,137 @@ def _process_single_driver(args):
 
     driver_max_lap = laps_driver.LapNumber.max() if not laps_driver.empty else 0
 
-    t_all = []
-    x_all = []
-    y_all = []
-    race_dist_all = []
-    rel_dist_all = []
-    lap_numbers = []
-    tyre_compounds = []
-    speed_all = []
-    gear_all = []
-    drs_all = []
-    throttle_all = []
-    brake_all = []
-
-    total_dist_so_far = 0.0
-
-    # iterate laps in order
-    for _, lap in laps_driver.iterlaps():
-        # get telemetry for THIS lap only
-        lap_tel = lap.get_telemetry()
-        lap_number = lap.LapNumber
-        tyre_compund_as_int = get_tyre_compound_int(lap.Compound)
-
-        if lap_tel.empty:
-            continue
-
-        t_lap = lap_tel["SessionTime"].dt.total_seconds().to_numpy()
-        x_lap = lap_tel["X"].to_numpy()
-        y_lap = lap_tel["Y"].to_numpy()
-        d_lap = lap_tel["Distance"].to_numpy()          
-        rd_lap = lap_tel["RelativeDistance"].to_numpy()
-        speed_kph_lap = lap_tel["Speed"].to_numpy()
-        gear_lap = lap_tel["nGear"].to_numpy()
-        drs_lap = lap_tel["DRS"].to_numpy()
-        throttle_lap = lap_tel["Throttle"].to_numpy()
-        brake_lap = lap_tel["Brake"].to_numpy().astype(float)
-
-        # race distance = distance before this lap + distance within this lap
-        race_d_lap = total_dist_so_far + d_lap
-
-        t_all.append(t_lap)
-        x_all.append(x_lap)
-        y_all.append(y_lap)
-        race_dist_all.append(race_d_lap)
-        rel_dist_all.append(rd_lap)
-        lap_numbers.append(np.full_like(t_lap, lap_number))
-        tyre_compounds.append(np.full_like(t_lap, tyre_compund_as_int))
-        speed_all.append(speed_kph_lap)
-        gear_all.append(gear_lap)
-        drs_all.append(drs_lap)
-        throttle_all.append(throttle_lap)
-        brake_all.append(brake_lap)
-
-    if not t_all:
+    # All laps of the driver on the session clock, sorted by time
+    channels = extract_lap_channels(laps_driver)
+    if channels is None:
         return None
-
-    # Concatenate all arrays at once for better performance
-    all_arrays = [t_all, x_all, y_all, race_dist_all, rel_dist_all, 
-                  lap_numbers, tyre_compounds, speed_all, gear_all, drs_all]
-    
-    t_all, x_all, y_all, race_dist_all, rel_dist_all, lap_numbers, \
-    tyre_compounds, speed_all, gear_all, drs_all = [np.concatenate(arr) for arr in all_arrays]
-
-    # Sort all arrays by time in one operation
-    order = np.argsort(t_all)
-    all_data = [t_all, x_all, y_all, race_dist_all, rel_dist_all, 
-                lap_numbers, tyre_compounds, speed_all, gear_all, drs_all]
-    
-    t_all, x_all, y_all, race_dist_all, rel_dist_all, lap_numbers, \
-    tyre_compounds, speed_all, gear_all, drs_all = [arr[order] for arr in all_data]
-
-    throttle_all = np.concatenate(throttle_all)[order]
-    brake_all = np.concatenate(brake_all)[order]
+    n_samples = len(channels["t"])
 
     print(f"Completed telemetry for driver: {driver_code}")
-    
-    return {
+
+    result = {
         "code": driver_code,
-        "data": {
-            "t": t_all,
-            "x": x_all,
-            "y": y_all,
-            "dist": race_dist_all,
-            "rel_dist": rel_dist_all,                   
-            "lap": lap_numbers,
-            "tyre": tyre_compounds,
-            "speed": speed_all,
-            "gear": gear_all,
-            "drs": drs_all,
-            "throttle": throttle_all,
-            "brake": brake_all,
-        },
-        "t_min": t_all.min(),
-        "t_max": t_all.max(),
+        "t_min": channels["t"][0],
+        "t_max": channels["t"][-1],
         "max_lap": driver_max_lap
     }
 
-def load_session(year, round_number, session_type='R'):
-    # session_type: 'R' (Race), 'S' (Sprint) etc.
-    session = fastf1.get_session(year, round_number, session_type)
-    session.load(telemetry=True, weather=True)
+    # Write straight into the parent's shared memory block and only return the sample count
+    if block_spec is not None and n_samples <= block_spec[1]:
+        block = SharedTelemetryBlock(block_spec[1], name=block_spec[0])
+        try:
+            for i, channel in enumerate(SHARED_CHANNELS):
+                block.matrix[i, :n_samples] = channels[channel]
+        finally:
+            block.close()
+        result["shared_samples"] = n_samples
+        result["profile"] = timer.stop()
+        return result
+
+    result["data"] = channels
+    result["profile"] = timer.stop()
+    return result
+
+# Parts of a FastF1 session (the keyword arguments of session.load) each replay mode needs
+LOAD_PROFILES = {
+    "race": {"laps": True, "telemetry": True, "weather": True, "messages": True},
+    "quali": {"laps": True, "telemetry": True, "weather": True, "messages": True},
+    "layout": {"laps": True, "telemetry": True, "weather": False, "messages": False},
+}
+
+def get_session(year, round_number, session_type='R'):
+    """
+    Returns the FastF1 session for an event without loading any of its data.
+    The event is resolved via the event schedule, which is enough to build cache keys.
+    """
+    import fastf1
+
+    return fastf1.get_session(year, round_number, session_type)
+
+# One lock per session object: the layout thread of load_replay_data may need a session that
+# the main thread is loading at the same time
+_session_load_locks = weakref.WeakKeyDictionary()
+_session_load_locks_guard = threading.Lock()
+
+def _session_load_lock(session):
+    with _session_load_locks_guard:
+        lock = _session_load_locks.get(session)
+        if lock is None:
+            lock = _session_load_locks[session] = threading.Lock()
+        return lock
+
+def _profile_loaded(session, profile):
+    loaded = getattr(session, "_replay_loaded_parts", {})
+    return all(loaded.get(part) for part, needed in LOAD_PROFILES[profile].items() if needed)
+
+def ensure_session_loaded(session, profile):
+    """Loads the parts of the session that the given load profile needs and that aren't loaded yet."""
+    if _profile_loaded(session, profile):
+        return session
+
+    with _session_load_lock(session):
+        # Another thread may have loaded it while we waited
+        if _profile_loaded(session, profile):
+            return session
+        return _load_session_parts(session, profile)
+
+def _load_session_parts(session, profile):
+    wanted = LOAD_PROFILES[profile]
+    loaded = getattr(session, "_replay_loaded_parts", {})
+    parts = {part: bool(needed or loaded.get(part)) for part, needed in wanted.items()}
+
+    progress.report("load_session", message=str(session))
+
+    # A parsed-session snapshot skips FastF1's parsing and merging entirely
+    if "--refresh-data" not in sys.argv:
+        restored = restore_session_snapshot(session, parts)
+        if restored is not None:
+            print(f"Restored parsed session snapshot for {session}")
+            session._replay_loaded_parts = restored
+            return session
+
+    print(f"Loading FastF1 session data for {session} ({', '.join(p for p, on in parts.items() if on)})")
+    session.load(**parts)
+    session._replay_loaded_parts = parts
+
+    # FastF1 fails softly (e.g. offline), never snapshot a session with missing data
+    if _session_data_complete(session, parts):
+        try:
+            save_session_snapshot(session, parts)
+        except OSError as e:
+            print(f"Could not write session snapshot: {e}")
+    else:
+        print(f"Not writing a session snapshot for {session}: data is incomplete")
     return session
 
-# The following functions require a loaded session object
+def _session_data_complete(session, parts):
+    try:
+        if parts["laps"] and session.laps.empty:
+            return False
+        if parts["telemetry"] and not session.car_data:
+            return False
+    except Exception:
+        return False
+    return True
+
+def load_session(year, round_number, session_type='R', profile=None):
+    # session_type: 'R' (Race), 'S' (Sprint) etc.
+    if profile is None:
+        profile = 'quali' if session_type in ('Q', 'SQ') else 'race'
+    session = get_session(year, round_number, session_type)
+    return ensure_session_loaded(session, profile)
+
+def get_telemetry_cache_path(session, session_type='R'):
+    """Path of the computed replay data for a session. Works on sessions that haven't been loaded."""
+    event_name = str(session).replace(' ', '_')
+    cache_suffix = {'S': 'sprint', 'Q': 'quali', 'SQ': 'sprintquali'}.get(session_type, 'race')
+    return f"computed_data/{event_name}_{cache_suffix}_telemetry.pkl"
+
+# The following functions require a loaded session object (see ensure_session_loaded)
 
 def get_driver_colors(session):
+    import fastf1.plotting
+
     color_mapping = fastf1.plotting.get_driver_color_mapping(session)
     
     # Convert hex colors to RGB tuples
@@ -156,6 +201,8 @@ def get_driver_colors(session):
     return rgb_colors
 
 def download_driver_headshots_img(session,drivers):
+    import requests
+
     img_dir  = "images/drivers"
     os.makedirs(img_dir, exist_ok=True)
     i = 0
@@ -179,155 +226,133 @@ def get_circuit_rotation(session):
     circuit = session.get_circuit_info()
     return circuit.rotation
 
-def get_race_telemetry(session, session_type='R'):
-
-    event_name = str(session).replace(' ', '_')
-    cache_suffix = 'sprint' if session_type == 'S' else 'race'
-
-    # Check if this data has already been computed
+# Layouts built from the race's own fastest lap (no qualifying session available, so no DRS
+# data) are cached too, but the qualifying reference is retried once they are this old
+FALLBACK_LAYOUT_RETRY_S = 6 * 60 * 60
+
+def _get_reference_lap(session, session_type='R'):
+    """
+    Pick the lap used to draw the track layout. Returns (lap telemetry, session it came from,
+    source), source being "qualifying" or "race" for the fallback to the race's own fastest lap.
+    Qualifying laps are preferred for DRS zones, races fall back to their own fastest lap (no DRS data).
+    """
+    if session_type in ('Q', 'SQ'):
+        ensure_session_loaded(session, "layout")
+        fastest_lap = session.laps.pick_fastest()
+        if fastest_lap is None:
+            raise ValueError("No valid laps found in session")
+        return fastest_lap.get_telemetry(), session, "qualifying"
 
     try:
-        if "--refresh-data" not in sys.argv:
-            with open(f"computed_data/{event_name}_{cache_suffix}_telemetry.pkl", "rb") as f:
-                frames = pickle.load(f)
-                print(f"Loaded precomputed {cache_suffix} telemetry data.")
-                print("The replay should begin in a new window shortly!")
-                return frames
-    except FileNotFoundError:
-        pass  # Need to compute from scratch
-
-
-    drivers = session.drivers
-
-    driver_codes = {}
-    driver_names = {}
-    driver_teams = {}
-    for num in drivers:
-        driver = session.get_driver(num)
-        abbrev = driver["Abbreviation"]
-
-        driver_codes[num] = abbrev
-        driver_names[abbrev] = driver["FullName"]
-        driver_teams[abbrev] = driver["TeamName"]
-
-    driver_data = {}
-
-    global_t_min = None
-    global_t_max = None
-    
-    max_lap_number = 0
-
-    # 1. Get all of the drivers telemetry data using multiprocessing
-    # Prepare arguments for parallel processing
-    print(f"Processing {len(drivers)} drivers in parallel...")
-    driver_args = [(driver_no, session, driver_codes[driver_no]) for driver_no in drivers]
-    
-    num_processes = min(cpu_count(), len(drivers))
-    
-    with Pool(processes=num_processes) as pool:
-        results = pool.map(_process_single_driver, driver_args)
-    
-    # Process results
-    for result in results:
-        if result is None:
-            continue
-        
-        code = result["code"]
-        driver_data[code] = result["data"]
-        
-        t_min = result["t_min"]
-        t_max = result["t_max"]
-        max_lap_number = max(max_lap_number, result["max_lap"])
-        
-        global_t_min = t_min if global_t_min is None else min(global_t_min, t_min)
-        global_t_max = t_max if global_t_max is None else max(global_t_max, t_max)
-
-    # Ensure we have valid time bounds
-    if global_t_min is None or global_t_max is None:
-        raise ValueError("No valid telemetry data found for any driver")
-
-    # 2. Create a timeline (start from zero)
-    timeline = np.arange(global_t_min, global_t_max, DT) - global_t_min
+        print("Attempting to load qualifying session for track layout...")
+        quali_session = load_session(session.event.year, session.event['RoundNumber'], 'Q', profile="layout")
+        if quali_session is not None and len(quali_session.laps) > 0:
+            fastest_quali = quali_session.laps.pick_fastest()
+            if fastest_quali is not None:
+                quali_telemetry = fastest_quali.get_telemetry()
+                if 'DRS' in quali_telemetry.columns:
+                    print(f"Using qualifying lap from driver {fastest_quali['Driver']} for DRS Zones")
+                    return quali_telemetry, quali_session, "qualifying"
+    except Exception as e:
+        print(f"Could not load qualifying session: {e}")
+
+    # fallback: Use fastest race lap
+    ensure_session_loaded(session, "layout")
+    fastest_lap = session.laps.pick_fastest()
+    if fastest_lap is None:
+        raise ValueError("No valid laps found in session")
+    print("Using fastest race lap (DRS detection may use speed-based fallback)")
+    return fastest_lap.get_telemetry(), session, "race"
+
+def _layout_is_stale(layout):
+    """True for a cached fallback layout (no qualifying reference) that is due for a retry."""
+    # Layouts cached before "source" existed: only those without DRS zones can be fallbacks
+    source = layout.get("source", "qualifying" if layout.get("drs_zones") else "race")
+    if source == "qualifying":
+        return False
+    return time.time() - layout.get("built_at", 0.0) >= FALLBACK_LAYOUT_RETRY_S
+
+def get_circuit_layout(session, session_type='R'):
+    """
+    Returns the track layout (reference polyline, track edges, DRS zones and rotation) for the
+    session's circuit. Layouts are cached per circuit and year in computed_data/circuits, so warm
+    launches skip loading the reference session and its telemetry.
+    """
+    year = session.event.year
+    circuit = session.event['Location']
+
+    if "--refresh-data" not in sys.argv:
+        layout = load_circuit_layout(year, circuit)
+        if layout is not None and not _layout_is_stale(layout):
+            print(f"Loaded cached circuit layout for {circuit} {year}.")
+            return layout
+
+    progress.report("layout", message=f"{circuit} {year}")
+    example_lap, reference_session, source = _get_reference_lap(session, session_type)
+    layout = build_circuit_layout(example_lap, rotation=get_circuit_rotation(reference_session))
+    # A fallback layout is rebuilt from qualifying once that can be loaded (see _layout_is_stale)
+    layout["source"] = source
+    layout["built_at"] = time.time()
+    save_circuit_layout(year, circuit, layout)
+    return layout
+
+# Channels resampled onto the replay timeline for every driver
+RESAMPLED_CHANNELS = ("x", "y", "dist", "rel_dist", "lap", "tyre", "speed", "gear", "drs", "throttle", "brake")
+
+# Frame assembly is serial unless this environment variable sets a number of worker processes.
+# The process pool stays opt-in until benchmarks/race_pipeline.py has been run on a machine
+# with 16+ cores: its only measured parallel run (4 workers on 1 core) was x0.65.
+FRAME_WORKERS_ENV = "F1_FRAME_WORKERS"
+
+def get_frame_workers():
+    """Worker processes for frame assembly, from F1_FRAME_WORKERS (default 1: serial)."""
+    value = os.environ.get(FRAME_WORKERS_ENV)
+    if not value:
+        return 1
+    try:
+        return max(1, int(value))
+    except ValueError:
+        print(f"Ignoring invalid {FRAME_WORKERS_ENV}: {value}")
+        return 1
+
+def _resample_driver(data, session_timeline, timeline, dtype=None):
+    """Resamples one driver's (time-sorted) channels onto the timeline"""
+    resampled = {"t": timeline}
+    resampled.update(resample_channels(data, session_timeline, RESAMPLED_CHANNELS, dtype=dtype))
+    return resampled
+
+def resample_drivers(driver_data, timeline, global_t_min, workers=None, dtype=None):
+    """
+    Resamples every driver onto the common timeline. np.interp releases the GIL, so drivers
+    are resampled on a thread pool: no process start-up and no copies of the inputs.
+    dtype (e.g. np.float32 in memory budget mode) is the dtype the resampled channels are kept in.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Same timeline in session time, so the worker channels are used as-is
+    session_timeline = timeline + global_t_min
+    workers = workers or min(cpu_count(), max(1, len(driver_data)))
 
-    # 3. Resample each driver's telemetry (x, y, gap) onto the common timeline
     resampled_data = {}
-
-    for code, data in driver_data.items():
-        t = data["t"] - global_t_min  # Shift
-
-        # ensure sorted by time
-        order = np.argsort(t)
-        t_sorted = t[order]
-        
-        # Vectorize all resampling in one operation for speed
-        arrays_to_resample = [
-            data["x"][order],
-            data["y"][order],
-            data["dist"][order],
-            data["rel_dist"][order],
-            data["lap"][order],
-            data["tyre"][order],
-            data["speed"][order],
-            data["gear"][order],
-            data["drs"][order],
-            data["throttle"][order],
-            data["brake"][order],
-        ]
-        
-        resampled = [np.interp(timeline, t_sorted, arr) for arr in arrays_to_resample]
-        x_resampled, y_resampled, dist_resampled, rel_dist_resampled, lap_resampled, \
-        tyre_resampled, speed_resampled, gear_resampled, drs_resampled, throttle_resampled, brake_resampled = resampled
- 
-        resampled_data[code] = {
-            "t": timeline,
-            "x": x_resampled,
-            "y": y_resampled,
-            "dist": dist_resampled,   # race distance (metres since Lap 1 start)
-            "rel_dist": rel_dist_resampled,
-            "lap": lap_resampled,
-            "tyre": tyre_resampled,
-            "speed": speed_resampled,
-            "gear": gear_resampled,
-            "drs": drs_resampled,
-            "throttle": throttle_resampled,
-            "brake": brake_resampled
+    progress.report("resample", 0, len(driver_data))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            code: executor.submit(_resample_driver, data, session_timeline, timeline, dtype)
+            for code, data in driver_data.items()
         }
-
-    # 4. Incorporate track status data into the timeline (for safety car, VSC, etc.)
-
-    track_status = session.track_status
-
-    formatted_track_statuses = []
-
-    for status in track_status.to_dict('records'):
-        seconds = timedelta.total_seconds(status['Time'])
-
-        start_time = seconds - global_t_min # Shift to match timeline
-        end_time = None
-
-        # Set the end time of the previous status
-
-        if formatted_track_statuses:
-            formatted_track_statuses[-1]['end_time'] = start_time
-
-        formatted_track_statuses.append({
-            'status': status['Status'],
-            'start_time': start_time,
-            'end_time': end_time, 
-        })
-
-    # 4.1. Resample weather data onto the same timeline for playback
-    weather_resampled = resample_weather(session, timeline, global_t_min)
-
-    # 5. Build the frames + LIVE LEADERBOARD
+        for code, future in futures.items():
+            resampled_data[code] = future.result()
+            progress.report("resample", len(resampled_data), len(driver_data), message=code)
+    return resampled_data
+
+def _assemble_frames(args):
+    """Builds the frames of one chunk of the timeline - must be top-level for multiprocessing"""
+    # All inputs are already sliced to the chunk
+    timeline, driver_arrays, weather_resampled = args
+    driver_codes = list(driver_arrays.keys())
     frames = []
-    num_frames = len(timeline)
-    
-    # Pre-extract data references for faster access
-    driver_codes = list(resampled_data.keys())
-    driver_arrays = {code: resampled_data[code] for code in driver_codes}
 
-    for i in range(num_frames):
+    for i in range(len(timeline)):
         t = timeline[i]
         snapshot = []
         for code in driver_codes:
@@ -394,22 +419,285 @@ def get_race_telemetry(session, session_type='R'):
             frame_payload["weather"] = weather_snapshot
 
         frames.append(frame_payload)
+    return frames
+
+def _frame_columns(timeline, driver_arrays):
+    """
+    The values _assemble_frames puts in the frames of a chunk, as arrays: "t" and "leader_lap"
+    of shape (frames,), and one (frames, drivers) array per EXPORT_CHANNELS channel, with the
+    drivers in driver_arrays order.
+    """
+    codes = list(driver_arrays.keys())
+    n = len(timeline)
+
+    def stack(channel):
+        return np.column_stack([np.asarray(driver_arrays[code][channel], dtype=np.float64) for code in codes])
+
+    values = {channel: stack(channel) for channel in EXPORT_CHANNELS if channel != "position"}
+    values["lap"] = np.round(values["lap"])
+    values["rel_dist"] = np.round(values["rel_dist"], 4)
+    # Same order as the frames' sort by (lap, dist), descending: a stable sort of the negated
+    # keys keeps cars level on both in driver order
+    order = np.lexsort((-values["dist"], -values["lap"]), axis=1)
+    positions = np.empty((n, len(codes)), dtype=np.int16)
+    np.put_along_axis(positions, order, np.arange(1, len(codes) + 1, dtype=np.int16)[None, :], axis=1)
+    values["position"] = positions
+
+    columns = {
+        "t": np.round(np.asarray(timeline, dtype=np.float64), 3),
+        "leader_lap": values["lap"][np.arange(n), order[:, 0]].astype(np.int16),
+    }
+    for channel, dtype in EXPORT_CHANNELS.items():
+        columns[channel] = values[channel].astype(dtype)
+    return columns
+
+def _assemble_frames_timed(args):
+    """_assemble_frames in a Pool worker, with a profiler span of the chunk"""
+    chunk_args, label = args
+    timer = profiler.WorkerTimer("frames", label)
+    frames = _assemble_frames(chunk_args)
+    return frames, timer.stop()
+
+def _frame_chunks(timeline, resampled_data, weather_resampled, chunk_frames):
+    """Splits the frame inputs into contiguous slices of chunk_frames frames of the timeline"""
+    for start in range(0, len(timeline), chunk_frames):
+        stop = min(start + chunk_frames, len(timeline))
+        driver_arrays = {
+            code: {channel: values[start:stop] for channel, values in arrays.items()}
+            for code, arrays in resampled_data.items()
+        }
+        weather = None
+        if weather_resampled:
+            weather = {k: (v[start:stop] if v is not None else None) for k, v in weather_resampled.items()}
+        yield timeline[start:stop], driver_arrays, weather, stop
+
+def assemble_frames(timeline, resampled_data, weather_resampled, workers=None, chunk_dir=None,
+                    keep_resident=True):
+    """
+    Builds the per-frame dicts. The timeline is cut into fixed-size chunks (CHUNK_FRAMES) that
+    are assembled independently, in a process pool of `workers` processes (default:
+    get_frame_workers()). Chunks come back in order, so the result is identical to a single pass.
+    With chunk_dir, each chunk is written to disk as soon as it is built and a ChunkedFrames
+    over the chunk files is returned instead of a list; keep_resident=False drops the chunks
+    from memory once written (memory budget mode). The chunk directory also gets the column
+    files of the frames (see frame_store), built from the resampled arrays.
+    """
+    num_frames = len(timeline)
+    if workers is None:
+        workers = get_frame_workers()
+    chunks = list(_frame_chunks(timeline, resampled_data, weather_resampled, CHUNK_FRAMES))
+
+    frames = []
+    writer = None
+    if chunk_dir:
+        writer = FrameChunkWriter(chunk_dir, keep_resident=keep_resident, n_frames=num_frames,
+                                  drivers=list(resampled_data.keys()) if resampled_data else None)
+
+    def collect(chunk_frames, chunk):
+        if writer:
+            writer.add_chunk(chunk_frames, _frame_columns(chunk[0], chunk[1]) if writer.drivers else None)
+        else:
+            frames.extend(chunk_frames)
+
+    progress.report("frames", 0, num_frames)
+    try:
+        if workers <= 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                collect(_assemble_frames(chunk[:3]), chunk)
+                progress.report("frames", chunk[3], num_frames)
+        else:
+            with Pool(processes=min(workers, len(chunks))) as pool:
+                chunk_args = [(chunk[:3], f"{chunk[3] - len(chunk[0])}-{chunk[3]}") for chunk in chunks]
+                for (chunk_frames, span), chunk in zip(pool.imap(_assemble_frames_timed, chunk_args), chunks):
+                    profiler.record_worker(span)
+                    collect(chunk_frames, chunk)
+                    progress.report("frames", chunk[3], num_frames)
+    except BaseException:
+        if writer:
+            writer.abort()
+        raise
+    return writer.finish() if writer else frames
+
+def get_race_telemetry(session, session_type='R', before_pool=None):
+    # before_pool: called right before the worker Pool is forked (load_replay_data uses it to
+    # let its background thread finish, since forking while another thread runs isn't safe)
+
+    cache_path = get_telemetry_cache_path(session, session_type)
+    cache_suffix = 'sprint' if session_type == 'S' else 'race'
+
+    # Check if this data has already been computed
+
+    try:
+        if "--refresh-data" not in sys.argv:
+            frames = load_replay_cache(cache_path)
+            print(f"Loaded precomputed {cache_suffix} telemetry data.")
+            print("The replay should begin in a new window shortly!")
+            return frames
+    except FileNotFoundError:
+        pass  # Need to compute from scratch
+
+    # Only now pay for the FastF1 load
+    ensure_session_loaded(session, "race")
+
+    drivers = session.drivers
+
+    driver_codes = {}
+    driver_names = {}
+    driver_teams = {}
+    for num in drivers:
+        driver = session.get_driver(num)
+        abbrev = driver["Abbreviation"]
+
+        driver_codes[num] = abbrev
+        driver_names[abbrev] = driver["FullName"]
+        driver_teams[abbrev] = driver["TeamName"]
+
+    driver_data = {}
+
+    global_t_min = None
+    global_t_max = None
+    
+    max_lap_number = 0
+
+    # 1. Get all of the drivers telemetry data using multiprocessing
+    # Prepare arguments for parallel processing
+    print(f"Processing {len(drivers)} drivers in parallel...")
+    # Workers write their telemetry into shared memory blocks owned by this process. Everything
+    # from the allocation on runs under the try, so no error (including one re-raised from
+    # before_pool) leaves segments behind in /dev/shm
+    blocks = None
+    try:
+        blocks = allocate_blocks(session, drivers)
+        driver_args = [
+            (driver_no, session, driver_codes[driver_no],
+             (blocks[driver_no].name, blocks[driver_no].capacity) if blocks else None)
+            for driver_no in drivers
+        ]
+
+        num_processes = min(cpu_count(), len(drivers))
+        if before_pool is not None:
+            before_pool()
+
+        # Memory budget mode: fewer workers, compact dtypes and/or spilled frames
+        memory_plan = None
+        memory_limit_mb = get_memory_limit_mb()
+        if memory_limit_mb:
+            memory_plan = plan_race_pipeline(session, drivers, num_processes, memory_limit_mb, FPS)
+            num_processes = memory_plan["workers"]
+
+        results = []
+        progress.report("drivers", 0, len(driver_args))
+        with Pool(processes=num_processes) as pool:
+            # imap keeps the driver order of map() but lets us report each finished driver
+            for result in pool.imap(_process_single_driver, driver_args):
+                results.append(result)
+                progress.report("drivers", len(results), len(driver_args))
+
+        # Process results
+        shared_bytes = 0
+        for driver_no, result in zip(drivers, results):
+            if result is None:
+                continue
+
+            code = result["code"]
+            profiler.record_worker(result.get("profile"))
+            if "shared_samples" in result:
+                n_samples = result["shared_samples"]
+                driver_data[code] = blocks[driver_no].channels(n_samples)
+                shared_bytes += n_samples * len(SHARED_CHANNELS) * 8
+            else:
+                driver_data[code] = result["data"]
+
+            t_min = result["t_min"]
+            t_max = result["t_max"]
+            max_lap_number = max(max_lap_number, result["max_lap"])
+
+            global_t_min = t_min if global_t_min is None else min(global_t_min, t_min)
+            global_t_max = t_max if global_t_max is None else max(global_t_max, t_max)
+
+        if shared_bytes:
+            # Bytes that used to be pickled, piped and unpickled (and copied again by step 3)
+            print(f"Shared memory: {shared_bytes / 1e6:.1f} MB of driver telemetry returned without pickling")
+
+        # Ensure we have valid time bounds
+        if global_t_min is None or global_t_max is None:
+            raise ValueError("No valid telemetry data found for any driver")
+
+        # 2. Create a timeline (start from zero)
+        timeline = np.arange(global_t_min, global_t_max, DT) - global_t_min
+
+        # 3. Resample each driver's telemetry (x, y, gap) onto the common timeline
+        resampled_data = resample_drivers(
+            driver_data, timeline, global_t_min,
+            dtype=np.float32 if memory_plan and memory_plan["compact"] else None,
+        )
+    finally:
+        # Drop the views on the blocks before unmapping them
+        driver_data = None
+        release_blocks(blocks)
+
+    # 4. Incorporate track status data into the timeline (for safety car, VSC, etc.)
+
+    formatted_track_statuses = format_track_statuses(session.track_status, global_t_min)
+
+    # 4.1. Resample weather data onto the same timeline for playback
+    weather_resampled = resample_weather(session, timeline, global_t_min)
+
+    # 4.2. Per-driver lap summary (lap/sector times, tyres, pits) indexed by lap number
+    lap_table = build_lap_table(session.laps, driver_codes, global_t_min, max_lap_number, FPS)
+
+    # 4.3. Order of the cars at every frame, for the race events (leader changes, overtakes, ...)
+    order_codes = list(resampled_data.keys())
+    order_inputs = {
+        channel: np.column_stack([resampled_data[code][channel] for code in order_codes])
+        for channel in ("lap", "dist", "tyre")
+    }
+    race_order = build_race_order(order_codes, order_inputs["lap"], order_inputs["dist"], order_inputs["tyre"])
+
+    # 4.4. Sector and mini-sector crossing times, and the status (personal / overall best) of the
+    # last sector of every driver at every frame, for the leaderboard
+    sector_timing = build_sector_timing(order_codes, timeline, order_inputs["lap"], order_inputs["dist"],
+                                        lap_table, FPS)
+    order_inputs = None
+
+    # 4.5. Race control messages (flags, penalties, investigations), sorted by replay time
+    race_control = build_race_control(session, global_t_min, driver_codes)
+
+    # 5. Build the frames + LIVE LEADERBOARD
+    # Frames are stored in fixed-duration chunks next to the cache file, so a replay can open at
+    # any lap by reading only the chunks around it. Each build writes a new chunk directory, so
+    # replays reading the current cache keep their chunks until the new cache file replaces it
+    chunk_dir = new_chunk_dir(cache_path)
+    frames = assemble_frames(timeline, resampled_data, weather_resampled,
+                             workers=min(get_frame_workers(), memory_plan["workers"]) if memory_plan else None,
+                             chunk_dir=chunk_dir,
+                             keep_resident=not (memory_plan and memory_plan["spill"]))
     print("completed telemetry extraction...")
     print("Saving to cache file...")
+    progress.report("save")
     # If computed_data/ directory doesn't exist, create it
     if not os.path.exists("computed_data"):
         os.makedirs("computed_data")
 
     # Save using pickle (10-100x faster than JSON)
-    with open(f"computed_data/{event_name}_{cache_suffix}_telemetry.pkl", "wb") as f:
-        pickle.dump({
+    try:
+        atomic_pickle_dump({
             "frames": frames,
             "driver_colors": get_driver_colors(session),
             "track_statuses": formatted_track_statuses,
             "total_laps": int(max_lap_number),
             "driver_teams": driver_teams,
             "driver_names": driver_names,
-        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            "lap_table": lap_table,
+            "race_order": race_order,
+            "sector_timing": sector_timing,
+            "race_control": race_control,
+        }, cache_path)
+    except BaseException:
+        # The old cache file (if any) still references its own chunks
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+        raise
+    remove_stale_chunk_dirs(cache_path, keep=chunk_dir)
 
     print("Saved Successfully!")
     print("The replay should begin in a new window shortly")
@@ -420,10 +708,15 @@ def get_race_telemetry(session, session_type='R'):
         "driver_names": driver_names,
         "track_statuses": formatted_track_statuses,
         "total_laps": int(max_lap_number),
+        "lap_table": lap_table,
+        "race_order": race_order,
+        "sector_timing": sector_timing,
+        "race_control": race_control,
     }
 
 
 def get_qualifying_results(session):
+    import pandas as pd
 
     # Extract the qualifying results and return a list of the drivers, their positions and their lap times in each qualifying segment
 
@@ -456,6 +749,8 @@ def get_qualifying_results(session):
 
 def get_driver_quali_telemetry(session, driver_code: str, quali_segment: str):
 
+    ensure_session_loaded(session, "quali")
+
     # Split Q1/Q2/Q3 sections
     q1, q2, q3 = session.laps.split_qualifying_sessions()
 
@@ -486,151 +781,46 @@ def get_driver_quali_telemetry(session, driver_code: str, quali_segment: str):
     if fastest_lap is None:
         raise ValueError(f"No valid laps for driver '{driver_code}' in {quali_segment}")
 
-    telemetry = fastest_lap.get_telemetry()
+    # The lap on its own clock (time since the start of the lap)
+    channels = extract_lap_channels(driver_laps.loc[[fastest_lap.name]], time_column="Time")
 
     # Guard: if telemetry has no time data, return empty
-    if telemetry is None or telemetry.empty or 'Time' not in telemetry or len(telemetry) == 0:
+    if channels is None:
         return {"frames": [], "track_statuses": []}
 
-    global_t_min = telemetry["Time"].dt.total_seconds().min()
-    global_t_max = telemetry["Time"].dt.total_seconds().max()
-
-    max_speed = telemetry["Speed"].max()
-    min_speed = telemetry["Speed"].min()
+    max_speed = channels["speed"].max()
+    min_speed = channels["speed"].min()
 
     # An array of objects containing the start and end disances of each time the driver used DRS during the lap
     lap_drs_zones = []
 
-    # Build arrays directly from dataframes
-    t_arr = telemetry["Time"].dt.total_seconds().to_numpy()
-    x_arr = telemetry["X"].to_numpy()
-    y_arr = telemetry["Y"].to_numpy()
-    dist_arr = telemetry["Distance"].to_numpy()
-    rel_dist_arr = telemetry["RelativeDistance"].to_numpy()
-    speed_arr = telemetry["Speed"].to_numpy()
-    gear_arr = telemetry["nGear"].to_numpy()
-    throttle_arr = telemetry["Throttle"].to_numpy()
-    brake_arr = telemetry["Brake"].to_numpy()
-    drs_arr = telemetry["DRS"].to_numpy()
-
-    # Recompute time bounds from the (possibly modified) telemetry times
-    global_t_min = float(t_arr.min())
-    global_t_max = float(t_arr.max())
+    global_t_min = float(channels["t"][0])
+    global_t_max = float(channels["t"][-1])
 
     # Create timeline (relative times starting at zero) and include endpoint
     timeline = np.arange(global_t_min, global_t_max + DT/2, DT) - global_t_min
 
-    # Ensure we have at least one sample
-    if t_arr.size == 0:
-        return {"frames": [], "track_statuses": []}
-
     # Shift telemetry times to same reference as timeline (relative to global_t_min)
-    t_rel = t_arr - global_t_min
-
-    # Sort & deduplicate times using the relative times
-    order = np.argsort(t_rel)
-    t_sorted = t_rel[order]
-    t_sorted_unique, unique_idx = np.unique(t_sorted, return_index=True)
-    idx_map = order[unique_idx]
-
-    x_sorted = x_arr[idx_map]
-    y_sorted = y_arr[idx_map]
-    dist_sorted = dist_arr[idx_map]
-    rel_dist_sorted = rel_dist_arr[idx_map]
-    speed_sorted = speed_arr[idx_map]
-    gear_sorted = gear_arr[idx_map]
-    throttle_sorted = throttle_arr[idx_map]
-    brake_sorted = brake_arr[idx_map]
-    drs_sorted = drs_arr[idx_map]
-
-    # Continuous interpolation
-    x_resampled = np.interp(timeline, t_sorted_unique, x_sorted)
-    y_resampled = np.interp(timeline, t_sorted_unique, y_sorted)
-    dist_resampled = np.interp(timeline, t_sorted_unique, dist_sorted)
-    rel_dist_resampled = np.interp(timeline, t_sorted_unique, rel_dist_sorted)
-    speed_resampled = np.round(np.interp(timeline, t_sorted_unique, speed_sorted), 1)
-    throttle_resampled = np.round(np.interp(timeline, t_sorted_unique, throttle_sorted), 1)
-    brake_resampled = np.round(np.interp(timeline, t_sorted_unique, brake_sorted), 1)
-    drs_resampled = np.interp(timeline, t_sorted_unique, drs_sorted)
+    channels["t"] = channels["t"] - global_t_min
+
+    # Continuous interpolation, with forward-fill / step sampling for discrete fields (gear)
+    resampled_data = resample_channels(
+        channels, timeline,
+        ("x", "y", "dist", "rel_dist", "speed", "gear", "throttle", "brake", "drs"),
+        step=("gear",),
+    )
+    resampled_data["t"] = timeline
+    for name in ("speed", "throttle", "brake"):
+        resampled_data[name] = np.round(resampled_data[name], 1)
+    resampled_data["gear"] = resampled_data["gear"].astype(int)
 
     # Make sure that braking is between 0 and 100 so that it matches the throttle scale
+    resampled_data["brake"] = resampled_data["brake"] * 100.0
 
-    brake_resampled = brake_resampled * 100.0
-
-    # Forward-fill / step sampling for discrete fields (gear)
-    idxs = np.searchsorted(t_sorted_unique, timeline, side='right') - 1
-    idxs = np.clip(idxs, 0, len(t_sorted_unique) - 1)
-    gear_resampled = gear_sorted[idxs].astype(int)
-
-    resampled_data = {
-        "t": timeline,
-        "x": x_resampled,
-        "y": y_resampled,
-        "dist": dist_resampled,
-        "rel_dist": rel_dist_resampled,
-        "speed": speed_resampled,
-        "gear": gear_resampled,
-        "throttle": throttle_resampled,
-        "brake": brake_resampled,
-        "drs": drs_resampled,
-    }
-
-    track_status = session.track_status
-
-    formatted_track_statuses = []
-
-    for status in track_status.to_dict('records'):
-        seconds = timedelta.total_seconds(status['Time'])
-
-        start_time = seconds - global_t_min # Shift to match timeline
-        end_time = None
-
-        # Set the end time of the previous status
-        if formatted_track_statuses:
-            formatted_track_statuses[-1]['end_time'] = start_time
+    formatted_track_statuses = format_track_statuses(session.track_status, global_t_min)
 
-        formatted_track_statuses.append({
-            'status': status['Status'],
-            'start_time': start_time,
-            'end_time': end_time, 
-        })
-
-    # 4.1. Resample weather data onto the same timeline for playback
-    weather_resampled = None
-    weather_df = getattr(session, "weather_data", None)
-    if weather_df is not None and not weather_df.empty:
-        try:
-            weather_times = weather_df["Time"].dt.total_seconds().to_numpy() - global_t_min
-            if len(weather_times) > 0:
-                order_w = np.argsort(weather_times)
-                weather_times = weather_times[order_w]
-
-                def _maybe_get(name):
-                    return weather_df[name].to_numpy()[order_w] if name in weather_df else None
-
-                def _resample(series):
-                    if series is None:
-                        return None
-                    return np.interp(timeline, weather_times, series)
-
-                track_temp = _resample(_maybe_get("TrackTemp"))
-                air_temp = _resample(_maybe_get("AirTemp"))
-                humidity = _resample(_maybe_get("Humidity"))
-                wind_speed = _resample(_maybe_get("WindSpeed"))
-                wind_direction = _resample(_maybe_get("WindDirection"))
-                rainfall_raw = _maybe_get("Rainfall")
-                rainfall = _resample(rainfall_raw.astype(float)) if rainfall_raw is not None else None
-
-                weather_resampled = {
-                    "track_temp": track_temp,
-                    "air_temp": air_temp,
-                    "humidity": humidity,
-                    "wind_speed": wind_speed,
-                    "wind_direction": wind_direction,
-                    "rainfall": rainfall,
-                }
-        except Exception as e:
-            print(f"Weather data could not be processed: {e}")
+    # Resample weather data onto the same timeline for playback
+    weather_resampled = resample_weather(session, timeline, global_t_min)
 
     # Build the frames
     frames = []
@@ -639,21 +829,7 @@ def get_driver_quali_telemetry(session, driver_code: str, quali_segment: str):
     for i in range(num_frames):
         t = timeline[i]
 
-        weather_snapshot = {}
-        if weather_resampled:
-            try:
-                wt = weather_resampled
-                rain_val = wt["rainfall"][i] if wt.get("rainfall") is not None else 0.0
-                weather_snapshot = {
-                    "track_temp": float(wt["track_temp"][i]) if wt.get("track_temp") is not None else None,
-                    "air_temp": float(wt["air_temp"][i]) if wt.get("air_temp") is not None else None,
-                    "humidity": float(wt["humidity"][i]) if wt.get("humidity") is not None else None,
-                    "wind_speed": float(wt["wind_speed"][i]) if wt.get("wind_speed") is not None else None,
-                    "wind_direction": float(wt["wind_direction"][i]) if wt.get("wind_direction") is not None else None,
-                    "rain_state": "RAINING" if rain_val and rain_val >= 0.5 else "DRY",
-                }
-            except Exception as e:
-                print(f"Failed to attach weather data to frame {i}: {e}")
+        weather_snapshot = build_weather_snapshot(weather_resampled, i)
 
         # Check if drs has changed from the previous frame
 
@@ -707,6 +883,7 @@ def get_driver_quali_telemetry(session, driver_code: str, quali_segment: str):
 def _process_quali_driver(args):
     """Process qualifying telemetry data for a single driver - must be top-level for multiprocessing"""
     session, driver_code = args
+    timer = profiler.WorkerTimer("driver", driver_code)
 
     print(f"Getting qualifying telemetry for driver: {driver_code}")
 
@@ -736,6 +913,7 @@ def _process_quali_driver(args):
         "driver_telemetry_data": driver_telemetry_data,
         "max_speed": max_speed,
         "min_speed": min_speed,
+        "profile": timer.stop(),
     }
 
 
@@ -755,13 +933,13 @@ def get_quali_telemetry(session, session_type='Q'):
     #   }
     # }
 
-    event_name = str(session).replace(' ', '_')
+    cache_path = get_telemetry_cache_path(session, session_type)
     cache_suffix = 'sprintquali' if session_type == 'SQ' else 'quali'
 
     # Check if this data has already been computed
     try:
         if "--refresh-data" not in sys.argv:
-            with open(f"computed_data/{event_name}_{cache_suffix}_telemetry.pkl", "rb") as f:
+            with open(cache_path, "rb") as f:
                 data = pickle.load(f)
                 print(f"Loaded precomputed {cache_suffix} telemetry data.")
                 print("The replay should begin in a new window shortly!")
@@ -769,6 +947,9 @@ def get_quali_telemetry(session, session_type='Q'):
     except FileNotFoundError:
         pass  # Need to compute from scratch
 
+    # Only now pay for the FastF1 load
+    ensure_session_loaded(session, "quali")
+
     qualifying_results = get_qualifying_results(session)
 
     telemetry_data = {}
@@ -789,10 +970,15 @@ def get_quali_telemetry(session, session_type='Q'):
     
     num_processes = min(cpu_count(), len(session.drivers))
     
+    results = []
+    progress.report("drivers", 0, len(driver_args))
     with Pool(processes=num_processes) as pool:
-        results = pool.map(_process_quali_driver, driver_args)
+        for result in pool.imap(_process_quali_driver, driver_args):
+            results.append(result)
+            progress.report("drivers", len(results), len(driver_args))
     for result in results:
         driver_code = result["driver_code"]
+        profiler.record_worker(result.get("profile"))
         telemetry_data[driver_code] = result["driver_telemetry_data"]
 
         if result["max_speed"] > max_speed:
@@ -801,17 +987,17 @@ def get_quali_telemetry(session, session_type='Q'):
             min_speed = result["min_speed"]
 
     # Save to the compute_data directory
+    progress.report("save")
 
     if not os.path.exists("computed_data"):
         os.makedirs("computed_data")
 
-    with open(f"computed_data/{event_name}_{cache_suffix}_telemetry.pkl", "wb") as f:
-        pickle.dump({
-            "results": qualifying_results,
-            "telemetry": telemetry_data,
-            "max_speed": max_speed,
-            "min_speed": min_speed,
-        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+    atomic_pickle_dump({
+        "results": qualifying_results,
+        "telemetry": telemetry_data,
+        "max_speed": max_speed,
+        "min_speed": min_speed,
+    }, cache_path)
 
     return {
         "results": qualifying_results,
@@ -821,44 +1007,169 @@ def get_quali_telemetry(session, session_type='Q'):
     }
 
 
-def get_race_weekends_by_year(year):
-    """Returns a list of race weekends for a given year."""
+def load_replay_data(session, session_type='R'):
+    """
+    Returns (telemetry, circuit layout) of a session. For races, the circuit layout (which loads
+    the qualifying session as its reference) is built on a background thread while the race
+    telemetry is read from the replay cache or computed, so the two session loads overlap each
+    other and the cache read. The thread is joined before the telemetry worker Pool is forked.
+    Errors of the layout (ValueError) are raised from here, after the telemetry is done.
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait
+
+    if session_type in ('Q', 'SQ'):
+        # The layout comes from the same session, so there is no second load to overlap
+        telemetry = get_quali_telemetry(session, session_type=session_type)
+        return telemetry, get_circuit_layout(session, session_type=session_type)
+
+    def build_layout():
+        try:
+            return get_circuit_layout(session, session_type=session_type)
+        finally:
+            # The layout thread's stages are a separate track of the --profile report
+            profiler.end_thread_stage()
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="layout") as executor:
+        # In the caller's context, so the layout's progress events reach the caller's scoped sinks
+        layout_future = executor.submit(progress.run_in_context(build_layout))
+        telemetry = get_race_telemetry(session, session_type=session_type,
+                                       before_pool=lambda: wait([layout_future]))
+        return telemetry, layout_future.result()
+
+def prepare_replay_data(year, round_number, session_type='R'):
+    """
+    Computes the replay cache and the circuit layout for a session, so that a replay process
+    started afterwards finds everything on disk and never loads the FastF1 session itself.
+    Returns the path of the replay cache.
+    """
     enable_cache()
-    schedule = fastf1.get_event_schedule(year)
-    weekends = []
+    session = get_session(year, round_number, session_type)
+    cache_path = get_telemetry_cache_path(session, session_type)
+
+    if "--refresh-data" in sys.argv or not os.path.exists(cache_path):
+        load_replay_data(session, session_type=session_type)
+    else:
+        get_circuit_layout(session, session_type=session_type)
+    return cache_path
+
+def _prepare_replay_data_reporting(year, round_number, session_type, progress_address):
+    # Runs in the helper process of prepare_replay_data_in_process
+    if progress_address:
+        progress.connect(progress_address)
+    return prepare_replay_data(year, round_number, session_type)
+
+def prepare_replay_data_in_process(year, round_number, session_type='R', progress_address=None):
+    """
+    prepare_replay_data in a freshly spawned helper process, for callers with threads of their
+    own (the Qt launcher, the replay service): the race pipeline forks its worker Pool, and
+    forking a multi-threaded process can deadlock the workers on locks other threads held.
+    Progress goes to the progress channel at progress_address; errors are re-raised here.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(_prepare_replay_data_reporting, year, round_number, session_type,
+                               progress_address).result()
+
+
+SCHEDULE_CACHE_DIR = os.path.join("computed_data", "schedules")
+# Schedules of the current and future seasons can still change (postponed or added rounds),
+# so they are refetched after this many seconds. Past seasons never expire.
+SCHEDULE_CACHE_TTL = 12 * 60 * 60
+
+def get_schedule_cache_path(year):
+    return os.path.join(SCHEDULE_CACHE_DIR, f"{year}_schedule.pkl")
+
+def _read_schedule_cache(year):
+    try:
+        with open(get_schedule_cache_path(year), "rb") as f:
+            return pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+
+def _schedule_cache_is_fresh(year, cached):
+    if year < time.localtime().tm_year:
+        return True
+    return time.time() - cached["fetched_at"] < SCHEDULE_CACHE_TTL
+
+def get_event_schedule(year, cache_only=False):
+    """
+    Returns the event schedule of a season as a list of dicts (round_number, event_name, date,
+    country, type, is_testing), cached on disk in computed_data/schedules.
+
+    A fresh cache entry is returned without touching FastF1. An expired entry is refetched, and
+    still used when the fetch fails (offline). With cache_only=True, returns None instead of
+    fetching when there is no fresh cache entry.
+    """
+    cached = _read_schedule_cache(year)
+    if cached is not None and ("--refresh-data" not in sys.argv) and _schedule_cache_is_fresh(year, cached):
+        return cached["events"]
+    if cache_only:
+        return None
+
+    import fastf1
+
+    try:
+        enable_cache()
+        schedule = fastf1.get_event_schedule(year)
+        if schedule.empty:
+            raise ValueError(f"Empty schedule for {year}")
+    except Exception as e:
+        if cached is not None:
+            print(f"Could not refresh the {year} schedule ({e}), using the cached copy")
+            return cached["events"]
+        raise
+
+    events = []
     for _, event in schedule.iterrows():
-        if event.is_testing():
-            continue
-        weekends.append({
-            "round_number": event['RoundNumber'],
+        events.append({
+            "round_number": int(event['RoundNumber']),
             "event_name": event['EventName'],
             "date": str(event['EventDate'].date()),
             "country": event['Country'],
             "type": event['EventFormat'],
+            "is_testing": bool(event.is_testing()),
         })
-    return weekends
+
+    atomic_pickle_dump({"fetched_at": time.time(), "events": events}, get_schedule_cache_path(year))
+    return events
+
+def prefetch_event_schedules(years):
+    """Fills the schedule cache for the given seasons, ignoring failures (used in the background)."""
+    for year in years:
+        try:
+            get_event_schedule(year)
+        except Exception as e:
+            print(f"Could not prefetch the {year} schedule: {e}")
+
+def get_race_weekends_by_year(year, cache_only=False):
+    """Returns a list of race weekends for a given year (None if cache_only and not cached)."""
+    events = get_event_schedule(year, cache_only=cache_only)
+    if events is None:
+        return None
+    return [
+        {key: value for key, value in event.items() if key != "is_testing"}
+        for event in events if not event["is_testing"]
+    ]
 
 def list_rounds(year):
     """Lists all rounds for a given year."""
-    enable_cache()
     print(f"F1 Schedule {year}")
-    schedule = fastf1.get_event_schedule(year)
-    for _, event in schedule.iterrows():
-        print(f"{event['RoundNumber']}: {event['EventName']}")
+    for event in get_event_schedule(year):
+        print(f"{event['round_number']}: {event['event_name']}")
 
 def list_sprints(year):
     """Lists all sprint rounds for a given year."""
-    enable_cache()
     print(f"F1 Sprint Races {year}")
-    schedule = fastf1.get_event_schedule(year)
     sprint_name = 'sprint_qualifying'
     if year == 2023:
         sprint_name = 'sprint_shootout'
     if year in [2021, 2022]:
         sprint_name = 'sprint'
-    sprints = schedule[schedule['EventFormat'] == sprint_name]
-    if sprints.empty:
+    sprints = [event for event in get_event_schedule(year) if event['type'] == sprint_name]
+    if not sprints:
         print(f"No sprint races found for {year}.")
     else:
-        for _, event in sprints.iterrows():
-            print(f"{event['RoundNumber']}: {event['EventName']}")
\ No newline at end of file
+        for event in sprints:
+            print(f"{event['round_number']}: {event['event_name']}")
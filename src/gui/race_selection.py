@@ -3,41 +3,88 @@ from PySide6.QtWidgets import (
     QLabel, QComboBox, QPushButton, QTreeWidget, QTreeWidgetItem, QMessageBox, QInputDialog
 )
 from PySide6.QtWidgets import QProgressDialog
-from PySide6.QtCore import QThread, Signal, Qt, QTimer
+from PySide6.QtCore import QObject, QThread, Signal, Qt
 from PySide6.QtGui import QPixmap, QFont
 import sys
 import os
 import subprocess
-import tempfile
-import uuid
-from src.f1_data import get_race_weekends_by_year, load_session
+import threading
+from src.f1_data import (
+    get_race_weekends_by_year, prefetch_event_schedules, prepare_replay_data, prepare_replay_data_in_process,
+)
+from src.lib import progress
+from src.lib.speculative import SpeculativeLoader, DEFAULT_SPECULATIVE_SESSION
+from src import replay_service
 
-# Worker thread to fetch schedule without blocking UI
+# Worker thread to fetch schedule without blocking UI. Afterwards it prefetches the schedules
+# of the adjacent years into the on-disk schedule cache, so switching years is instant.
 class FetchScheduleWorker(QThread):
     result = Signal(object)
     error = Signal(str)
 
-    def __init__(self, year, parent=None):
+    def __init__(self, year, prefetch_years=(), parent=None):
+        super().__init__(parent)
+        self.year = year
+        self.prefetch_years = prefetch_years
+
+    def run(self):
+        # year is None when the schedule was already shown from the cache
+        if self.year is not None:
+            try:
+                events = get_race_weekends_by_year(self.year)
+                self.result.emit(events)
+            except Exception as e:
+                self.error.emit(str(e))
+        prefetch_event_schedules(self.prefetch_years)
+
+# Worker thread that builds the replay cache for a session. The replay process started
+# afterwards reads that cache, so the expensive FastF1 load happens exactly once per launch.
+# The build itself runs in a spawned helper process: its worker Pool must not be forked from
+# this process, which runs Qt's threads.
+class PrepareReplayWorker(QThread):
+    result = Signal(object)
+    error = Signal(str)
+    progress = Signal(object)
+
+    def __init__(self, year, round_no, session_type, speculative=None, parent=None):
         super().__init__(parent)
         self.year = year
+        self.round_no = round_no
+        self.session_type = session_type
+        self.speculative = speculative
 
     def run(self):
+        progress.add_sink(self.progress.emit)
         try:
-            # enable cache if available in project
+            # Reuse a background load of this session that started when the round was highlighted
+            if self.speculative is not None:
+                if self.speculative.running(self.year, self.round_no, self.session_type):
+                    progress.report("speculative")
+                self.speculative.wait(self.year, self.round_no, self.session_type)
+            # The helper reports its stages over a local progress socket
+            server = progress.ProgressServer(self.progress.emit)
             try:
-                from src.f1_data import enable_cache
-                enable_cache()
-            except Exception:
-                pass
-            events = get_race_weekends_by_year(self.year)
-            self.result.emit(events)
+                cache_path = prepare_replay_data_in_process(
+                    self.year, self.round_no, self.session_type, progress_address=server.address)
+            finally:
+                server.close()
+            self.result.emit(cache_path)
         except Exception as e:
             self.error.emit(str(e))
+        finally:
+            progress.remove_sink(self.progress.emit)
+
+# Forwards progress events from the replay process (received on a socket thread) to the UI thread
+class ProgressBridge(QObject):
+    event = Signal(object)
 
 class RaceSelectionWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.worker = None
+        self._schedule_workers = []
+        # Builds the replay cache of the likely session as soon as a round is highlighted
+        self._speculative = SpeculativeLoader(prepare_replay_data)
         self.loading_session = False
         self.selected_session_title = None
 
@@ -131,10 +178,24 @@ class RaceSelectionWindow(QMainWindow):
             self.session_panel.hide()
         except Exception:
             pass
-        self.worker = FetchScheduleWorker(int(year))
-        self.worker.result.connect(self.populate_schedule)
-        self.worker.error.connect(self.show_error)
-        self.worker.start()
+        year = int(year)
+        self._speculative.cancel()
+        available_years = {int(self.year_combo.itemText(i)) for i in range(self.year_combo.count())}
+        prefetch_years = [y for y in (year - 1, year + 1) if y in available_years]
+
+        # Fresh cached schedule: show it right away, the worker then only prefetches
+        cached = get_race_weekends_by_year(year, cache_only=True)
+        worker = FetchScheduleWorker(None if cached is not None else year, prefetch_years)
+        worker.result.connect(self.populate_schedule)
+        worker.error.connect(self.show_error)
+        # Prefetching can outlive the selected year, keep every running worker referenced
+        self._schedule_workers.append(worker)
+        worker.finished.connect(lambda: self._schedule_workers.remove(worker))
+        self.worker = worker
+        worker.start()
+        if cached is not None:
+            self.populate_schedule(cached)
+
     def populate_schedule(self, events):
         for event in events:
             # Ensure all columns are strings (QTreeWidgetItem expects text)
@@ -158,6 +219,11 @@ class RaceSelectionWindow(QMainWindow):
 
     def on_race_clicked(self, item, column):
         ev = item.data(0, Qt.UserRole)
+        try:
+            self._speculative.start(int(self.year_combo.currentText()), int(ev.get("round_number")),
+                                    DEFAULT_SPECULATIVE_SESSION)
+        except Exception as e:
+            print(f"Could not start background load: {e}")
         # ensure the sessions panel is visible when a race is selected
         try:
             self.session_panel.show()
@@ -187,8 +253,9 @@ class RaceSelectionWindow(QMainWindow):
         """Launch main.py in a separate process to run the selected session.
 
         Uses the same CLI flags that `main.py` understands: `--qualifying`,
-        `--sprint-qualifying`, `--sprint`. Runs the command detached so the
-        Qt UI remains responsive.
+        `--sprint-qualifying`, `--sprint`. The replay cache is built first in a
+        worker thread, so the child only reads it. Runs the command detached so
+        the Qt UI remains responsive.
         """
         try:
             year = int(self.year_combo.currentText())
@@ -218,7 +285,7 @@ class RaceSelectionWindow(QMainWindow):
         if flag:
             cmd.append(flag)
 
-        # Show a modal loading dialog and load the session in a background thread.
+        # Show a modal loading dialog and build the replay data in a background thread.
         dlg = QProgressDialog("Loading session data...", None, 0, 0, self)
         dlg.setWindowTitle("Loading")
         dlg.setWindowModality(Qt.ApplicationModal)
@@ -237,36 +304,45 @@ class RaceSelectionWindow(QMainWindow):
         elif session_label == "Sprint":
             session_code = 'S'
 
-        class FetchSessionWorker(QThread):
-            result = Signal(object)
-            error = Signal(str)
+        # Progress server of this launch; a late event of an earlier launch must not close the
+        # server of the current one
+        launch = {"server": None}
 
-            def __init__(self, year, round_no, session_type, parent=None):
-                super().__init__(parent)
-                self.year = year
-                self.round_no = round_no
-                self.session_type = session_type
+        def _close_server():
+            if launch["server"] is not None:
+                launch["server"].close()
 
-            def run(self):
-                try:
-                    try:
-                        from src.f1_data import enable_cache
-                        enable_cache()
-                    except Exception:
-                        pass
-                    sess = load_session(self.year, self.round_no, self.session_type)
-                    self.result.emit(sess)
-                except Exception as e:
-                    self.error.emit(str(e))
-
-        def _on_loaded(session_obj):
-            # create a unique ready-file path and pass it to the child
-            ready_path = os.path.join(tempfile.gettempdir(), f"f1_ready_{uuid.uuid4().hex}")
-            cmd_with_ready = list(cmd) + ["--ready-file", ready_path]
+        def _on_progress(event):
+            stage = event.get("stage")
+            if stage == "ready":
+                dlg.close()
+                _close_server()
+                return
+            if stage == "exited":
+                if dlg.isVisible():
+                    dlg.close()
+                    _close_server()
+                    QMessageBox.critical(self, "Playback error",
+                                         event.get("error") or "Playback process exited before signaling readiness")
+                return
+            dlg.setLabelText(progress.describe(event))
+            if event.get("total"):
+                dlg.setRange(0, int(event["total"]))
+                dlg.setValue(int(event.get("current") or 0))
+            else:
+                dlg.setRange(0, 0)
+
+        def _on_loaded(cache_path):
+            # The child reports its remaining stages and "ready" over a local progress socket
+            bridge = ProgressBridge(self)
+            bridge.event.connect(_on_progress)
+            server = launch["server"] = progress.ProgressServer(bridge.event.emit)
+            cmd_with_progress = list(cmd) + ["--progress", server.address]
 
             try:
-                proc = subprocess.Popen(cmd_with_ready)
+                proc = subprocess.Popen(cmd_with_progress)
             except Exception as exc:
+                server.close()
                 try:
                     dlg.close()
                 except Exception:
@@ -274,39 +350,16 @@ class RaceSelectionWindow(QMainWindow):
                 QMessageBox.critical(self, "Playback error", f"Failed to start playback:\n{exc}")
                 return
 
-            # Poll for ready file or child exit
-            timer = QTimer(self)
+            # Report an early exit of the child (crash before its window is ready)
+            def _wait_for_exit():
+                bridge.event.emit({"stage": "exited", "returncode": proc.wait()})
 
-            def _check_ready():
-                try:
-                    if os.path.exists(ready_path):
-                        try:
-                            dlg.close()
-                        except Exception:
-                            pass
-                        timer.stop()
-                        try:
-                            os.remove(ready_path)
-                        except Exception:
-                            pass
-                        return
-                    # if process exited early, show error
-                    if proc.poll() is not None:
-                        try:
-                            dlg.close()
-                        except Exception:
-                            pass
-                        timer.stop()
-                        QMessageBox.critical(self, "Playback error", "Playback process exited before signaling readiness")
-                except Exception:
-                    # ignore transient file-system errors
-                    pass
+            threading.Thread(target=_wait_for_exit, daemon=True).start()
 
-            timer.timeout.connect(_check_ready)
-            timer.start(200)
             # keep references
             self._play_proc = proc
-            self._ready_timer = timer
+            self._progress_server = server
+            self._progress_bridge = bridge
 
         def _on_error(msg):
             try:
@@ -315,7 +368,35 @@ class RaceSelectionWindow(QMainWindow):
                 pass
             QMessageBox.critical(self, "Load error", f"Failed to load session data:\n{msg}")
 
-        worker = FetchSessionWorker(year, round_no, session_code)
+        # A running replay service (main.py --service) prepares the session and starts the
+        # replay window itself, so there is nothing to prepare in this process.
+        if replay_service.is_running():
+            bridge = ProgressBridge(self)
+            bridge.event.connect(_on_progress)
+            server = launch["server"] = progress.ProgressServer(bridge.event.emit)
+
+            def _open_in_service():
+                self._speculative.wait(year, round_no, session_code)
+                try:
+                    response = replay_service.request(
+                        "open", year=year, round=round_no, session_type=session_code, progress=server.address)
+                except (OSError, ValueError) as e:
+                    response = {"ok": False, "error": str(e)}
+                if not response.get("ok"):
+                    bridge.event.emit({"stage": "exited", "error": f"Replay service: {response.get('error')}"})
+                    return
+                # Report a window that dies before signaling readiness
+                while replay_service.window_alive(response["pid"]):
+                    threading.Event().wait(0.5)
+                bridge.event.emit({"stage": "exited"})
+
+            threading.Thread(target=_open_in_service, daemon=True).start()
+            self._progress_server = server
+            self._progress_bridge = bridge
+            return
+
+        worker = PrepareReplayWorker(year, round_no, session_code, speculative=self._speculative)
+        worker.progress.connect(_on_progress)
         worker.result.connect(_on_loaded)
         worker.error.connect(_on_error)
         # Keep a reference so it doesn't get GC'd
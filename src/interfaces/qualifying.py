@@ -2,10 +2,11 @@ import arcade
 import threading
 import time
 import numpy as np
-from src.ui_components import build_track_from_example_lap, LapTimeLeaderboardComponent, QualifyingSegmentSelectorComponent, RaceControlsComponent, draw_finish_line
-from src.f1_data import get_driver_quali_telemetry
+from src.ui_components import LapTimeLeaderboardComponent, QualifyingSegmentSelectorComponent, RaceControlsComponent, draw_finish_line
+from src.f1_data import get_driver_quali_telemetry, get_circuit_layout
 from src.f1_data import FPS
 from src.lib.time import format_time
+from src.lib import progress
 from src.ui_components import LegendComponent
 
 SCREEN_WIDTH = 1280
@@ -20,7 +21,7 @@ TOP_MARGIN = 40
 BOTTOM_MARGIN = 40
 
 class QualifyingReplay(arcade.Window):
-    def __init__(self, session, data, circuit_rotation=0, left_ui_margin=340, right_ui_margin=0, title="Qualifying Results"):
+    def __init__(self, session, data, circuit_layout=None, circuit_rotation=0, left_ui_margin=340, right_ui_margin=0, title="Qualifying Results"):
         super().__init__(width=SCREEN_WIDTH, height=SCREEN_HEIGHT, title=title, resizable=True)
         self.maximize()
         
@@ -81,30 +82,22 @@ class QualifyingReplay(arcade.Window):
         # Legend component for control icons
         self.legend_comp = LegendComponent()
 
-        # Build the track layout from an example lap
+        # Build the track layout from an example lap (cached per circuit and year)
 
-        example_lap = None
-        for res in self.data['results']:
-            if res['Q3'] is not None:
-                example_lap = self.session.laps.pick_drivers(res['code']).pick_fastest()
-                break
-            elif res['Q2'] is not None:
-                example_lap = self.session.laps.pick_drivers(res['code']).pick_fastest()
-                break
-            elif res['Q1'] is not None:
-                example_lap = self.session.laps.pick_drivers(res['code']).pick_fastest()
-                break
+        if circuit_layout is None:
+            circuit_layout = get_circuit_layout(self.session, session_type='Q')
 
         self.world_scale = 1.0
         self.tx = 0
         self.ty = 0
 
-        (self.plot_x_ref, self.plot_y_ref,
-         self.x_inner, self.y_inner,
-         self.x_outer, self.y_outer,
-         self.x_min, self.x_max,
-         self.y_min, self.y_max, self.drs_zones_xy) = build_track_from_example_lap(example_lap.get_telemetry())
-         
+        self.plot_x_ref, self.plot_y_ref = circuit_layout["x_ref"], circuit_layout["y_ref"]
+        self.x_inner, self.y_inner = circuit_layout["x_inner"], circuit_layout["y_inner"]
+        self.x_outer, self.y_outer = circuit_layout["x_outer"], circuit_layout["y_outer"]
+        self.x_min, self.x_max = circuit_layout["x_min"], circuit_layout["x_max"]
+        self.y_min, self.y_max = circuit_layout["y_min"], circuit_layout["y_max"]
+        self.drs_zones_xy = circuit_layout["drs_zones"]
+
         ref_points = self._interpolate_points(self.plot_x_ref, self.plot_y_ref, interp_points=4000)
         self._ref_xs = np.array([p[0] for p in ref_points])
         self._ref_ys = np.array([p[1] for p in ref_points])
@@ -1039,13 +1032,9 @@ class QualifyingReplay(arcade.Window):
             self.is_rewinding = False
             self.paused = self.was_paused_before_hold
 
-def run_qualifying_replay(session, data, title="Qualifying Results", ready_file=None):
-    window = QualifyingReplay(session=session, data=data, title=title)
-    # Signal readiness to parent process (if requested) after window created
-    if ready_file:
-        try:
-            with open(ready_file, 'w') as f:
-                f.write('ready')
-        except Exception:
-            pass
+def run_qualifying_replay(session, data, title="Qualifying Results", circuit_layout=None):
+    progress.report("window")
+    window = QualifyingReplay(session=session, data=data, circuit_layout=circuit_layout, title=title)
+    # Signal readiness to the launcher (if connected) after window created
+    progress.report("ready")
     arcade.run()
\ No newline at end of file
@@ -2,6 +2,9 @@ import os
 import arcade
 import numpy as np
 from src.f1_data import FPS
+from src.lib.frame_store import find_lap_frame
+from src.lib.race_events import extract_race_events, race_order_from_frames
+from src.lib.race_control import active_messages
 from src.ui_components import (
     LeaderboardComponent, 
     WeatherComponent, 
@@ -9,9 +12,8 @@ from src.ui_components import (
     DriverInfoComponent, 
     RaceProgressBarComponent,
     RaceControlsComponent,
+    RaceControlMessagesComponent,
     ControlsPopupComponent,
-    extract_race_events,
-    build_track_from_example_lap,
     draw_finish_line
 )
 
@@ -22,9 +24,11 @@ SCREEN_TITLE = "F1 Race Replay"
 PLAYBACK_SPEEDS = [0.1, 0.2, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, 128.0, 256.0]
 
 class F1RaceReplayWindow(arcade.Window):
-    def __init__(self, frames, track_statuses, example_lap, drivers, title,
-                 playback_speed=1.0, driver_colors=None, circuit_rotation=0.0,
-                 left_ui_margin=340, right_ui_margin=260, total_laps=None, visible_hud=True):
+    def __init__(self, frames, track_statuses, circuit_layout, drivers, title,
+                 playback_speed=1.0, driver_colors=None,
+                 left_ui_margin=340, right_ui_margin=260, total_laps=None, lap_table=None,
+                 visible_hud=True, start_lap=None, live_feed=None, race_order=None,
+                 sector_timing=None, race_control=None):
         # Set resizable to True so the user can adjust mid-sim
         super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, title, resizable=True)
         self.maximize()
@@ -36,13 +40,30 @@ class F1RaceReplayWindow(arcade.Window):
         self.playback_speed = PLAYBACK_SPEEDS[PLAYBACK_SPEEDS.index(playback_speed)] if playback_speed in PLAYBACK_SPEEDS else 1.0
         self.driver_colors = driver_colors or {}
         self.frame_index = 0.0  # use float for fractional-frame accumulation
+        if start_lap and self.n_frames:
+            # Chunked frames (race cache) find the lap in their index without loading anything
+            if hasattr(frames, "frame_for_lap"):
+                lap_frame = frames.frame_for_lap(start_lap)
+            else:
+                lap_frame = find_lap_frame(frames, start_lap)
+            self.frame_index = float(min(lap_frame, self.n_frames - 1))
         self.paused = False
         self.total_laps = total_laps
-        self.has_weather = any("weather" in frame for frame in frames) if frames else False
+        # Per-driver lap summary from the race cache (None for caches built before it existed)
+        self.lap_table = lap_table
+        # Order of the cars at every frame from the race cache, for the progress bar events
+        self.race_order = race_order
+        # Sector timing from the race cache: the leaderboard colours rows by sector status
+        self.sector_timing = sector_timing
+        self.sector_columns = {code: j for j, code in enumerate(sector_timing["drivers"])} if sector_timing else {}
+        # Race control messages from the race cache, sorted by replay time
+        self.race_control = race_control
+        # Weather is on every frame or on none, so the first frame shown is enough to tell
+        self.has_weather = "weather" in frames[int(self.frame_index)] if self.n_frames else False
         self.visible_hud = visible_hud # If it displays HUD or not (leaderboard, controls, weather, etc)
 
         # Rotation (degrees) to apply to the whole circuit around its centre
-        self.circuit_rotation = circuit_rotation
+        self.circuit_rotation = circuit_layout.get("rotation", 0.0)
         self._rot_rad = float(np.deg2rad(self.circuit_rotation)) if self.circuit_rotation else 0.0
         self._cos_rot = float(np.cos(self._rot_rad))
         self._sin_rot = float(np.sin(self._rot_rad))
@@ -54,11 +75,12 @@ class F1RaceReplayWindow(arcade.Window):
         leaderboard_x = max(20, self.width - self.right_ui_margin + 12)
         self.leaderboard_comp = LeaderboardComponent(x=leaderboard_x, width=240, visible=visible_hud)
         self.weather_comp = WeatherComponent(left=20, top_offset=170, visible=visible_hud)
+        self.race_control_comp = RaceControlMessagesComponent(visible=visible_hud)
         self.legend_comp = LegendComponent(x=max(12, self.left_ui_margin - 320), visible=visible_hud)
         self.driver_info_comp = DriverInfoComponent(left=20, width=300)
         self.controls_popup_comp = ControlsPopupComponent()
 
-        self.controls_popup_comp.set_size(340, 230) # width/height of the popup box
+        self.controls_popup_comp.set_size(340, 250) # width/height of the popup box
         self.controls_popup_comp.set_font_sizes(header_font_size=16, body_font_size=13) # adjust font sizes
 
 
@@ -82,20 +104,32 @@ class F1RaceReplayWindow(arcade.Window):
         self.is_forwarding = False
         self.was_paused_before_hold = False
         
-        # Extract race events for the progress bar
-        race_events = extract_race_events(frames, track_statuses, total_laps or 0)
+        # Live mode: frames keep arriving from a recorded live-timing feed (src/live_feed.py);
+        # the replay opens at the live edge and follows it while playing
+        self.live_feed = live_feed
+        self._live_refresh_s = 0.0
+        if live_feed is not None and not start_lap:
+            self.frame_index = float(max(0, self.n_frames - 1))
+
+        # Chunked frames: only the chunks around the start frame are loaded so far; the rest are
+        # read on a background thread while playback runs
+        self.loading_frames = hasattr(frames, "start_background_load") and frames.start_background_load(int(self.frame_index))
+
+        # Extract race events for the progress bar. Without a race order from the cache they are
+        # found from the frames, so only once all chunks are in
         self.progress_bar_comp.set_race_data(
             total_frames=len(frames),
             total_laps=total_laps or 0,
-            events=race_events
+            events=[] if self.loading_frames and race_order is None else self._race_events()
         )
 
-        # Build track geometry (Raw World Coordinates)
-        (self.plot_x_ref, self.plot_y_ref,
-         self.x_inner, self.y_inner,
-         self.x_outer, self.y_outer,
-         self.x_min, self.x_max,
-         self.y_min, self.y_max, self.drs_zones) = build_track_from_example_lap(example_lap)
+        # Track geometry (Raw World Coordinates), prebuilt and cached per circuit
+        self.plot_x_ref, self.plot_y_ref = circuit_layout["x_ref"], circuit_layout["y_ref"]
+        self.x_inner, self.y_inner = circuit_layout["x_inner"], circuit_layout["y_inner"]
+        self.x_outer, self.y_outer = circuit_layout["x_outer"], circuit_layout["y_outer"]
+        self.x_min, self.x_max = circuit_layout["x_min"], circuit_layout["x_max"]
+        self.y_min, self.y_max = circuit_layout["y_min"], circuit_layout["y_max"]
+        self.drs_zones = circuit_layout["drs_zones"]
 
         # Build a dense reference polyline (used for projecting car (x,y) -> along-track distance)
         ref_points = self._interpolate_points(self.plot_x_ref, self.plot_y_ref, interp_points=4000)
@@ -334,8 +368,8 @@ class F1RaceReplayWindow(arcade.Window):
                 # Extract the outer track points for this DRS zone segment
                 drs_outer_points = []
                 for i in range(start_idx, min(end_idx + 1, len(self.x_outer))):
-                    x = self.x_outer.iloc[i]
-                    y = self.y_outer.iloc[i]
+                    x = self.x_outer[i]
+                    y = self.y_outer[i]
                     sx, sy = self.world_to_screen(x, y)
                     drs_outer_points.append((sx, sy))
                 
@@ -424,6 +458,10 @@ class F1RaceReplayWindow(arcade.Window):
         # optionally expose weather_bottom for driver info layout
         self.weather_bottom = self.height - 170 - 130 if (weather_info or self.has_weather) else None
 
+        # Race control messages issued shortly before this frame (bisect on the message times)
+        self.race_control_comp.set_messages(active_messages(self.race_control, t) if self.race_control else [])
+        self.race_control_comp.draw(self)
+
         # Draw leaderboard via component
         driver_list = []
         for code, pos in frame["drivers"].items():
@@ -454,8 +492,43 @@ class F1RaceReplayWindow(arcade.Window):
         # Draw tooltips and overlays on top of everything
         self.progress_bar_comp.draw_overlays(self)
                     
+    def _race_events(self):
+        if self.race_order is None or len(self.race_order["order"]) < self.n_frames:
+            # Race order from the frames; live frames only add the new ones
+            self.race_order = race_order_from_frames(self.frames, self.race_order)
+        return extract_race_events(self.frames, self.track_statuses, self.total_laps or 0,
+                                   race_order=self.race_order, lap_table=self.lap_table)
+
+    def _refresh_live(self):
+        n_frames = len(self.frames)
+        if n_frames == self.n_frames:
+            return
+        self.n_frames = n_frames
+        self.track_statuses = self.live_feed.replay_track_statuses()
+        self.total_laps = self.live_feed.total_laps or self.total_laps
+        self.progress_bar_comp.set_race_data(
+            total_frames=n_frames,
+            total_laps=self.total_laps or 0,
+            events=self._race_events()
+        )
+
     def on_update(self, delta_time: float):
         self.race_controls_comp.on_update(delta_time)
+
+        if self.live_feed is not None:
+            self._live_refresh_s += delta_time
+            if self._live_refresh_s >= 1.0:
+                self._live_refresh_s = 0.0
+                self._refresh_live()
+
+        if self.loading_frames and self.frames.fully_loaded():
+            self.loading_frames = False
+            if self.race_order is None:
+                self.progress_bar_comp.set_race_data(
+                    total_frames=self.n_frames,
+                    total_laps=self.total_laps or 0,
+                    events=self._race_events()
+                )
         
         seek_speed = 3.0 * max(1.0, self.playback_speed) # Multiplier for seeking speed, scales with current playback speed
         if self.is_rewinding:
@@ -523,6 +596,10 @@ class F1RaceReplayWindow(arcade.Window):
             self.race_controls_comp.flash_button('rewind')
         elif symbol == arcade.key.D:
             self.toggle_drs_zones = not self.toggle_drs_zones
+        elif symbol == arcade.key.L and self.live_feed is not None:
+            # Jump to the live edge
+            self._refresh_live()
+            self.frame_index = float(self.n_frames - 1)
         elif symbol == arcade.key.H:
             # Toggle Controls popup with 'H' key — show anchored to bottom-left with 20px margin
             margin_x = 20
@@ -0,0 +1,20 @@
+import os
+import pickle
+import tempfile
+
+def atomic_pickle_dump(obj, path):
+    """
+    Pickles obj to path via a temporary file in the same directory and os.replace, so readers
+    never see a partially written cache file, even if the writer is killed halfway (e.g. a
+    cancelled background load).
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", dir=directory, suffix=".tmp", delete=False) as f:
+        try:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, path)
@@ -0,0 +1,90 @@
+import os
+import pickle
+import numpy as np
+from src.lib.cache_io import atomic_pickle_dump
+
+CIRCUIT_CACHE_DIR = os.path.join("computed_data", "circuits")
+
+# DRS channel values that mean the flap is open
+DRS_OPEN_VALUES = (10, 12, 14)
+
+def find_drs_zones(x, y, drs):
+    """
+    Find the DRS zones of a reference lap.
+    Returns a list of {"start": {...}, "end": {...}} dicts holding the x/y position and
+    the index into the reference polyline at both ends of each zone.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    is_open = np.isin(np.asarray(drs), DRS_OPEN_VALUES)
+
+    # Rising/falling edges of the "DRS open" mask give the zone boundaries
+    edges = np.diff(np.concatenate(([0], is_open.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+
+    drs_zones = []
+    for start, end in zip(starts, ends):
+        drs_zones.append({
+            "start": {"x": float(x[start]), "y": float(y[start]), "index": int(start)},
+            "end": {"x": float(x[end]), "y": float(y[end]), "index": int(end)},
+        })
+    return drs_zones
+
+def build_circuit_layout(example_lap, rotation=0.0, track_width=200):
+    """
+    Build the track geometry for a circuit from the telemetry of a reference lap.
+    `example_lap` only needs "X", "Y" and "DRS" columns (a FastF1 telemetry frame works).
+    Returns a dict with the reference polyline, the inner/outer track edges, the world
+    bounds, the DRS zones and the circuit rotation in degrees.
+    """
+    x_ref = np.asarray(example_lap["X"], dtype=float)
+    y_ref = np.asarray(example_lap["Y"], dtype=float)
+    drs_zones = find_drs_zones(x_ref, y_ref, example_lap["DRS"])
+
+    # compute tangents
+    dx = np.gradient(x_ref)
+    dy = np.gradient(y_ref)
+
+    norm = np.sqrt(dx**2 + dy**2)
+    norm[norm == 0] = 1.0
+    dx /= norm
+    dy /= norm
+
+    nx = -dy
+    ny = dx
+
+    x_outer = x_ref + nx * (track_width / 2)
+    y_outer = y_ref + ny * (track_width / 2)
+    x_inner = x_ref - nx * (track_width / 2)
+    y_inner = y_ref - ny * (track_width / 2)
+
+    return {
+        "x_ref": x_ref,
+        "y_ref": y_ref,
+        "x_inner": x_inner,
+        "y_inner": y_inner,
+        "x_outer": x_outer,
+        "y_outer": y_outer,
+        "x_min": float(min(x_ref.min(), x_inner.min(), x_outer.min())),
+        "x_max": float(max(x_ref.max(), x_inner.max(), x_outer.max())),
+        "y_min": float(min(y_ref.min(), y_inner.min(), y_outer.min())),
+        "y_max": float(max(y_ref.max(), y_inner.max(), y_outer.max())),
+        "drs_zones": drs_zones,
+        "rotation": float(rotation or 0.0),
+    }
+
+def get_circuit_cache_path(year, circuit):
+    circuit_key = str(circuit).replace(' ', '_').replace('/', '_')
+    return os.path.join(CIRCUIT_CACHE_DIR, f"{year}_{circuit_key}_layout.pkl")
+
+def load_circuit_layout(year, circuit):
+    """Returns the cached layout for a circuit in a given year, or None if it has not been built yet."""
+    try:
+        with open(get_circuit_cache_path(year, circuit), "rb") as f:
+            return pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+
+def save_circuit_layout(year, circuit, layout):
+    atomic_pickle_dump(layout, get_circuit_cache_path(year, circuit))
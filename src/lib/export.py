@@ -0,0 +1,227 @@
+import csv
+import os
+import shutil
+import tempfile
+import zipfile
+from bisect import bisect_left
+
+import numpy as np
+
+from src.lib.frame_store import CHUNK_FRAMES
+
+# Streaming export of race replay data (the frames of a computed_data race/sprint cache).
+#
+# Columns are read one chunk of frames at a time for the selected drivers and channels, and
+# written before the next chunk is read, so memory stays at about one chunk whatever the length
+# of the race. They come from the column files of the cache (see frame_store) when it has them,
+# else from the frame dicts (ChunkedFrames.iter_chunks). Formats:
+#
+#   csv    one row per frame and driver: frame, t, leader_lap, driver, <channels>
+#   npz    "t", "frame", "leader_lap" of shape (frames,), "drivers" and one (frames, drivers)
+#          array per channel. The arrays are filled through memory-mapped .npy files in a
+#          temporary directory and then zipped, like np.savez would write them.
+#   arrow  Arrow IPC file with the csv layout, one record batch per chunk (needs pyarrow)
+#
+# Caches written before frames were chunked hold the frame list itself; they are exported the
+# same way, but the whole list is already in memory once the cache is loaded.
+
+EXPORT_FORMATS = ("csv", "npz", "arrow")
+
+# Per-driver frame channel -> export dtype
+EXPORT_CHANNELS = {
+    "x": np.float64,
+    "y": np.float64,
+    "dist": np.float64,
+    "rel_dist": np.float64,
+    "lap": np.int16,
+    "position": np.int16,
+    "tyre": np.int16,
+    "speed": np.float64,
+    "gear": np.int16,
+    "drs": np.int16,
+    "throttle": np.float64,
+    "brake": np.float64,
+}
+
+def _missing(dtype):
+    return np.nan if np.issubdtype(dtype, np.floating) else -1
+
+def frame_range(frames, start_time=None, end_time=None, from_lap=None, to_lap=None):
+    """
+    [first, stop) frame indices of a time range (replay seconds) and/or a range of leader laps
+    (to_lap included). Bounds left as None don't restrict the range.
+    """
+    stored = frames.columns() if hasattr(frames, "columns") else None
+
+    def at_time(t):
+        # First frame at or after t; chunked frames look it up in their column or time index
+        if stored is not None:
+            return int(np.searchsorted(stored["t"], t, side="left"))
+        if getattr(frames, "times", None) is not None:
+            i = frames.frame_at_time(t)
+            return i if frames[i]["t"] >= t else i + 1
+        return bisect_left(frames, t, key=lambda frame: frame["t"])
+
+    def at_lap(lap):
+        # First frame of the leader's lap `lap`, or the end when the race has no such lap
+        lap_starts = getattr(frames, "lap_starts", None)
+        if lap_starts is not None:
+            return lap_starts[max(0, lap)] if lap < len(lap_starts) else len(frames)
+        return bisect_left(frames, lap, key=lambda frame: frame["lap"])
+
+    first, stop = 0, len(frames)
+    if not stop:
+        return 0, 0
+    if start_time is not None:
+        first = max(first, at_time(start_time))
+    if end_time is not None:
+        stop = min(stop, at_time(end_time))
+    if from_lap is not None:
+        first = max(first, at_lap(from_lap))
+    if to_lap is not None:
+        stop = min(stop, at_lap(to_lap + 1))
+    return first, max(first, stop)
+
+def iter_frame_chunks(frames, first, stop):
+    """Yields (index of the first frame, list of frames) over [first, stop), about one chunk at a time."""
+    if hasattr(frames, "iter_chunks"):
+        yield from frames.iter_chunks(first, stop)
+        return
+    for lo in range(first, stop, CHUNK_FRAMES):
+        yield lo, frames[lo:min(lo + CHUNK_FRAMES, stop)]
+
+def chunk_columns(chunk, drivers, channels):
+    """Columns of a list of frames: "t" and "leader_lap" (frames,), and one (frames, drivers) array per channel."""
+    n = len(chunk)
+    columns = {
+        "t": np.fromiter((frame["t"] for frame in chunk), dtype=np.float64, count=n),
+        "leader_lap": np.fromiter((frame.get("lap", 0) for frame in chunk), dtype=np.int16, count=n),
+    }
+    for channel in channels:
+        dtype = EXPORT_CHANNELS[channel]
+        values = np.full((n, len(drivers)), _missing(dtype), dtype=dtype)
+        for i, frame in enumerate(chunk):
+            frame_drivers = frame["drivers"]
+            for j, code in enumerate(drivers):
+                driver = frame_drivers.get(code)
+                if driver is not None and channel in driver:
+                    values[i, j] = driver[channel]
+        columns[channel] = values
+    return columns
+
+def column_chunks(frames, first, stop, drivers, channels):
+    """
+    Yields (index of the first frame, columns as chunk_columns returns them) over [first, stop),
+    about one chunk at a time. Frames with column files are sliced from those arrays; others are
+    converted from the frame dicts.
+    """
+    stored = frames.columns() if hasattr(frames, "columns") else None
+    if stored is None:
+        for lo, chunk in iter_frame_chunks(frames, first, stop):
+            yield lo, chunk_columns(chunk, drivers, channels)
+        return
+
+    index = {code: j for j, code in enumerate(stored["drivers"])}
+    take = np.array([index.get(code, 0) for code in drivers], dtype=np.intp)
+    missing = np.array([code not in index for code in drivers], dtype=bool)
+    for lo in range(first, stop, CHUNK_FRAMES):
+        hi = min(lo + CHUNK_FRAMES, stop)
+        columns = {"t": np.array(stored["t"][lo:hi]), "leader_lap": np.array(stored["leader_lap"][lo:hi])}
+        for channel in channels:
+            values = stored[channel][lo:hi][:, take]
+            values[:, missing] = _missing(EXPORT_CHANNELS[channel])
+            columns[channel] = values
+        yield lo, columns
+
+def _write_csv(path, chunks, drivers, channels):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["frame", "t", "leader_lap", "driver"] + list(channels))
+        for first, columns in chunks:
+            for i in range(len(columns["t"])):
+                for j, code in enumerate(drivers):
+                    writer.writerow([first + i, columns["t"][i], columns["leader_lap"][i], code] +
+                                    [columns[channel][i, j].item() for channel in channels])
+
+def _write_npz(path, chunks, drivers, channels, n_frames, first_frame):
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp_export_")
+    try:
+        def open_array(name, dtype, shape):
+            return np.lib.format.open_memmap(os.path.join(tmp_dir, f"{name}.npy"), mode="w+",
+                                             dtype=dtype, shape=shape)
+
+        arrays = {
+            "t": open_array("t", np.float64, (n_frames,)),
+            "leader_lap": open_array("leader_lap", np.int16, (n_frames,)),
+        }
+        for channel in channels:
+            arrays[channel] = open_array(channel, EXPORT_CHANNELS[channel], (n_frames, len(drivers)))
+        for first, columns in chunks:
+            lo = first - first_frame
+            for name, values in columns.items():
+                arrays[name][lo:lo + len(values)] = values
+        for values in arrays.values():
+            values.flush()
+        arrays = None
+
+        np.save(os.path.join(tmp_dir, "frame.npy"), np.arange(first_frame, first_frame + n_frames))
+        np.save(os.path.join(tmp_dir, "drivers.npy"), np.array(drivers))
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for name in ["t", "frame", "leader_lap", "drivers"] + list(channels):
+                zf.write(os.path.join(tmp_dir, f"{name}.npy"), arcname=f"{name}.npy")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _write_arrow(path, chunks, drivers, channels):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RuntimeError("Arrow IPC export needs pyarrow (pip install pyarrow)")
+
+    fields = [("frame", pa.int64()), ("t", pa.float64()), ("leader_lap", pa.int16()), ("driver", pa.string())]
+    fields += [(channel, pa.from_numpy_dtype(EXPORT_CHANNELS[channel])) for channel in channels]
+    schema = pa.schema(fields)
+    n_drivers = len(drivers)
+
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for first, columns in chunks:
+            n = len(columns["t"])
+            # Long layout: frame-major, drivers repeated within each frame
+            batch = {
+                "frame": np.repeat(np.arange(first, first + n), n_drivers),
+                "t": np.repeat(columns["t"], n_drivers),
+                "leader_lap": np.repeat(columns["leader_lap"], n_drivers),
+                "driver": np.tile(np.array(drivers, dtype=object), n),
+            }
+            for channel in channels:
+                batch[channel] = columns[channel].reshape(-1)
+            writer.write_batch(pa.record_batch([batch[name] for name, _ in fields], schema=schema))
+
+def export_replay(data, path, fmt="csv", drivers=None, channels=None, start_time=None, end_time=None,
+                  from_lap=None, to_lap=None):
+    """
+    Exports race replay data (as stored in the race cache) to path. drivers and channels default
+    to every driver and every EXPORT_CHANNELS channel. Returns the number of frames written.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}', expected one of {', '.join(EXPORT_FORMATS)}")
+    frames = data.get("frames")
+    if frames is None:
+        raise ValueError("No race frames in this replay data (qualifying caches can't be exported)")
+
+    first, stop = frame_range(frames, start_time, end_time, from_lap, to_lap)
+    if drivers is None:
+        drivers = list(frames[first]["drivers"].keys()) if first < stop else []
+    channels = list(channels) if channels is not None else list(EXPORT_CHANNELS)
+    unknown = [channel for channel in channels if channel not in EXPORT_CHANNELS]
+    if unknown:
+        raise ValueError(f"Unknown channel(s): {', '.join(unknown)}")
+
+    chunks = column_chunks(frames, first, stop, drivers, channels)
+    if fmt == "csv":
+        _write_csv(path, chunks, drivers, channels)
+    elif fmt == "npz":
+        _write_npz(path, chunks, drivers, channels, stop - first, first)
+    else:
+        _write_arrow(path, chunks, drivers, channels)
+    return stop - first
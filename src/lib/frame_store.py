@@ -0,0 +1,312 @@
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Sequence
+
+import numpy as np
+
+# Time-partitioned frame store of the race replay cache.
+#
+# Frames are written in fixed-duration chunks, one file per chunk, next to the cache file:
+#
+#   computed_data/<cache name>_frames_<build>/
+#       chunk_00000.pkl, chunk_00001.pkl, ...    consecutive runs of frames (lists of frame dicts)
+#       column_t.npy, column_leader_lap.npy      the same frames as arrays, one per frame channel:
+#       column_<channel>.npy, column_drivers.npy "t" and "leader_lap" of shape (frames,), and
+#                                                (frames, drivers) per driver channel
+#
+# The column files let slices and exports index (memory-mapped) arrays instead of walking the
+# frame dicts; caches built before they existed have none, and ChunkedFrames.columns() is None.
+#
+# Every build of a cache writes a new directory (new_chunk_dir), so the chunks of the cache file
+# on disk stay untouched until the new cache file has replaced it; the builder then removes the
+# directories of earlier builds (remove_stale_chunk_dirs).
+#
+# The cache file only holds a ChunkedFrames, which pickles as a reference to that directory plus
+# its index (first frame and start time of every chunk, first frame of every leader lap). A
+# ChunkedFrames is a read-only sequence that loads chunks on first access, so the replay window
+# indexes it like the usual list and can open at any lap after reading only the chunks around
+# it. start_background_load() then reads the rest on a thread while playback runs.
+#
+# In memory budget mode only the most recently used chunks are kept in memory.
+
+# Frames per chunk: 30 s at the replay's 25 FPS (~10 MB in memory for 20 drivers). Small
+# chunks keep the hitch of unpickling one on the background thread short.
+CHUNK_FRAMES = 750
+# Chunks a ChunkedFrames keeps in memory in memory budget mode
+RESIDENT_CHUNKS = 4
+
+def get_chunk_dir(cache_path, build=None):
+    """Chunk directory of a cache build; without build, the unversioned name of older caches."""
+    base = os.path.splitext(cache_path)[0] + "_frames"
+    return f"{base}_{build}" if build else base
+
+def new_chunk_dir(cache_path):
+    """A chunk directory for a new build of the cache, not used by any earlier build."""
+    return get_chunk_dir(cache_path, f"{time.time_ns():x}")
+
+def find_chunk_dir(cache_path):
+    """Chunk directory the cache file references, or None (no cache file, or frames not chunked)."""
+    try:
+        data = load_replay_cache(cache_path)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+    frames = data.get("frames") if isinstance(data, dict) else None
+    return frames.directory if isinstance(frames, ChunkedFrames) else None
+
+def remove_stale_chunk_dirs(cache_path, keep):
+    """Removes the chunk directories of the cache's earlier builds, all but `keep`."""
+    parent = os.path.dirname(cache_path) or "."
+    base = os.path.basename(get_chunk_dir(cache_path))
+    keep = os.path.realpath(keep) if keep else None
+    for entry in os.scandir(parent):
+        if entry.is_dir() and (entry.name == base or entry.name.startswith(base + "_")) \
+                and os.path.realpath(entry.path) != keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+class ChunkedFrames(Sequence):
+    def __init__(self, directory, starts, length, resident_chunks=None, times=None, lap_starts=None,
+                 chunks=None):
+        self.directory = directory
+        # starts[k] is the index of the first frame of chunk k, times[k] its "t"
+        self.starts = list(starts)
+        self.times = list(times) if times is not None else None
+        # lap_starts[n] is the index of the first frame whose leader lap is >= n
+        self.lap_starts = list(lap_starts) if lap_starts is not None else None
+        self.length = length
+        # None keeps every chunk once loaded
+        self.resident_chunks = resident_chunks
+        self._chunks = OrderedDict(chunks or {})
+        self._lock = threading.Lock()
+        self._loader = None
+        self._columns = None
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def n_chunks(self):
+        return len(self.starts)
+
+    def _read_chunk(self, k):
+        with open(os.path.join(self.directory, f"chunk_{k:05d}.pkl"), "rb") as f:
+            return pickle.load(f)
+
+    def _chunk(self, k):
+        chunk = self._chunks.get(k)
+        if chunk is None:
+            # Read outside the lock: the background loader may be reading another chunk
+            chunk = self._read_chunk(k)
+            with self._lock:
+                chunk = self._chunks.setdefault(k, chunk)
+                if self.resident_chunks is not None:
+                    while len(self._chunks) > self.resident_chunks:
+                        self._chunks.popitem(last=False)
+        elif self.resident_chunks is not None:
+            with self._lock:
+                if k in self._chunks:
+                    self._chunks.move_to_end(k)
+        return chunk
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("frame index out of range")
+        k = bisect_right(self.starts, index) - 1
+        return self._chunk(k)[index - self.starts[k]]
+
+    def frame_for_lap(self, lap):
+        """Index of the first frame of the leader's lap `lap` (clamped to the race), without loading chunks."""
+        if self.lap_starts is None:
+            return find_lap_frame(self, lap)
+        lap = max(0, min(int(lap), len(self.lap_starts) - 1))
+        return self.lap_starts[lap]
+
+    def frame_at_time(self, t):
+        """Index of the last frame at or before replay time t (seconds); loads one chunk."""
+        if self.times is None or not self.length:
+            return 0
+        k = max(0, bisect_right(self.times, t) - 1)
+        chunk_times = [frame["t"] for frame in self._chunk(k)]
+        return self.starts[k] + max(0, bisect_right(chunk_times, t) - 1)
+
+    def iter_chunks(self, start=0, stop=None):
+        """
+        Yields (index of the first frame, list of frames) covering frames [start, stop), one
+        chunk at a time. Chunks not in memory are read without being kept, so a full pass holds
+        one chunk at a time.
+        """
+        stop = self.length if stop is None else min(stop, self.length)
+        if start >= stop:
+            return
+        for k in range(bisect_right(self.starts, start) - 1, self.n_chunks):
+            chunk_start = self.starts[k]
+            if chunk_start >= stop:
+                break
+            chunk = self._chunks.get(k)
+            if chunk is None:
+                chunk = self._read_chunk(k)
+            lo = max(start, chunk_start)
+            yield lo, chunk[lo - chunk_start:stop - chunk_start]
+
+    def columns(self):
+        """
+        {name: array} of the column files, memory-mapped, with "drivers" (driver codes of the
+        columns); None when the chunk directory has no column files.
+        """
+        if self._columns is None:
+            path = os.path.join(self.directory, "column_drivers.npy")
+            if not os.path.exists(path):
+                return None
+            columns = {"drivers": [str(code) for code in np.load(path)]}
+            for name in os.listdir(self.directory):
+                if name.startswith("column_") and name.endswith(".npy") and name != "column_drivers.npy":
+                    columns[name[len("column_"):-len(".npy")]] = np.load(os.path.join(self.directory, name),
+                                                                         mmap_mode="r")
+            self._columns = columns
+        return self._columns
+
+    def loaded_chunks(self):
+        return len(self._chunks)
+
+    def fully_loaded(self):
+        return len(self._chunks) >= self.n_chunks
+
+    def resident_frames(self):
+        """Upper bound on the number of frames held in memory at any time."""
+        if self.resident_chunks is None:
+            return self.length
+        return min(self.length, self.resident_chunks * CHUNK_FRAMES)
+
+    def start_background_load(self, start_index=0):
+        """
+        Reads every chunk not in memory yet on a daemon thread: the chunks from start_index to
+        the end first (playback runs forwards), then the earlier ones, nearest first.
+        Returns False (and does nothing) when only a few chunks are kept in memory.
+        """
+        if self.resident_chunks is not None or self.fully_loaded():
+            return False
+        if self._loader is not None:
+            return True
+        first = max(0, bisect_right(self.starts, start_index) - 1) if self.starts else 0
+        order = list(range(first, self.n_chunks)) + list(range(first - 1, -1, -1))
+
+        def load():
+            for k in order:
+                self._chunk(k)
+
+        self._loader = threading.Thread(target=load, name="frame-chunk-loader", daemon=True)
+        self._loader.start()
+        return True
+
+    def __getstate__(self):
+        return {"directory": self.directory, "starts": self.starts, "length": self.length,
+                "resident_chunks": self.resident_chunks, "times": self.times,
+                "lap_starts": self.lap_starts}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+# Caches written before frames were always chunked reference frames spilled in memory budget mode
+SpilledFrames = ChunkedFrames
+
+def load_replay_cache(cache_path):
+    """
+    Unpickles a replay cache file. Chunked frames are pointed at their chunk directory next to
+    that file, so a cache opened from another working directory (or copied elsewhere together
+    with its chunks) still finds them.
+    """
+    with open(cache_path, "rb") as f:
+        data = pickle.load(f)
+    frames = data.get("frames") if isinstance(data, dict) else None
+    if isinstance(frames, ChunkedFrames):
+        frames.directory = os.path.join(os.path.dirname(cache_path), os.path.basename(frames.directory))
+    return data
+
+def find_lap_frame(frames, lap):
+    """Index of the first frame whose leader lap is >= lap, for any sequence of frames (linear scan)."""
+    for i in range(len(frames)):
+        if frames[i].get("lap", 0) >= lap:
+            return i
+    return max(0, len(frames) - 1)
+
+class FrameChunkWriter:
+    """
+    Writes consecutive chunks of frames to a temporary directory and builds the time and lap
+    index as it goes; finish() renames it to `directory`, which must be new (see new_chunk_dir).
+    With keep_resident the chunks stay in memory, so the returned ChunkedFrames never reads back
+    what was just built. With drivers, every chunk comes with its columns (see add_chunk), which
+    are written to the column files of n_frames frames.
+    """
+
+    def __init__(self, directory, keep_resident=True, n_frames=None, drivers=None):
+        self.directory = directory
+        self.keep_resident = keep_resident
+        self.n_frames = n_frames
+        self.drivers = list(drivers) if drivers is not None else None
+        parent = os.path.dirname(directory) or "."
+        os.makedirs(parent, exist_ok=True)
+        self._tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".tmp_frames_")
+        self._starts = []
+        self._times = []
+        self._lap_starts = []
+        self._chunks = {}
+        self._columns = {}
+        self._length = 0
+
+    def _write_columns(self, columns):
+        for name, values in columns.items():
+            array = self._columns.get(name)
+            if array is None:
+                array = np.lib.format.open_memmap(os.path.join(self._tmp_dir, f"column_{name}.npy"), mode="w+",
+                                                  dtype=values.dtype, shape=(self.n_frames,) + values.shape[1:])
+                self._columns[name] = array
+            array[self._length:self._length + len(values)] = values
+
+    def add_chunk(self, frames, columns=None):
+        """
+        Writes the next chunk of frames; columns ({name: array}, as ChunkedFrames.columns()
+        returns them) holds the same frames when the writer has drivers.
+        """
+        if not frames:
+            return
+        if self.drivers is not None:
+            self._write_columns(columns)
+        k = len(self._starts)
+        with open(os.path.join(self._tmp_dir, f"chunk_{k:05d}.pkl"), "wb") as f:
+            pickle.dump(frames, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._starts.append(self._length)
+        self._times.append(float(frames[0]["t"]))
+        for i, frame in enumerate(frames):
+            # The leader's lap never goes down, so laps only need filling in when it changes
+            while len(self._lap_starts) <= frame["lap"]:
+                self._lap_starts.append(self._length + i)
+        if self.keep_resident:
+            self._chunks[k] = frames
+        self._length += len(frames)
+
+    def finish(self):
+        if self.drivers is not None:
+            if self._length != self.n_frames:
+                raise ValueError(f"Column files hold {self.n_frames} frames, {self._length} were written")
+            for array in self._columns.values():
+                array.flush()
+            self._columns = {}
+            np.save(os.path.join(self._tmp_dir, "column_drivers.npy"), np.array(self.drivers, dtype=str))
+        # Never replaces a directory: the chunks of the current cache file stay readable
+        os.rename(self._tmp_dir, self.directory)
+        return ChunkedFrames(self.directory, self._starts, self._length,
+                             resident_chunks=None if self.keep_resident else RESIDENT_CHUNKS,
+                             times=self._times, lap_starts=self._lap_starts, chunks=self._chunks)
+
+    def abort(self):
+        self._columns = {}
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
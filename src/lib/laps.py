@@ -0,0 +1,120 @@
+import numpy as np
+
+from src.lib.tyres import get_tyre_compound_int
+
+# Per-driver lap summary stored in the race replay cache under "lap_table".
+#
+# lap_table = {
+#   "fields": [...LAP_FIELDS...],
+#   "drivers": {
+#       "VER": {"lap_time": np.ndarray, "sector1": ..., ...},   # arrays of length total_laps + 1
+#       ...
+#   },
+# }
+#
+# Each array is indexed by lap number (index 0 is unused), so a lap lookup is a plain array
+# access with no pandas and no FastF1 session. Missing values are NaN for floats and -1 for ints.
+# Times are in seconds; lap_start/lap_end are on the replay timeline (0 = first frame) and
+# start_frame is the frame index at which the lap starts.
+
+LAP_FIELDS = {
+    "lap_time": np.float32,
+    "sector1": np.float32,
+    "sector2": np.float32,
+    "sector3": np.float32,
+    "lap_start": np.float32,
+    "lap_end": np.float32,
+    "start_frame": np.int32,
+    "compound": np.int8,
+    "tyre_life": np.int16,
+    "stint": np.int8,
+    "position": np.int8,
+    "pit_in": np.bool_,
+    "pit_out": np.bool_,
+    "personal_best": np.bool_,
+}
+
+def _empty_column(dtype, size):
+    if np.issubdtype(dtype, np.floating):
+        return np.full(size, np.nan, dtype=dtype)
+    if dtype == np.bool_:
+        return np.zeros(size, dtype=dtype)
+    return np.full(size, -1, dtype=dtype)
+
+def _seconds(series):
+    return series.dt.total_seconds().to_numpy(dtype=float)
+
+def build_lap_table(laps, driver_codes, t_offset, total_laps, fps):
+    """
+    Builds the lap table from a FastF1 Laps frame.
+    driver_codes maps driver numbers to abbreviations; t_offset is the session time (seconds)
+    of the first replay frame.
+    """
+    size = int(total_laps) + 1
+    table = {"fields": list(LAP_FIELDS), "drivers": {}}
+
+    for driver_no, code in driver_codes.items():
+        driver_laps = laps[laps["DriverNumber"] == driver_no]
+        columns = {name: _empty_column(dtype, size) for name, dtype in LAP_FIELDS.items()}
+        table["drivers"][code] = columns
+        if driver_laps.empty:
+            continue
+
+        lap_numbers = driver_laps["LapNumber"].to_numpy(dtype=float)
+        valid = ~np.isnan(lap_numbers) & (lap_numbers >= 1) & (lap_numbers < size)
+        idx = lap_numbers[valid].astype(int)
+
+        def _put(name, values):
+            column = columns[name]
+            values = np.asarray(values)[valid]
+            if np.issubdtype(column.dtype, np.integer):
+                # NaN -> -1 for integer columns
+                values = np.where(np.isnan(values.astype(float)), -1, values)
+            column[idx] = values.astype(column.dtype)
+
+        _put("lap_time", _seconds(driver_laps["LapTime"]))
+        _put("sector1", _seconds(driver_laps["Sector1Time"]))
+        _put("sector2", _seconds(driver_laps["Sector2Time"]))
+        _put("sector3", _seconds(driver_laps["Sector3Time"]))
+
+        lap_start = _seconds(driver_laps["LapStartTime"]) - t_offset
+        _put("lap_start", lap_start)
+        _put("lap_end", _seconds(driver_laps["Time"]) - t_offset)
+        _put("start_frame", np.where(np.isnan(lap_start), np.nan, np.maximum(np.round(lap_start * fps), 0)))
+
+        compounds = [get_tyre_compound_int(str(c)) if isinstance(c, str) else -1 for c in driver_laps["Compound"]]
+        _put("compound", np.asarray(compounds, dtype=float))
+        _put("tyre_life", driver_laps["TyreLife"].to_numpy(dtype=float))
+        _put("stint", driver_laps["Stint"].to_numpy(dtype=float))
+        _put("position", driver_laps["Position"].to_numpy(dtype=float))
+        _put("pit_in", driver_laps["PitInTime"].notna().to_numpy())
+        _put("pit_out", driver_laps["PitOutTime"].notna().to_numpy())
+        _put("personal_best", driver_laps["IsPersonalBest"].fillna(False).to_numpy(dtype=bool))
+
+    return table
+
+def get_lap(lap_table, code, lap_number):
+    """
+    Returns {field: value} for one lap of one driver, or None if the lap isn't in the table.
+    Missing values come back as None.
+    """
+    if not lap_table:
+        return None
+    columns = lap_table["drivers"].get(code)
+    if columns is None or not 1 <= lap_number < len(columns["lap_time"]):
+        return None
+
+    lap = {}
+    for name, column in columns.items():
+        value = column[lap_number].item()
+        if (isinstance(value, float) and np.isnan(value)) or (isinstance(value, int) and value == -1
+                                                               and column.dtype != np.bool_):
+            value = None
+        lap[name] = value
+    return lap
+
+def get_lap_column(lap_table, code, field):
+    """The whole column of one field for a driver (indexed by lap number), or None."""
+    if not lap_table or code not in lap_table["drivers"]:
+        return None
+    return lap_table["drivers"][code][field]
@@ -0,0 +1,121 @@
+import os
+import sys
+
+from src.lib.frame_store import CHUNK_FRAMES, RESIDENT_CHUNKS
+from src.lib.profiler import current_rss_mb, peak_rss_mb
+
+# Memory budget mode for the race telemetry pipeline.
+#
+# With `--memory-limit MB` (or F1_MEMORY_LIMIT_MB), get_race_telemetry estimates the peak RSS of
+# each stage before it starts and adapts when an estimate goes over the budget, in this order:
+#   1. fewer Pool workers (every worker unpickles its own copy of the session)
+#   2. compact dtypes: resampled channels as float32 instead of float64
+#   3. keep only a few frame chunks in memory instead of every chunk written to disk
+# The estimates are deliberately simple (sizes of the loaded session tables plus per-sample
+# constants) and are printed, so they can be compared against a --profile report.
+
+MEMORY_LIMIT_ENV = "F1_MEMORY_LIMIT_MB"
+
+# Interpreter + numpy/pandas/fastf1 imports of a Pool worker
+WORKER_BASE_MB = 150
+# Bytes per telemetry sample held by a worker while it builds a driver's channels (12 float64
+# channels, plus the per-lap lists and the concatenated copies)
+WORKER_SAMPLE_BYTES = 12 * 8 * 3
+# Resampled channels per driver
+RESAMPLED_CHANNELS = 11
+# Measured size of one driver entry of one frame (dict of 12 Python scalars), and the frame itself
+FRAME_DRIVER_BYTES = 900
+FRAME_BYTES = 400
+# Extra memory of pickling the frames for the cache (the pickler's memo of every object)
+SAVE_OVERHEAD = 0.3
+
+MB = 1024 * 1024
+
+def get_memory_limit_mb():
+    """The memory budget in MB from --memory-limit or the environment, or None when not set."""
+    value = None
+    if "--memory-limit" in sys.argv:
+        idx = sys.argv.index("--memory-limit") + 1
+        if idx < len(sys.argv):
+            value = sys.argv[idx]
+    else:
+        value = os.environ.get(MEMORY_LIMIT_ENV)
+    try:
+        return float(value) if value else None
+    except ValueError:
+        print(f"Ignoring invalid memory limit: {value}")
+        return None
+
+def _table_mb(df):
+    try:
+        return df.memory_usage(deep=False).sum() / MB
+    except AttributeError:
+        return 0.0
+
+def session_footprint(session, drivers, fps):
+    """Returns (session MB, {driver_no: telemetry samples}, estimated replay frames)."""
+    size = _table_mb(session.laps)
+    samples = {}
+    for driver_no in drivers:
+        car = session.car_data.get(driver_no)
+        pos = session.pos_data.get(driver_no)
+        size += _table_mb(car) + _table_mb(pos)
+        samples[driver_no] = (len(car) if car is not None else 0) + (len(pos) if pos is not None else 0)
+
+    laps = session.laps
+    n_frames = 0
+    if not laps.empty:
+        duration = (laps["Time"].max() - laps["LapStartTime"].min()).total_seconds()
+        if duration == duration:  # not NaN
+            n_frames = int(duration * fps)
+    return size, samples, n_frames
+
+def estimate_stages(base_mb, session_mb, samples, n_frames, workers, compact=False, spill=False):
+    """Estimated peak RSS (MB) of each pipeline stage, summed over the parent and its workers."""
+    n_drivers = max(1, len(samples))
+    max_samples = max(samples.values()) if samples else 0
+    # Shared memory blocks the driver workers write into: every driver's channels as float64
+    shared_mb = sum(samples.values()) * 12 * 8 / MB
+
+    worker_mb = WORKER_BASE_MB + session_mb + max_samples * WORKER_SAMPLE_BYTES / MB
+    resampled_mb = n_drivers * RESAMPLED_CHANNELS * n_frames * (4 if compact else 8) / MB
+    resident = min(n_frames, RESIDENT_CHUNKS * CHUNK_FRAMES) if spill else n_frames
+    frames_mb = resident * (n_drivers * FRAME_DRIVER_BYTES + FRAME_BYTES) / MB
+
+    return {
+        "drivers": base_mb + shared_mb + workers * worker_mb,
+        "resample": base_mb + shared_mb + resampled_mb,
+        "frames": base_mb + resampled_mb + frames_mb,
+        "save": base_mb + resampled_mb + frames_mb * (1 + SAVE_OVERHEAD),
+    }
+
+def plan_race_pipeline(session, drivers, workers, budget_mb, fps):
+    """
+    Picks the Pool size, dtypes and frame storage that keep every stage under budget_mb.
+    Returns {"workers", "compact", "spill", "estimates"}.
+    """
+    base_mb = current_rss_mb() or peak_rss_mb() or 0.0
+    session_mb, samples, n_frames = session_footprint(session, drivers, fps)
+    plan = {"workers": workers, "compact": False, "spill": False}
+
+    def estimates():
+        return estimate_stages(base_mb, session_mb, samples, n_frames, plan["workers"],
+                               compact=plan["compact"], spill=plan["spill"])
+
+    while plan["workers"] > 1 and estimates()["drivers"] > budget_mb:
+        plan["workers"] -= 1
+    if max(estimates()[stage] for stage in ("resample", "frames", "save")) > budget_mb:
+        plan["compact"] = True
+    if max(estimates()[stage] for stage in ("frames", "save")) > budget_mb:
+        plan["spill"] = True
+    plan["estimates"] = {stage: round(mb) for stage, mb in estimates().items()}
+
+    print(f"Memory budget {budget_mb:.0f} MB: {plan['workers']} worker(s), "
+          f"{'compact' if plan['compact'] else 'full'} dtypes, "
+          f"frames {'read from disk on demand' if plan['spill'] else 'in memory'}")
+    print("Estimated peak RSS per stage: " +
+          ", ".join(f"{stage} {mb} MB" for stage, mb in plan["estimates"].items()))
+    over = [stage for stage, mb in plan["estimates"].items() if mb > budget_mb]
+    if over:
+        print(f"Warning: still over the memory budget in: {', '.join(over)}")
+    return plan
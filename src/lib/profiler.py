@@ -0,0 +1,299 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime
+
+from src.lib import progress
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Pipeline stage profiler (main.py --profile).
+#
+# The profiler is a progress sink: every progress.report() stage change closes the previous stage
+# and opens the next one, so the stages are the ones the launchers already show (load_session,
+# drivers, resample, frames, save, layout, ...). Stages are tracked per reporting thread, so a
+# background thread (the circuit layout of load_replay_data) gets its own track instead of
+# splitting the main thread's stages; end_thread_stage() closes a thread's last stage when its
+# work is done. For each stage it records wall time, CPU time of this process, of the stage's
+# thread and of reaped child processes, and RSS: at the start and end of the stage and the peak
+# within it, from a sampler thread that reads the RSS every RSS_SAMPLE_INTERVAL_S (getrusage
+# only has the peak of the whole process so far); Pool worker spans get the same per-span peak. Pool workers time themselves with WorkerTimer
+# and send the result back with their data; the parent adds them with record_worker(). When the
+# replay window is ready (or at exit) it writes:
+#
+#   computed_data/profiles/<timestamp>/
+#       report.json    stages and workers with wall/CPU time and memory
+#       trace.json     Chrome trace-event timeline (chrome://tracing or ui.perfetto.dev),
+#                      one track for the main process and one per Pool worker process
+#       main.prof      cProfile dump of the main process (with --cprofile)
+
+PROFILE_DIR = os.path.join("computed_data", "profiles")
+RSS_SAMPLE_INTERVAL_S = 0.05
+
+_active = None
+
+def peak_rss_mb():
+    """High-water mark of this process' RSS, or None where getrusage isn't available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _children_cpu_s():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def _max_rss(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+# Objects with a sample_rss(rss_mb) method, fed by one sampler thread per process. Weak, so a
+# WorkerTimer that is never stopped (a worker that returns early or raises) simply drops out.
+_rss_watchers = weakref.WeakSet()
+_rss_lock = threading.Lock()
+_rss_sampler_pid = None
+
+def _sample_rss_loop():
+    while True:
+        time.sleep(RSS_SAMPLE_INTERVAL_S)
+        rss = current_rss_mb()
+        if rss is None:
+            continue
+        with _rss_lock:
+            watchers = list(_rss_watchers)
+        for watcher in watchers:
+            watcher.sample_rss(rss)
+
+def _watch_rss(watcher):
+    global _rss_sampler_pid
+    with _rss_lock:
+        _rss_watchers.add(watcher)
+        if _rss_sampler_pid != os.getpid():
+            _rss_sampler_pid = os.getpid()
+            threading.Thread(target=_sample_rss_loop, name="rss-sampler", daemon=True).start()
+
+def _reset_rss_after_fork():
+    # The sampler thread doesn't survive a fork and may have held the lock: forked Pool workers
+    # start over with their own sampler
+    global _rss_watchers, _rss_lock, _rss_sampler_pid
+    _rss_watchers = weakref.WeakSet()
+    _rss_lock = threading.Lock()
+    _rss_sampler_pid = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_rss_after_fork)
+
+def _unwatch_rss(watcher):
+    with _rss_lock:
+        _rss_watchers.discard(watcher)
+
+class WorkerTimer:
+    """Times one unit of work inside a Pool worker. stop() returns a picklable span dict."""
+
+    def __init__(self, name, label=None):
+        self.name = name
+        self.label = label
+        self.started = time.time()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        # Workers are reused for many units, so their peak RSS is sampled per unit as well
+        self._peak_rss = current_rss_mb()
+        _watch_rss(self)
+
+    def sample_rss(self, rss):
+        self._peak_rss = _max_rss(self._peak_rss, rss)
+
+    def stop(self):
+        _unwatch_rss(self)
+        return {
+            "name": self.name,
+            "label": self.label,
+            "pid": os.getpid(),
+            "started": self.started,
+            "wall_s": round(time.perf_counter() - self._wall, 4),
+            "cpu_s": round(time.process_time() - self._cpu, 4),
+            "peak_rss_mb": _max_rss(self._peak_rss, current_rss_mb()),
+        }
+
+class StageProfiler:
+    def __init__(self, output_dir, cprofile=False):
+        self.output_dir = output_dir
+        self.started = time.time()
+        self.stages = []
+        self.workers = []
+        # Open stage of every thread that reported one, by thread name
+        self._current = {}
+        self._lock = threading.Lock()
+        self._finished = False
+        self._cprofile = None
+        if cprofile:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+
+    def start(self):
+        self._open("startup", None, threading.current_thread().name)
+        _watch_rss(self)
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        progress.add_sink(self._on_event)
+        atexit.register(self.finish)
+
+    def _open(self, name, message, thread):
+        self._current[thread] = {
+            "name": name,
+            "thread": thread,
+            "message": message,
+            "started": time.time(),
+            "_wall": time.perf_counter(),
+            "_cpu": time.process_time(),
+            # Opened on the stage's own thread (progress sinks run on the reporting thread)
+            "_thread_cpu": time.thread_time(),
+            "_children_cpu": _children_cpu_s(),
+            "rss_start_mb": current_rss_mb(),
+        }
+        self._current[thread]["_peak_rss"] = self._current[thread]["rss_start_mb"]
+
+    def sample_rss(self, rss):
+        with self._lock:
+            for stage in self._current.values():
+                stage["_peak_rss"] = _max_rss(stage["_peak_rss"], rss)
+
+    def _close(self, thread):
+        stage = self._current.pop(thread, None)
+        if stage is None:
+            return
+        stage["wall_s"] = round(time.perf_counter() - stage.pop("_wall"), 4)
+        stage["cpu_s"] = round(time.process_time() - stage.pop("_cpu"), 4)
+        # Thread CPU time can only be read on the thread itself; stages closed by finish() on
+        # another thread have none
+        thread_cpu = stage.pop("_thread_cpu")
+        on_thread = threading.current_thread().name == thread
+        stage["thread_cpu_s"] = round(time.thread_time() - thread_cpu, 4) if on_thread else None
+        stage["children_cpu_s"] = round(_children_cpu_s() - stage.pop("_children_cpu"), 4)
+        stage["rss_end_mb"] = current_rss_mb()
+        stage["peak_rss_mb"] = _max_rss(stage.pop("_peak_rss"), stage["rss_end_mb"])
+        self.stages.append(stage)
+
+    def _on_event(self, event):
+        stage = event.get("stage")
+        if stage == "ready":
+            self.finish()
+            return
+        thread = event.get("thread") or threading.current_thread().name
+        with self._lock:
+            if self._finished:
+                return
+            current = self._current.get(thread)
+            if current is None or stage != current["name"]:
+                self._close(thread)
+                self._open(stage, event.get("message"), thread)
+
+    def end_thread_stage(self):
+        """Closes the open stage of the calling thread (its work is done)."""
+        with self._lock:
+            if not self._finished:
+                self._close(threading.current_thread().name)
+
+    def record_worker(self, span):
+        if span:
+            with self._lock:
+                self.workers.append(span)
+
+    def _trace_events(self):
+        main_pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": main_pid, "tid": 0, "args": {"name": "main"}}]
+        # One track per reporting thread of the main process, the main thread first
+        threads = sorted({stage["thread"] for stage in self.stages}, key=lambda name: name != "MainThread")
+        tids = {thread: tid for tid, thread in enumerate(threads)}
+        for thread, tid in tids.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": main_pid, "tid": tid, "args": {"name": thread}})
+        for stage in self.stages:
+            events.append({
+                "name": stage["name"], "cat": "stage", "ph": "X", "pid": main_pid, "tid": tids[stage["thread"]],
+                "ts": round((stage["started"] - self.started) * 1e6),
+                "dur": round(stage["wall_s"] * 1e6),
+                "args": {k: stage[k] for k in ("message", "cpu_s", "thread_cpu_s", "children_cpu_s", "peak_rss_mb")},
+            })
+        for pid in sorted({span["pid"] for span in self.workers}):
+            events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                           "args": {"name": f"worker {pid}"}})
+        for span in self.workers:
+            events.append({
+                "name": f"{span['name']} {span['label']}" if span.get("label") else span["name"],
+                "cat": "worker", "ph": "X", "pid": span["pid"], "tid": 0,
+                "ts": round((span["started"] - self.started) * 1e6),
+                "dur": round(span["wall_s"] * 1e6),
+                "args": {k: span[k] for k in ("cpu_s", "peak_rss_mb")},
+            })
+        return events
+
+    def finish(self):
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+            for thread in list(self._current):
+                self._close(thread)
+        _unwatch_rss(self)
+        progress.remove_sink(self._on_event)
+        if self._cprofile is not None:
+            self._cprofile.disable()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        report = {
+            "argv": sys.argv[1:],
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "wall_s": round(time.time() - self.started, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+            "workers": self.workers,
+        }
+        with open(os.path.join(self.output_dir, "report.json"), "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        with open(os.path.join(self.output_dir, "trace.json"), "w") as f:
+            json.dump({"traceEvents": self._trace_events(), "displayTimeUnit": "ms"}, f)
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(os.path.join(self.output_dir, "main.prof"))
+
+        print(f"Profile written to {self.output_dir}")
+        for stage in self.stages:
+            thread = f"  [{stage['thread']}]" if stage["thread"] != "MainThread" else ""
+            print(f"  {stage['name']:<14} {stage['wall_s']:8.2f}s wall  {stage['cpu_s']:8.2f}s cpu{thread}")
+
+def enable(output_dir=None, cprofile=False):
+    """Starts profiling this process. Returns the profiler."""
+    global _active
+    if _active is None:
+        if output_dir is None:
+            output_dir = os.path.join(PROFILE_DIR, datetime.now().strftime("%Y%m%d-%H%M%S"))
+        _active = StageProfiler(output_dir, cprofile=cprofile)
+        _active.start()
+    return _active
+
+def record_worker(span):
+    """Adds a Pool worker span (from WorkerTimer.stop()) to the active profile, if any."""
+    if _active is not None:
+        _active.record_worker(span)
+
+def end_thread_stage():
+    """Closes the calling thread's open stage in the active profile, if any."""
+    if _active is not None:
+        _active.end_thread_stage()
@@ -0,0 +1,187 @@
+import contextvars
+import json
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+# Structured progress events for the data pipeline.
+#
+# Pipeline code calls report(stage, current, total) and every registered sink receives an event:
+#   {"stage": "drivers", "current": 5, "total": 20, "eta": 12.4, "message": None, "time": ...,
+#    "thread": "MainThread"}
+# A replay process started with `--progress host:port` sends its events as JSON lines over a
+# local socket to the ProgressServer of the launcher (GUI or CLI). The "ready" stage is sent
+# once the replay window is up.
+#
+# Sinks added with add_sink() receive the events of the whole process. A sink entered with
+# scoped_sink() only receives the events reported in its context: by the thread that entered it
+# and by threads started with run_in_context(), e.g. the events of one service request.
+
+STAGE_LABELS = {
+    "speculative": "Finishing background load",
+    "load_session": "Loading FastF1 session",
+    "drivers": "Processing drivers",
+    "resample": "Resampling telemetry",
+    "frames": "Building frames",
+    "save": "Saving replay cache",
+    "layout": "Building circuit layout",
+    "window": "Opening replay window",
+    "ready": "Ready",
+}
+
+_sinks = []
+_stage_started = {}
+_lock = threading.Lock()
+_scoped_sinks = contextvars.ContextVar("progress_scoped_sinks", default=())
+
+def add_sink(sink):
+    """Registers a callable that receives every progress event (a dict)."""
+    with _lock:
+        _sinks.append(sink)
+
+def remove_sink(sink):
+    with _lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+
+def clear_sinks():
+    """Removes every process-wide sink and forgets the stage start times."""
+    with _lock:
+        _sinks.clear()
+        _stage_started.clear()
+
+@contextmanager
+def scoped_sink(sink):
+    """Sends the events reported in the current context to sink while the block runs."""
+    token = _scoped_sinks.set(_scoped_sinks.get() + (sink,))
+    try:
+        yield sink
+    finally:
+        _scoped_sinks.reset(token)
+
+def run_in_context(target, *args, **kwargs):
+    """
+    Wraps target so that it runs in a copy of the caller's context, for threading.Thread: the
+    thread's events then reach the caller's scoped sinks.
+    """
+    context = contextvars.copy_context()
+    return lambda: context.run(target, *args, **kwargs)
+
+def report(stage, current=None, total=None, message=None):
+    """Emits a progress event to all sinks. Does nothing when no sink is registered."""
+    with _lock:
+        sinks = list(_sinks) + list(_scoped_sinks.get())
+        if not sinks:
+            return
+        now = time.time()
+        # A stage (re)starts with its first event or an explicit current=0/None
+        if current in (None, 0) or stage not in _stage_started:
+            _stage_started[stage] = now
+        started = _stage_started[stage]
+
+    eta = None
+    if current and total:
+        eta = (now - started) / current * (total - current)
+
+    event = {
+        "stage": stage,
+        "current": current,
+        "total": total,
+        "eta": round(eta, 1) if eta is not None else None,
+        "message": message,
+        "time": now,
+        # Stages of different threads overlap (e.g. the layout thread of load_replay_data)
+        "thread": threading.current_thread().name,
+    }
+    for sink in sinks:
+        try:
+            sink(event)
+        except Exception:
+            # progress must never break the pipeline
+            pass
+
+def describe(event):
+    """Human readable one-liner for an event, e.g. 'Processing drivers (5/20, ETA 12s)'."""
+    text = STAGE_LABELS.get(event.get("stage"), str(event.get("stage")))
+    details = []
+    if event.get("current") is not None and event.get("total"):
+        details.append(f"{event['current']}/{event['total']}")
+    if event.get("eta") is not None:
+        details.append(f"ETA {event['eta']:.0f}s")
+    if details:
+        text += f" ({', '.join(details)})"
+    if event.get("message"):
+        text += f" - {event['message']}"
+    return text
+
+class SocketSink:
+    """Sends progress events as JSON lines to a ProgressServer at 'host:port'."""
+    def __init__(self, address, timeout=5.0):
+        host, port = address.rsplit(":", 1)
+        self._sock = socket.create_connection((host, int(port)), timeout=timeout)
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            self._sock.sendall((json.dumps(event) + "\n").encode("utf-8"))
+
+    def close(self):
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+def open_sink(address):
+    """SocketSink to a launcher's progress channel, or None on failure (not registered)."""
+    try:
+        return SocketSink(address)
+    except (OSError, ValueError) as e:
+        print(f"Could not connect to progress channel {address}: {e}")
+        return None
+
+def connect(address):
+    """Connects this process's progress events to a launcher. Returns the sink, or None on failure."""
+    sink = open_sink(address)
+    if sink is not None:
+        add_sink(sink)
+    return sink
+
+class ProgressServer:
+    """
+    Listens on a local socket and calls `on_event(event)` for every event received from
+    replay processes. `on_event` runs on a background thread.
+    """
+    def __init__(self, on_event, host="127.0.0.1"):
+        self.on_event = on_event
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.bind((host, 0))
+        self._sock.listen()
+        self.address = f"{host}:{self._sock.getsockname()[1]}"
+        self._closed = False
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._closed:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            with conn, conn.makefile("r", encoding="utf-8") as stream:
+                try:
+                    for line in stream:
+                        try:
+                            event = json.loads(line)
+                        except ValueError:
+                            continue
+                        self.on_event(event)
+                except OSError:
+                    pass
+
+    def close(self):
+        self._closed = True
+        try:
+            self._sock.close()
+        except OSError:
+            pass
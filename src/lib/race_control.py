@@ -0,0 +1,109 @@
+import numpy as np
+
+# Race control messages (flags, penalties, investigations, DRS, ...) of a race, parsed once from
+# session.race_control_messages while the cache is built and stored in the race cache under
+# "race_control" (build_race_control):
+#
+#   race_control = {
+#       "t": (messages,) float64          # replay time of each message, sorted
+#       "lap": (messages,) int16          # lap given with the message (-1: none)
+#       "sector": (messages,) int8        # track sector of sector flags (-1: none)
+#       "category", "flag", "scope", "driver", "message": lists of str ("" when not given)
+#   }
+#
+# "driver" is the code of the driver a message is about (from its racing number). Lookups at a
+# replay time bisect "t", so the messages shown for any frame cost O(log n) however the replay
+# is scrubbed. A message stays on screen for MESSAGE_DISPLAY_S of replay time.
+
+MESSAGE_DISPLAY_S = 20.0
+
+_TEXT_FIELDS = {"category": "Category", "flag": "Flag", "scope": "Scope", "message": "Message"}
+
+def _empty_race_control():
+    race_control = {
+        "t": np.zeros(0, dtype=np.float64),
+        "lap": np.zeros(0, dtype=np.int16),
+        "sector": np.zeros(0, dtype=np.int8),
+        "driver": [],
+    }
+    race_control.update({field: [] for field in _TEXT_FIELDS})
+    return race_control
+
+def _text(values):
+    import pandas as pd
+
+    return ["" if pd.isna(value) else str(value) for value in values]
+
+def _numbers(df, column, dtype):
+    import pandas as pd
+
+    if column not in df:
+        return np.full(len(df), -1, dtype=dtype)
+    values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+    return np.where(np.isnan(values), -1, values).astype(dtype)
+
+def build_race_control(session, t_offset, driver_codes):
+    """
+    Time-sorted race control messages of a FastF1 session.
+    t_offset is the session time (seconds) of the first replay frame; driver_codes maps driver
+    numbers to abbreviations.
+    """
+    try:
+        df = session.race_control_messages
+    except Exception as e:
+        print(f"Race control messages could not be loaded: {e}")
+        return _empty_race_control()
+    if df is None or df.empty or "Time" not in df:
+        return _empty_race_control()
+
+    try:
+        # Message times are UTC dates; session time counts from t0_date
+        t = (df["Time"] - session.t0_date).dt.total_seconds().to_numpy() - t_offset
+        order = np.argsort(t, kind="stable")
+        df = df.iloc[order]
+        t = t[order]
+        keep = ~np.isnan(t)
+        df = df[keep]
+
+        numbers = _text(df["RacingNumber"]) if "RacingNumber" in df else [""] * len(df)
+        race_control = {
+            "t": t[keep].astype(np.float64),
+            "lap": _numbers(df, "Lap", np.int16),
+            "sector": _numbers(df, "Sector", np.int8),
+            "driver": [driver_codes.get(number.split(".")[0], "") if number else "" for number in numbers],
+        }
+        for field, column in _TEXT_FIELDS.items():
+            race_control[field] = _text(df[column]) if column in df else [""] * len(df)
+    except Exception as e:
+        print(f"Race control messages could not be processed: {e}")
+        return _empty_race_control()
+    return race_control
+
+def message_range(race_control, t, display_s=MESSAGE_DISPLAY_S):
+    """Indices [first, stop) of the messages on screen at replay time t (issued in the last display_s)."""
+    if not race_control or not len(race_control["t"]):
+        return 0, 0
+    times = race_control["t"]
+    stop = int(np.searchsorted(times, t, side="right"))
+    first = int(np.searchsorted(times, t - display_s, side="right"))
+    return first, stop
+
+def active_messages(race_control, t, display_s=MESSAGE_DISPLAY_S, limit=None):
+    """
+    Messages on screen at replay time t, newest first, as dicts with t, lap, sector, driver and
+    the text fields. limit caps the number returned.
+    """
+    first, stop = message_range(race_control, t, display_s)
+    if limit is not None:
+        first = max(first, stop - limit)
+    messages = []
+    for i in range(stop - 1, first - 1, -1):
+        message = {
+            "t": float(race_control["t"][i]),
+            "lap": int(race_control["lap"][i]),
+            "sector": int(race_control["sector"][i]),
+            "driver": race_control["driver"][i],
+        }
+        message.update({field: race_control[field][i] for field in _TEXT_FIELDS})
+        messages.append(message)
+    return messages
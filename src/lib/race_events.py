@@ -0,0 +1,392 @@
+from typing import List, Optional
+
+import numpy as np
+
+from src.lib.export import chunk_columns, iter_frame_chunks
+from src.lib.time import format_time
+
+# Race events shown on the replay's progress bar (and returned by ReplayDataset.events()),
+# extracted from the race order, lap table and track statuses of the race cache. No arcade
+# imports here, so headless users of the replay data get the same events as the window.
+#
+# The race order is a compact per-frame view of the race, stored in the cache under
+# "race_order" (build_race_order, from the resampled telemetry while the cache is built):
+#
+#   race_order = {
+#       "drivers": ["VER", "NOR", ...],       # column order of the matrices below
+#       "order": (frames, drivers) int8       # order[i, p]: driver index in position p + 1 at frame i
+#       "lap": (frames, drivers) int16        # lap of each driver at frame i (-1: no data)
+#       "pit_frames": {code: int32 array}     # frames where the driver's tyre compound changes
+#       "last_moving": (drivers,) int32       # last frame at which each car was still moving
+#       "last_key", "last_tyre": (drivers,)   # state at the last frame, to extend the order
+#   }
+#
+# Cars are ordered as in the frames: by lap, then distance. Every event is detected on all
+# frames with array operations, so a whole race takes milliseconds. Caches built before the
+# race order existed (and live frames) get it from the frames with race_order_from_frames().
+
+EVENT_DNF = "dnf"
+EVENT_LAP = "lap"
+EVENT_YELLOW_FLAG = "yellow_flag"
+EVENT_RED_FLAG = "red_flag"
+EVENT_SAFETY_CAR = "safety_car"
+EVENT_VSC = "vsc"
+EVENT_LEADER_CHANGE = "leader_change"
+EVENT_OVERTAKE = "overtake"
+EVENT_PIT_STOP = "pit_stop"
+EVENT_FASTEST_LAP = "fastest_lap"
+
+# Replay frame rate (f1_data.FPS; not imported, so this module stays free of FastF1)
+FPS = 25
+# A change of order only counts once it has held this long: cars side by side swap places in
+# the resampled telemetry for a few frames without anyone passing
+MIN_HOLD_FRAMES = 2 * FPS
+# Position changes this close to a pit stop (before, after) come from the stop, not from passing
+PIT_WINDOW_S = (20.0, 40.0)
+# A car that stopped moving this long before the winner finished retired
+RETIRE_MARGIN_S = 30.0
+
+# Race progress sort key: lap first, then distance (distances stay far below this)
+_LAP_WEIGHT = 1e7
+
+def _progress_key(lap, dist):
+    key = np.round(lap) * _LAP_WEIGHT + dist
+    return np.where(np.isnan(key), -np.inf, key)
+
+def _empty_race_order(drivers):
+    n = len(drivers)
+    return {
+        "drivers": list(drivers),
+        "order": np.zeros((0, n), dtype=np.int8),
+        "lap": np.zeros((0, n), dtype=np.int16),
+        "pit_frames": {code: np.zeros(0, dtype=np.int32) for code in drivers},
+        "last_moving": np.full(n, -1, dtype=np.int32),
+        "last_key": None,
+        "last_tyre": None,
+    }
+
+def extend_race_order(race_order, lap, dist, tyre=None):
+    """
+    Appends frames to a race order. lap, dist and tyre are (new frames, drivers) arrays in the
+    column order of race_order["drivers"], NaN where a driver has no data.
+    """
+    lap = np.asarray(lap, dtype=np.float64)
+    if not len(lap):
+        return race_order
+    key = _progress_key(lap, np.asarray(dist, dtype=np.float64))
+    first = len(race_order["order"])
+
+    # Stable sort on the negated key: equal keys keep the driver order, like the frames' sort
+    order = np.argsort(-key, axis=1, kind="stable").astype(np.int8)
+    laps = np.where(np.isnan(lap), -1, np.round(lap)).astype(np.int16)
+
+    # Moving: progress went up since the previous frame
+    previous = race_order["last_key"]
+    with_previous = np.vstack([previous[None], key]) if previous is not None else key
+    moving = with_previous[1:] > with_previous[:-1]
+    offset = first if previous is not None else 1
+    last_moving = race_order["last_moving"].copy()
+    rows = np.flatnonzero(moving.any(axis=0))
+    if len(rows):
+        last_row = len(moving) - 1 - np.argmax(moving[::-1, rows], axis=0)
+        last_moving[rows] = last_row + offset
+
+    pit_frames = dict(race_order["pit_frames"])
+    last_tyre = race_order.get("last_tyre")
+    if tyre is not None:
+        tyre = np.round(np.asarray(tyre, dtype=np.float64))
+        with_previous = np.vstack([last_tyre[None], tyre]) if last_tyre is not None else tyre
+        changed = ((with_previous[1:] != with_previous[:-1]) & (with_previous[1:] >= 0)
+                   & (with_previous[:-1] >= 0))
+        for j, code in enumerate(race_order["drivers"]):
+            frames = np.flatnonzero(changed[:, j])
+            if len(frames):
+                pit_frames[code] = np.concatenate([pit_frames[code], (frames + offset).astype(np.int32)])
+        last_tyre = tyre[-1]
+
+    return {
+        "drivers": race_order["drivers"],
+        "order": np.concatenate([race_order["order"], order]),
+        "lap": np.concatenate([race_order["lap"], laps]),
+        "pit_frames": pit_frames,
+        "last_moving": last_moving,
+        "last_key": key[-1],
+        "last_tyre": last_tyre,
+    }
+
+def build_race_order(drivers, lap, dist, tyre=None):
+    """Race order of a whole race from (frames, drivers) lap, distance and tyre arrays."""
+    return extend_race_order(_empty_race_order(drivers), lap, dist, tyre)
+
+def race_order_from_frames(frames, race_order=None):
+    """
+    Race order from the frames themselves (one pass over every frame). With the race order of
+    an earlier, shorter state of the same frames (live mode), only the new frames are read.
+    """
+    n_frames = len(frames)
+    if not n_frames:
+        return race_order
+    drivers = list(frames[n_frames - 1]["drivers"].keys())
+    if race_order is None or race_order["drivers"] != drivers:
+        race_order = _empty_race_order(drivers)
+    first = len(race_order["order"])
+    if first >= n_frames:
+        return race_order
+
+    parts = [chunk_columns(chunk, drivers, ["lap", "dist", "tyre"])
+             for _, chunk in iter_frame_chunks(frames, first, n_frames)]
+
+    def column(name):
+        values = np.concatenate([part[name] for part in parts]).astype(np.float64)
+        return np.where(values < 0, np.nan, values) if name != "dist" else values
+
+    return extend_race_order(race_order, column("lap"), column("dist"), column("tyre"))
+
+def race_positions(race_order):
+    """(frames, drivers) int8 positions (1 = leader) from the order matrix."""
+    order = race_order["order"]
+    positions = np.empty_like(order)
+    ranks = np.broadcast_to(np.arange(1, order.shape[1] + 1, dtype=order.dtype), order.shape)
+    np.put_along_axis(positions, order.astype(np.intp), ranks, axis=1)
+    return positions
+
+def _stable_runs(values, frames, n_frames):
+    """
+    Runs of equal consecutive values (rows of states that start at `frames`) that last at least
+    MIN_HOLD_FRAMES. Returns (start frames, values) of those runs, merging runs that end up
+    next to each other with the same value.
+    """
+    if not len(values):
+        return np.zeros(0, dtype=np.int64), values
+    starts = np.concatenate([[0], np.flatnonzero(values[1:] != values[:-1]) + 1])
+    ends = np.concatenate([frames[starts[1:]], [n_frames]])
+    stable = (ends - frames[starts]) >= MIN_HOLD_FRAMES
+    starts = starts[stable]
+    kept = values[starts]
+    if not len(kept):
+        return np.zeros(0, dtype=np.int64), kept
+    new = np.concatenate([[True], kept[1:] != kept[:-1]])
+    return frames[starts[new]], kept[new]
+
+def _pit_stops(race_order, lap_table):
+    """[(frame, driver index, lap)] of every pit stop: from the lap table, else from tyre changes."""
+    stops = []
+    drivers = race_order["drivers"]
+    lap_matrix = race_order["lap"]
+    n_frames = len(lap_matrix)
+    for j, code in enumerate(drivers):
+        columns = lap_table["drivers"].get(code) if lap_table else None
+        if columns is not None:
+            pit_in = np.flatnonzero(columns["pit_in"])
+            lap_end = columns["lap_end"]
+            has_next = np.isfinite(np.append(lap_end, np.nan)[pit_in + 1])
+            # A pit entry on the last lap a driver ran is a retirement in the pits, not a stop
+            for lap in pit_in[has_next & np.isfinite(lap_end[pit_in])]:
+                stops.append((int(round(float(lap_end[lap]) * FPS)), j, int(lap)))
+        else:
+            for frame in race_order["pit_frames"].get(code, []):
+                if frame < n_frames:
+                    stops.append((int(frame), j, int(lap_matrix[frame, j])))
+    return [stop for stop in stops if 0 <= stop[0] < n_frames]
+
+def _pit_mask(stops, n_frames, n_drivers):
+    """(frames, drivers) bool: driver within PIT_WINDOW_S of one of its stops."""
+    mask = np.zeros((n_frames, n_drivers), dtype=bool)
+    before, after = int(PIT_WINDOW_S[0] * FPS), int(PIT_WINDOW_S[1] * FPS)
+    for frame, j, _ in stops:
+        mask[max(0, frame - before):min(n_frames, frame + after), j] = True
+    return mask
+
+# Track statuses under which lap times say nothing about pace: safety car, red flag, VSC
+NEUTRALISED_STATUSES = ("4", "5", "6", "7")
+
+def _neutralised_periods(track_statuses):
+    """(start, end) replay seconds of every safety car, red flag and VSC period."""
+    periods = []
+    for status in track_statuses or []:
+        if str(status.get("status", "")) in NEUTRALISED_STATUSES:
+            end = status.get("end_time")
+            periods.append((status.get("start_time", 0.0), end if end is not None else np.inf))
+    return periods
+
+def _fastest_laps(race_order, lap_table, track_statuses=None):
+    """
+    [(frame, driver index, lap, lap time)] of every lap that improved the fastest lap of the race
+    so far, from lap 2 on. Laps that overlap a safety car, red flag or VSC period don't count.
+    Lap times are taken from the lap table, else from the frames at which each driver's lap
+    number changes.
+    """
+    candidates = []
+    drivers = race_order["drivers"]
+    for j, code in enumerate(drivers):
+        columns = lap_table["drivers"].get(code) if lap_table else None
+        if columns is not None:
+            lap_times = columns["lap_time"].astype(np.float64)
+            lap_end = columns["lap_end"].astype(np.float64)
+            laps = np.flatnonzero(np.isfinite(lap_times) & np.isfinite(lap_end))
+            laps = laps[laps >= 2]
+            candidates += [(lap_end[lap] * FPS, j, int(lap), float(lap_times[lap])) for lap in laps]
+        else:
+            column = race_order["lap"][:, j]
+            changes = np.flatnonzero(np.diff(column) > 0) + 1
+            if len(changes) < 2:
+                continue
+            started = column[changes[:-1]]
+            # Only laps that were followed by the next lap (no gaps in the data)
+            complete = column[changes[1:]] == started + 1
+            for k in np.flatnonzero(complete & (started >= 2)):
+                candidates.append((float(changes[k + 1]), j, int(started[k]),
+                                   (changes[k + 1] - changes[k]) / FPS))
+    periods = _neutralised_periods(track_statuses)
+    if periods:
+        def green(frame, lap_time):
+            end = frame / FPS
+            return not any(start < end and end - lap_time < stop for start, stop in periods)
+
+        candidates = [candidate for candidate in candidates if green(candidate[0], candidate[3])]
+    if not candidates:
+        return []
+
+    candidates.sort()
+    times = np.array([candidate[3] for candidate in candidates])
+    best_before = np.concatenate([[np.inf], np.minimum.accumulate(times)[:-1]])
+    return [(int(round(frame)), j, lap, lap_time)
+            for (frame, j, lap, lap_time), best in zip(candidates, best_before) if lap_time < best]
+
+def _flag_events(track_statuses, n_frames):
+    events = []
+    for status in track_statuses:
+        status_code = str(status.get("status", ""))
+        start_time = status.get("start_time", 0)
+        end_time = status.get("end_time")
+
+        start_frame = int(start_time * FPS)
+        end_frame = int(end_time * FPS) if end_time else start_frame + 250  # Default 10 seconds
+
+        # This prevents rendering artifacts from pre-race track status events
+        # that shouldn't appear on the timeline... Events that span frame 0
+        # (start < 0 but end > 0) are kept; the drawing code will clamp them
+        if end_frame <= 0:
+            continue
+
+        # Note: The drawing code also clamps, but normalizing here improves data quality
+        if n_frames > 0:
+            end_frame = min(end_frame, n_frames)
+
+        event_type = None
+        if status_code == "2":  # Yellow flag
+            event_type = EVENT_YELLOW_FLAG
+        elif status_code == "4":  # Safety Car
+            event_type = EVENT_SAFETY_CAR
+        elif status_code == "5":  # Red flag
+            event_type = EVENT_RED_FLAG
+        elif status_code in ("6", "7"):  # VSC
+            event_type = EVENT_VSC
+
+        if event_type:
+            events.append({
+                "type": event_type,
+                "frame": start_frame,
+                "end_frame": end_frame,
+                "label": "",
+                "lap": None,
+            })
+    return events
+
+def extract_race_events(frames, track_statuses: List[dict], total_laps: int,
+                        race_order: Optional[dict] = None, lap_table: Optional[dict] = None) -> List[dict]:
+    """
+    Extract race events for the progress bar.
+
+    - Retirements (EVENT_DNF): cars that stopped for good before the winner finished
+    - Leader changes (EVENT_LEADER_CHANGE) and overtakes (EVENT_OVERTAKE): changes of order
+      that hold for MIN_HOLD_FRAMES, leaving out those caused by pit stops and stopped cars
+    - Pit stops (EVENT_PIT_STOP)
+    - Fastest laps (EVENT_FASTEST_LAP): each lap that improved the fastest lap of the race
+    - Flag events (from track_statuses)
+
+    Args:
+        frames: Frames of the race (only read when there is no race order)
+        track_statuses: List of track status events
+        total_laps: Total number of laps in the race
+        race_order: Race order from the race cache (see build_race_order)
+        lap_table: Lap table from the race cache, for pit stops and lap times
+
+    Returns:
+        List of event dictionaries ({"type", "frame", "label", "lap", ...}), sorted by frame
+    """
+    if race_order is None:
+        race_order = race_order_from_frames(frames)
+    n_frames = len(race_order["order"]) if race_order is not None else len(frames)
+    events = _flag_events(track_statuses, n_frames)
+    if not n_frames:
+        return events
+
+    drivers = race_order["drivers"]
+    order = race_order["order"]
+    lap_matrix = race_order["lap"]
+    last_moving = race_order["last_moving"]
+
+    def driver_event(event_type, frame, j, label, **extra):
+        lap = int(lap_matrix[min(frame, n_frames - 1), j])
+        events.append({"type": event_type, "frame": int(frame), "label": label,
+                       "lap": lap if lap > 0 else None, "driver": drivers[j], **extra})
+
+    # Retirements: the car stopped moving well before the winner finished. Finishers stop where
+    # they took the flag, so the winner is the first car to stop on the last lap
+    final_laps = lap_matrix[-1]
+    finish = last_moving[final_laps == final_laps.max()].min()
+    margin = int(RETIRE_MARGIN_S * FPS)
+    for j in np.flatnonzero((last_moving >= 0) & (last_moving < finish - margin)):
+        driver_event(EVENT_DNF, last_moving[j] + 1, j, drivers[j])
+
+    # Order changes only happen at a few thousand frames: work on the states at those frames
+    changed = np.concatenate([[0], np.flatnonzero((order[1:] != order[:-1]).any(axis=1)) + 1])
+    positions = race_positions({"order": order[changed]})
+
+    # Leader changes
+    starts, leaders = _stable_runs(order[changed, 0], changed, n_frames)
+    for k in range(1, len(starts)):
+        new, old = int(leaders[k]), int(leaders[k - 1])
+        if starts[k] > last_moving[new] or starts[k] > last_moving[old]:
+            # Cars still finishing their last lap move up the order past cars that already stopped
+            continue
+        driver_event(EVENT_LEADER_CHANGE, starts[k], new, f"{drivers[new]} takes the lead from {drivers[old]}",
+                     passed=drivers[old])
+
+    # Pit stops, and the windows around them in which order changes aren't overtakes
+    stops = _pit_stops(race_order, lap_table)
+    for frame, j, lap in stops:
+        events.append({"type": EVENT_PIT_STOP, "frame": frame, "label": drivers[j], "lap": lap,
+                       "driver": drivers[j]})
+    in_pit = _pit_mask(stops, n_frames, len(drivers))
+
+    # Overtakes: a pair of cars whose order flips and holds, both still racing and away from the pits
+    present = lap_matrix[changed] >= 0
+    for a in range(len(drivers)):
+        for b in range(a + 1, len(drivers)):
+            a_ahead = positions[:, a] < positions[:, b]
+            if not a_ahead.any() or a_ahead.all():
+                continue
+            run_starts, states = _stable_runs(a_ahead, changed, n_frames)
+            state_rows = np.searchsorted(changed, run_starts, side="right") - 1
+            for k in range(1, len(run_starts)):
+                frame = int(run_starts[k])
+                row = state_rows[k]
+                if not (present[row, a] and present[row, b]):
+                    continue
+                # A car that stopped for good (retired or finished) isn't passed
+                if frame > last_moving[a] or frame > last_moving[b] or in_pit[frame, a] or in_pit[frame, b]:
+                    continue
+                passer, passed = (a, b) if states[k] else (b, a)
+                position = int(positions[row, passer])
+                driver_event(EVENT_OVERTAKE, frame, passer, f"{drivers[passer]} passes {drivers[passed]} for P{position}",
+                             passed=drivers[passed], position=position)
+
+    for frame, j, lap, lap_time in _fastest_laps(race_order, lap_table, track_statuses):
+        if frame < n_frames:
+            events.append({"type": EVENT_FASTEST_LAP, "frame": frame, "label": f"{drivers[j]} {format_time(lap_time)}",
+                           "lap": lap, "driver": drivers[j], "lap_time": lap_time})
+
+    events.sort(key=lambda event: event["frame"])
+    return events
@@ -0,0 +1,205 @@
+import numpy as np
+
+# Sector and mini-sector timing of a race, computed once while the cache is built and stored in
+# the race cache under "sector_timing" (build_sector_timing):
+#
+#   sector_timing = {
+#       "drivers": ["VER", "NOR", ...],          # column / row order of the arrays below
+#       "sector_bounds": (SECTORS + 1,) float32  # sector starts as fractions of a lap (0, s2, s3, 1)
+#       "mini_bounds": (MINIS + 1,) float32      # mini-sector starts as fractions of a lap
+#       "crossings": (drivers, laps + 1, MINIS + 1) float32
+#                                                # replay time at which a driver crosses each
+#                                                # mini-sector boundary of a lap (NaN: not reached)
+#       "sector_times": (drivers, laps + 1, SECTORS) float32
+#       "mini_times": (drivers, laps + 1, MINIS) float32
+#       "sector_status": (frames, drivers) int8  # STATUS_* of the last sector each driver completed
+#       "mini_status": (frames, drivers) int8    # the same for mini-sectors
+#   }
+#
+# Arrays with a lap axis are indexed by lap number (index 0 is unused), as in the lap table.
+# The status matrices let the leaderboard colour a row for any frame with one array lookup
+# (sector_status[frame, column]), whatever the playback speed or direction.
+#
+# Sector boundaries are placed where the cars are when their lap table sector times run out
+# (median over all laps), mini-sectors split each sector into equal distances. Crossing times
+# come from threshold searches over each driver's race distance in laps (lap number plus the
+# fraction of the lap covered), so every boundary of the race is found in one np.searchsorted.
+
+SECTORS = 3
+MINIS_PER_SECTOR = 8
+MINIS = SECTORS * MINIS_PER_SECTOR
+
+STATUS_NONE = 0
+STATUS_SLOWER = 1
+STATUS_PERSONAL_BEST = 2
+STATUS_OVERALL_BEST = 3
+
+def _lap_lengths(lap, dist):
+    """
+    Integer lap numbers of one driver (0 where there is no data), the mask of frames with data
+    and the length (metres) of every completed lap, indexed by lap number.
+    """
+    valid = ~(np.isnan(lap) | np.isnan(dist))
+    laps = np.where(valid, np.round(lap), 0).astype(np.int32)
+    max_lap = max(int(laps.max()) if len(laps) else 0, 1)
+
+    # A lap ends at the last frame before the lap number changes
+    ends = np.flatnonzero(valid[:-1] & valid[1:] & (laps[1:] > laps[:-1]))
+    lengths = np.full(max_lap + 2, np.nan)
+    lengths[laps[ends]] = dist[ends]
+    lengths[lengths <= 0] = np.nan
+    return laps, valid, lengths
+
+def _progress(laps, valid, dist, lengths, lap_length):
+    """
+    Race distance in laps at every frame: lap - 1 plus the fraction of the lap covered, made
+    non-decreasing (-inf before the driver's first sample). Laps that never completed use the
+    median lap length.
+    """
+    lengths = np.where(np.isnan(lengths), lap_length, lengths)
+    fraction = np.clip(dist / lengths[laps], 0.0, 1.0)
+    progress = np.where(valid & (laps >= 1), laps - 1 + fraction, -np.inf)
+    return np.maximum.accumulate(progress) if len(progress) else progress
+
+def _sector_bounds(columns, laps_by_driver, lap_length, fps):
+    """
+    Fractions of a lap at which sectors 2 and 3 start: the median fraction covered when the
+    lap table's sector 1 and sector 1 + 2 times run out. Equal thirds without sector times.
+    """
+    found = [[], []]
+    for (laps, valid, dist, lengths), lap_columns in zip(laps_by_driver, columns):
+        if lap_columns is None:
+            continue
+        lengths = np.where(np.isnan(lengths), lap_length, lengths)
+        sector_end = lap_columns["lap_start"].astype(float)
+        for s, name in enumerate(("sector1", "sector2")):
+            sector_end = sector_end + lap_columns[name]
+            frames = np.round(sector_end * fps)
+            ok = np.isfinite(frames) & (frames >= 0) & (frames < len(laps))
+            frames = frames[ok].astype(np.int64)
+            # Only frames on the lap the sector time belongs to
+            lap_numbers = np.flatnonzero(ok)
+            same_lap = valid[frames] & (laps[frames] == lap_numbers)
+            frames = frames[same_lap]
+            found[s].append(dist[frames] / lengths[laps[frames]])
+
+    bounds = [np.median(np.concatenate(values)) if values and sum(map(len, values)) else np.nan
+              for values in found]
+    if not (0.0 < bounds[0] < bounds[1] < 1.0):
+        bounds = [1.0 / 3, 2.0 / 3]
+    return np.array([0.0, bounds[0], bounds[1], 1.0])
+
+def _crossing_times(progress, timeline, thresholds):
+    """Interpolated replay time at which progress first reaches each threshold (NaN: never)."""
+    n = len(progress)
+    index = np.searchsorted(progress, thresholds, side="left")
+    reached = (index > 0) & (index < n)
+    after = np.minimum(index, n - 1)
+    before = np.maximum(after - 1, 0)
+    span = progress[after] - progress[before]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = np.where(span > 0, (thresholds - progress[before]) / span, 1.0)
+    times = timeline[before] + np.clip(share, 0.0, 1.0) * (timeline[after] - timeline[before])
+    return np.where(reached, times, np.nan)
+
+def _classify(times, ends):
+    """
+    STATUS_* of segment times (drivers, laps, segments): overall best when no faster time of the
+    segment was set before it (by end time), personal best against the driver's earlier laps.
+    """
+    status = np.where(np.isnan(times), STATUS_NONE, STATUS_SLOWER).astype(np.int8)
+    with np.errstate(invalid="ignore"):
+        personal = times <= np.fmin.accumulate(np.where(np.isnan(times), np.inf, times), axis=1)
+    status[personal & ~np.isnan(times)] = STATUS_PERSONAL_BEST
+
+    for segment in range(times.shape[2]):
+        seg_times = times[:, :, segment].ravel()
+        seg_ends = ends[:, :, segment].ravel()
+        done = np.flatnonzero(~np.isnan(seg_times) & ~np.isnan(seg_ends))
+        done = done[np.argsort(seg_ends[done], kind="stable")]
+        best = np.minimum.accumulate(seg_times[done])
+        seg_status = status[:, :, segment].ravel()
+        seg_status[done[seg_times[done] <= best]] = STATUS_OVERALL_BEST
+        status[:, :, segment] = seg_status.reshape(times.shape[:2])
+    return status
+
+def _status_matrix(status, ends, n_frames, fps):
+    """(frames, drivers) status of the last segment each driver completed at every frame."""
+    matrix = np.zeros((n_frames, status.shape[0]), dtype=np.int8)
+    frame_numbers = np.arange(n_frames)
+    for j in range(status.shape[0]):
+        # Laps then segments: already in time order
+        driver_ends = ends[j].ravel()
+        done = np.flatnonzero(~np.isnan(driver_ends) & (status[j].ravel() != STATUS_NONE))
+        if not len(done):
+            continue
+        frames = np.ceil(driver_ends[done] * fps).astype(np.int64)
+        latest = np.searchsorted(frames, frame_numbers, side="right") - 1
+        matrix[:, j] = np.where(latest >= 0, status[j].ravel()[done][np.maximum(latest, 0)], STATUS_NONE)
+    return matrix
+
+def build_sector_timing(drivers, timeline, lap, dist, lap_table, fps):
+    """
+    Sector and mini-sector timing from the resampled telemetry. lap and dist are
+    (frames, drivers) arrays of lap number and distance within the lap, in the column order of
+    drivers; lap_table is the race's lap table (see laps.py) for the sector boundaries.
+    """
+    n_frames, n_drivers = lap.shape if lap.ndim == 2 else (len(timeline), 0)
+    timeline = np.asarray(timeline, dtype=float)
+    dist = np.asarray(dist, dtype=float)
+    lap = np.asarray(lap, dtype=float)
+
+    laps_by_driver = []
+    for j in range(n_drivers):
+        laps, valid, lengths = _lap_lengths(lap[:, j], dist[:, j])
+        laps_by_driver.append((laps, valid, dist[:, j], lengths))
+    measured = np.concatenate([entry[3][~np.isnan(entry[3])] for entry in laps_by_driver]) \
+        if laps_by_driver else np.array([])
+    lap_length = float(np.median(measured)) if len(measured) else 1.0
+
+    table_drivers = (lap_table or {}).get("drivers", {})
+    sector_bounds = _sector_bounds([table_drivers.get(code) for code in drivers],
+                                   laps_by_driver, lap_length, fps)
+    mini_bounds = np.concatenate([
+        np.linspace(sector_bounds[s], sector_bounds[s + 1], MINIS_PER_SECTOR, endpoint=False)
+        for s in range(SECTORS)
+    ] + [[1.0]])
+
+    total_laps = max([int(entry[0].max()) for entry in laps_by_driver if len(entry[0])] + [0])
+    if lap_table and lap_table.get("drivers"):
+        total_laps = max(total_laps, len(next(iter(table_drivers.values()))["lap_time"]) - 1)
+
+    # Boundary m of lap k sits at race distance k - 1 + mini_bounds[m]
+    thresholds = (np.arange(total_laps + 1)[:, None] - 1 + mini_bounds[None, :]).ravel()
+    crossings = np.full((n_drivers, total_laps + 1, MINIS + 1), np.nan, dtype=np.float32)
+    for j, (laps, valid, driver_dist, lengths) in enumerate(laps_by_driver):
+        progress = _progress(laps, valid, driver_dist, lengths, lap_length)
+        crossings[j] = _crossing_times(progress, timeline, thresholds).reshape(total_laps + 1, MINIS + 1)
+    crossings[:, 0] = np.nan
+
+    mini_times = np.diff(crossings, axis=2)
+    sector_edges = np.arange(SECTORS + 1) * MINIS_PER_SECTOR
+    sector_times = np.diff(crossings[:, :, sector_edges], axis=2)
+    mini_status = _classify(mini_times, crossings[:, :, 1:])
+    sector_status = _classify(sector_times, crossings[:, :, sector_edges[1:]])
+
+    return {
+        "drivers": list(drivers),
+        "sector_bounds": sector_bounds.astype(np.float32),
+        "mini_bounds": mini_bounds.astype(np.float32),
+        "crossings": crossings,
+        "sector_times": sector_times.astype(np.float32),
+        "mini_times": mini_times.astype(np.float32),
+        "sector_status": _status_matrix(sector_status, crossings[:, :, sector_edges[1:]], n_frames, fps),
+        "mini_status": _status_matrix(mini_status, crossings[:, :, 1:], n_frames, fps),
+    }
+
+def sector_status_at(sector_timing, frame):
+    """{code: STATUS_*} of the last sector every driver completed at a frame."""
+    if not sector_timing:
+        return {}
+    status = sector_timing["sector_status"]
+    if not len(status):
+        return {}
+    row = status[min(max(int(frame), 0), len(status) - 1)]
+    return {code: int(row[j]) for j, code in enumerate(sector_timing["drivers"])}
@@ -0,0 +1,79 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+from src.lib.telemetry import CHANNELS
+
+# Shared-memory return path for the per-driver telemetry workers.
+#
+# Each Pool worker used to return a dict of a dozen NumPy arrays, which multiprocessing pickles,
+# sends through a pipe and unpickles in the parent. Instead the parent allocates one shared
+# memory block per driver, sized from an upper bound on the number of telemetry samples, and
+# the worker writes its channels straight into it and only returns the sample count. The parent
+# then reads the channels as views on the block, without any copy.
+#
+# Block layout: a float64 matrix of shape (len(CHANNELS), capacity); row i holds CHANNELS[i]
+# and the first `n` columns are valid.
+
+# Samples lap.get_telemetry can add per lap on top of the raw car/position samples
+# (one padding sample on each side for car and position data, plus the two interpolated lap edges)
+EXTRA_SAMPLES_PER_LAP = 6
+
+def estimate_capacity(session, driver_no):
+    """Upper bound on the telemetry samples _process_single_driver produces for a driver."""
+    car = session.car_data.get(driver_no)
+    pos = session.pos_data.get(driver_no)
+    n_laps = len(session.laps.pick_drivers(driver_no))
+    n_raw = (len(car) if car is not None else 0) + (len(pos) if pos is not None else 0)
+    return n_raw + EXTRA_SAMPLES_PER_LAP * n_laps
+
+class SharedTelemetryBlock:
+    """One driver's telemetry block. Created by the parent, attached to by the worker by name."""
+
+    def __init__(self, capacity, name=None):
+        self.capacity = int(capacity)
+        nbytes = max(1, len(CHANNELS) * self.capacity * np.dtype(np.float64).itemsize)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.matrix = np.ndarray((len(CHANNELS), self.capacity), dtype=np.float64, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def channels(self, n):
+        """{channel: view of its first n samples} (no copies)."""
+        return {channel: self.matrix[i, :n] for i, channel in enumerate(CHANNELS)}
+
+    def close(self, unlink=False):
+        # Views on the buffer must be gone before the mapping can be closed
+        self.matrix = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+def allocate_blocks(session, drivers):
+    """
+    Allocates one block per driver. Returns {driver_no: SharedTelemetryBlock}, or None when
+    shared memory isn't available on this system (callers fall back to pickled results).
+    """
+    blocks = {}
+    try:
+        for driver_no in drivers:
+            blocks[driver_no] = SharedTelemetryBlock(estimate_capacity(session, driver_no))
+    except (OSError, ValueError) as e:
+        print(f"Shared memory unavailable ({e}), returning driver telemetry through the pool")
+        release_blocks(blocks)
+        return None
+    except BaseException:
+        release_blocks(blocks)
+        raise
+    return blocks
+
+def release_blocks(blocks):
+    for block in (blocks or {}).values():
+        try:
+            block.close(unlink=True)
+        except (OSError, BufferError):
+            pass
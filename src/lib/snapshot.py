@@ -0,0 +1,193 @@
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+
+# Parsed-session snapshots.
+#
+# session.load re-parses the live timing data and merges laps, car_data and pos_data in pandas
+# on every run, even when FastF1's HTTP cache is warm. A snapshot stores the result of that work
+# instead: the laps table, results, status tables and each driver's raw car/position channels as
+# one column per NumPy array (.npz per table), plus a small metadata pickle. Restoring a snapshot
+# rebuilds the FastF1 objects directly from those columns.
+#
+#   computed_data/snapshots/<session>/
+#       meta.pkl              loaded parts, versions, session info, scalar session attributes,
+#                             column dtypes of every table
+#       laps.npz, results.npz, track_status.npz, session_status.npz, weather.npz, messages.npz
+#       car_<driver>.npz, pos_<driver>.npz
+
+SNAPSHOT_DIR = os.path.join("computed_data", "snapshots")
+# Bump when the layout of the snapshot files changes
+SNAPSHOT_VERSION = 2
+
+# Session attribute -> (snapshot file, FastF1 class it is rebuilt as)
+_TABLES = {
+    "_laps": ("laps", "Laps"),
+    "_results": ("results", "SessionResults"),
+    "_track_status": ("track_status", None),
+    "_session_status": ("session_status", None),
+    "_weather_data": ("weather", None),
+    "_race_control_messages": ("messages", None),
+}
+_SCALARS = ("_session_info", "_session_split_times", "_total_laps", "_session_start_time", "_t0_date")
+
+def get_snapshot_dir(session):
+    return os.path.join(SNAPSHOT_DIR, str(session).replace(' ', '_'))
+
+def _save_table(df, path):
+    """
+    Writes a DataFrame as one array per column. Object and pandas extension (nullable integer
+    and boolean, string, categorical, tz-aware datetime) columns are stored as category codes.
+    Returns the column dtypes, which _load_table needs to restore the extension dtypes.
+    """
+    import pandas as pd
+
+    arrays = {}
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        if values.dtype == object or isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+            try:
+                codes, uniques = pd.factorize(values, use_na_sentinel=True)
+                arrays[f"codes{i}"] = codes.astype(np.int32)
+                arrays[f"uniques{i}"] = np.asarray(uniques, dtype=object)
+                continue
+            except TypeError:
+                # unhashable values (lists, dicts): keep the pickled object array
+                arrays[f"col{i}"] = values.to_numpy(dtype=object)
+                continue
+        arrays[f"col{i}"] = values.to_numpy()
+
+    arrays["__columns__"] = np.asarray(list(df.columns), dtype=object)
+    arrays["__dtypes__"] = np.asarray([str(dtype) for dtype in df.dtypes], dtype=object)
+    arrays["__index__"] = df.index.to_numpy()
+    arrays["__index_name__"] = np.asarray([df.index.name], dtype=object)
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+    return list(df.dtypes)
+
+def _load_table(path, dtypes=None):
+    """
+    Reads a table written by _save_table. dtypes are the column dtypes it returned (kept in
+    meta.pkl): the dtype names in the file can't rebuild categories or time zones.
+    """
+    import pandas as pd
+
+    with np.load(path, allow_pickle=True) as data:
+        columns = list(data["__columns__"])
+        if dtypes is None:
+            dtypes = list(data["__dtypes__"])
+        values = {}
+        for i, (column, dtype) in enumerate(zip(columns, dtypes)):
+            if f"codes{i}" in data:
+                codes = data[f"codes{i}"]
+                uniques = np.append(data[f"uniques{i}"], np.nan)
+                # code -1 (missing) picks the trailing NaN
+                series = pd.Series(uniques[codes], dtype=object)
+            else:
+                series = pd.Series(data[f"col{i}"])
+            if str(series.dtype) != str(dtype):
+                series = series.astype(dtype)
+            values[column] = series
+        index = pd.Index(data["__index__"], name=data["__index_name__"][0])
+
+    # Decoded columns are Series on a default index, so the real index is set afterwards
+    df = pd.DataFrame(values, columns=columns)
+    df.index = index
+    return df
+
+def save_session_snapshot(session, parts):
+    """Writes a snapshot of a loaded session. parts are the session.load parts that were loaded."""
+    import fastf1
+
+    final_dir = get_snapshot_dir(session)
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=SNAPSHOT_DIR, prefix=".tmp_")
+    try:
+        meta = {
+            "snapshot_version": SNAPSHOT_VERSION,
+            "fastf1_version": fastf1.__version__,
+            "parts": dict(parts),
+            "tables": [],
+            "drivers": {"car": [], "pos": []},
+            # Column dtypes by snapshot file name
+            "dtypes": {},
+        }
+        for attr in _SCALARS:
+            meta[attr] = getattr(session, attr, None)
+
+        for attr, (name, _) in _TABLES.items():
+            df = getattr(session, attr, None)
+            if df is None:
+                continue
+            meta["dtypes"][name] = _save_table(df, os.path.join(tmp_dir, f"{name}.npz"))
+            meta["tables"].append(attr)
+
+        for prefix, attr in (("car", "_car_data"), ("pos", "_pos_data")):
+            for driver, telemetry in (getattr(session, attr, None) or {}).items():
+                name = f"{prefix}_{driver}"
+                meta["dtypes"][name] = _save_table(telemetry, os.path.join(tmp_dir, f"{name}.npz"))
+                meta["drivers"][prefix].append(driver)
+
+        with open(os.path.join(tmp_dir, "meta.pkl"), "wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # Swap the finished snapshot in, so readers never see a partial one
+        if os.path.isdir(final_dir):
+            shutil.rmtree(final_dir)
+        os.replace(tmp_dir, final_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+def read_snapshot_meta(session):
+    try:
+        with open(os.path.join(get_snapshot_dir(session), "meta.pkl"), "rb") as f:
+            return pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+
+def restore_session_snapshot(session, parts):
+    """
+    Restores a session from its snapshot if the snapshot has every part in `parts` that is set.
+    Returns the parts the snapshot provides, or None when there is no usable snapshot.
+    """
+    import fastf1
+    from fastf1.core import Laps, SessionResults, Telemetry
+
+    meta = read_snapshot_meta(session)
+    if meta is None or meta["snapshot_version"] != SNAPSHOT_VERSION \
+            or meta["fastf1_version"] != fastf1.__version__:
+        return None
+    if any(needed and not meta["parts"].get(part) for part, needed in parts.items()):
+        return None
+
+    snapshot_dir = get_snapshot_dir(session)
+    try:
+        for attr in _SCALARS:
+            setattr(session, attr, meta[attr])
+
+        for attr in meta["tables"]:
+            name, cls = _TABLES[attr]
+            df = _load_table(os.path.join(snapshot_dir, f"{name}.npz"), meta["dtypes"].get(name))
+            if cls == "Laps":
+                df = Laps(df, session=session)
+            elif cls == "SessionResults":
+                df = SessionResults(df)
+            setattr(session, attr, df)
+
+        if meta["parts"].get("telemetry"):
+            session._car_data = {}
+            session._pos_data = {}
+            for prefix, target in (("car", session._car_data), ("pos", session._pos_data)):
+                for driver in meta["drivers"][prefix]:
+                    name = f"{prefix}_{driver}"
+                    df = _load_table(os.path.join(snapshot_dir, f"{name}.npz"), meta["dtypes"].get(name))
+                    target[driver] = Telemetry(df, session=session, driver=driver)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Could not restore session snapshot ({e}), loading from FastF1")
+        return None
+
+    return meta["parts"]
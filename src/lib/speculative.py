@@ -0,0 +1,102 @@
+import atexit
+import multiprocessing
+import signal
+import sys
+import threading
+
+# Speculative background loading.
+#
+# While the user is still choosing (session, HUD, ...), the launcher already knows the round and
+# can start building the replay cache of the most likely session. The work runs in a separate
+# process so it can be cancelled at any point: cancelling sends SIGTERM, which unwinds the load
+# (closing its Pool), and all cache files are written atomically, so a cancelled load never
+# leaves a partial cache behind.
+
+# Session the launchers speculate on once a round is highlighted
+DEFAULT_SPECULATIVE_SESSION = 'R'
+
+def _run_cancellable(target, args):
+    # Turn SIGTERM into SystemExit so `with Pool(...)` blocks terminate their workers
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    target(*args)
+
+class SpeculativeLoader:
+    """
+    Runs target(*args) in a background process for the most likely next choice. At most one
+    speculation runs at a time; starting a new one cancels the previous one.
+    """
+    def __init__(self, target):
+        self.target = target
+        self._args = None
+        self._process = None
+        # spawn, not fork: launchers have GUI/socket threads that must not be forked
+        self._context = multiprocessing.get_context("spawn")
+        # start/cancel come from the UI thread, wait usually from a worker thread
+        self._lock = threading.Lock()
+        # Cancelled processes that are still shutting down, reaped by background threads
+        self._stopping = set()
+        self._atexit_registered = False
+
+    def running(self, *args):
+        """True while a speculation (for exactly these args, if given) is running."""
+        if self._process is None or not self._process.is_alive():
+            return False
+        return not args or args == self._args
+
+    def start(self, *args):
+        if self.running(*args):
+            return
+        self.cancel()
+        # Not a daemon process: the target uses a multiprocessing Pool of its own
+        process = self._context.Process(target=_run_cancellable, args=(self.target, args))
+        process.start()
+        if not self._atexit_registered:
+            # Registered after the first start: atexit runs handlers in reverse order, so this
+            # stops the speculation before multiprocessing's own handler joins the process
+            atexit.register(self.cancel, wait=True)
+            self._atexit_registered = True
+        with self._lock:
+            self._process, self._args = process, args
+
+    def cancel(self, wait=False):
+        """
+        Cancels the running speculation. The process is terminated right away and reaped on a
+        background thread, so the UI thread calling this never blocks; wait=True (at exit) also
+        waits for every cancelled process to be gone.
+        """
+        with self._lock:
+            process, self._process, self._args = self._process, None, None
+            if process is not None and process.is_alive():
+                self._stopping.add(process)
+                process.terminate()
+                threading.Thread(target=self._reap, args=(process,), daemon=True).start()
+            stopping = list(self._stopping)
+        if wait:
+            for process in stopping:
+                self._reap(process)
+
+    def _reap(self, process):
+        process.join(timeout=10)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        with self._lock:
+            self._stopping.discard(process)
+
+    def wait(self, *args, timeout=None):
+        """
+        Waits for the speculation if it matches args, otherwise cancels it. Returns True when a
+        matching speculation finished successfully (its results are on disk).
+        """
+        with self._lock:
+            process = self._process if args == self._args else None
+        if process is None:
+            self.cancel()
+            return False
+        process.join(timeout)
+        if process.is_alive():
+            return False
+        with self._lock:
+            if self._process is process:
+                self._process, self._args = None, None
+        return process.exitcode == 0
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+import numpy as np
+
+from src.lib.tyres import get_tyre_compound_int
+
+# Telemetry extraction engine shared by the race/sprint and qualifying pipelines.
+#
+#   extract_lap_channels(laps)          telemetry of a set of laps -> raw channel arrays,
+#                                       sorted by time
+#   resample_channels(channels, ...)    raw channels -> arrays on a regular replay timeline
+#   format_track_statuses(...)          session track status table -> replay timeline intervals
+#
+# The race path extracts all laps of a driver (in a Pool worker) and resamples every driver
+# onto a common timeline; the qualifying path extracts a driver's fastest lap of a segment.
+
+CHANNELS = ("t", "x", "y", "dist", "rel_dist", "lap", "tyre", "speed", "gear", "drs", "throttle", "brake")
+
+# Channel -> FastF1 telemetry column (t, lap and tyre are filled in separately)
+_COLUMNS = {
+    "x": "X",
+    "y": "Y",
+    "dist": "Distance",   # distance within the lap
+    "rel_dist": "RelativeDistance",
+    "speed": "Speed",
+    "gear": "nGear",
+    "drs": "DRS",
+    "throttle": "Throttle",
+    "brake": "Brake",
+}
+
+def extract_lap_channels(laps, time_column="SessionTime"):
+    """
+    Concatenates the telemetry of each lap in `laps` into one array per channel (CHANNELS).
+    time_column is the telemetry column used for "t": "SessionTime" for a common session clock,
+    "Time" for the time since the start of the lap.
+    Returns None when none of the laps has telemetry.
+    """
+    per_lap = {channel: [] for channel in CHANNELS}
+
+    # iterate laps in order
+    for _, lap in laps.iterlaps():
+        # get telemetry for THIS lap only
+        lap_tel = lap.get_telemetry()
+        if lap_tel is None or lap_tel.empty:
+            continue
+
+        t_lap = lap_tel[time_column].dt.total_seconds().to_numpy()
+        per_lap["t"].append(t_lap)
+        for channel, column in _COLUMNS.items():
+            per_lap[channel].append(lap_tel[column].to_numpy().astype(float))
+        per_lap["lap"].append(np.full_like(t_lap, lap.LapNumber))
+        per_lap["tyre"].append(np.full_like(t_lap, get_tyre_compound_int(lap.Compound)))
+
+    if not per_lap["t"]:
+        return None
+
+    t_all = np.concatenate(per_lap["t"])
+    # Stable sort: consecutive laps share their boundary timestamp (end of one lap, start of the
+    # next) and both samples are kept in lap order. np.interp treats a repeated time as a step,
+    # so lap, distance etc. jump to the new lap exactly at the boundary.
+    order = np.argsort(t_all, kind="stable")
+
+    channels = {"t": t_all[order]}
+    for channel in CHANNELS[1:]:
+        channels[channel] = np.concatenate(per_lap[channel])[order]
+    return channels
+
+def resample_channels(channels, timeline, names, step=(), dtype=None):
+    """
+    Resamples channels (sorted by "t", as from extract_lap_channels) onto `timeline`, which must
+    be on the same clock as channels["t"]. Channels in `step` are forward-filled (the last sample
+    at or before each timeline point) instead of linearly interpolated.
+    """
+    t = channels["t"]
+    step_idx = None
+    resampled = {}
+    for name in names:
+        if name in step:
+            if step_idx is None:
+                step_idx = np.clip(np.searchsorted(t, timeline, side='right') - 1, 0, len(t) - 1)
+            values = channels[name][step_idx]
+        else:
+            values = np.interp(timeline, t, channels[name])
+        resampled[name] = values.astype(dtype) if dtype is not None else values
+    return resampled
+
+def format_track_statuses(track_status, t_offset):
+    """Track status changes as [{"status", "start_time", "end_time"}] relative to t_offset (seconds)."""
+    formatted_track_statuses = []
+
+    for status in track_status.to_dict('records'):
+        seconds = timedelta.total_seconds(status['Time'])
+
+        start_time = seconds - t_offset # Shift to match timeline
+        end_time = None
+
+        # Set the end time of the previous status
+        if formatted_track_statuses:
+            formatted_track_statuses[-1]['end_time'] = start_time
+
+        formatted_track_statuses.append({
+            'status': status['Status'],
+            'start_time': start_time,
+            'end_time': end_time,
+        })
+    return formatted_track_statuses
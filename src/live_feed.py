@@ -0,0 +1,394 @@
+import ast
+import base64
+import json
+import os
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from datetime import datetime
+
+import numpy as np
+
+from src.f1_data import DT, _assemble_frames
+from src.lib.tyres import get_tyre_compound_int
+
+# Incremental replay data from a recorded live-timing feed.
+#
+# FastF1's SignalRClient (`python -m fastf1.livetiming save <file>`) appends every live-timing
+# message to a text file while a session runs. LiveFeedIngestor tails such a file as a local
+# stand-in for the live feed: each poll parses only the lines added since the previous one,
+# appends the samples to per-driver buffers, and builds frames from the last frame built up to
+# the live edge (the latest time every active driver has data for). The first frames wait for
+# the DriverList codes of the drivers, whose keys then stay fixed. Frames are never rebuilt,
+# and they have the same layout as the frames of the race cache (f1_data._assemble_frames builds
+# both), so F1RaceReplayWindow plays them and follows the live edge as LiveFrames grows.
+#
+# Topics used (everything else is skipped):
+#   Position.z, CarData.z   compressed car positions and car telemetry
+#   TimingData              completed laps per driver
+#   TimingAppData           tyre compound per stint
+#   DriverList, LapCount    driver codes and team colours, total laps
+#   TrackStatus, WeatherData
+
+# Car telemetry channel numbers of CarData.z
+CAR_CHANNELS = {"2": "speed", "3": "gear", "4": "throttle", "5": "brake", "45": "drs"}
+# Seconds between two polls of the recording
+POLL_INTERVAL_S = 1.0
+# A driver whose data stops for this long (retired, or out of the feed) no longer holds back the
+# live edge; the driver's last values are carried forward
+STALE_DRIVER_S = 10.0
+# Samples kept before the last frame built, for interpolating the next frames
+LOOKBACK_S = 5.0
+# Feed seconds to hold the first frames back while drivers with data have no code from
+# DriverList yet; drivers still without one afterwards are shown by racing number
+DRIVER_LIST_WAIT_S = 30.0
+
+def _parse_time(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+def _inflate(payload):
+    return json.loads(zlib.decompress(base64.b64decode(payload), -zlib.MAX_WBITS))
+
+def _parse_line(line):
+    """(topic, message, unix time or None) of one recorded line, or None if it can't be parsed."""
+    try:
+        topic, message, timestamp = ast.literal_eval(line)
+    except (ValueError, SyntaxError, TypeError):
+        return None
+    if isinstance(message, str) and message.startswith(("{", "[", '"')):
+        # Initial state of each topic is recorded as a JSON string without a timestamp
+        try:
+            message = json.loads(message)
+        except ValueError:
+            return None
+    return topic, message, _parse_time(timestamp)
+
+class LiveFrames(list):
+    """Frames of a live session. Grows while the feed is ingested; `live` is False once it stops."""
+    live = True
+
+class _DriverBuffer:
+    def __init__(self):
+        self.pos_t, self.x, self.y = [], [], []
+        self.car_t = []
+        self.car = {channel: [] for channel in CAR_CHANNELS.values()}
+        # Distance covered since the first sample, integrated from speed like FastF1's add_distance
+        self.cum_dist = []
+        # (time, lap) at every lap change and (time, compound int) at every stint change
+        self.laps = [(float("-inf"), 1)]
+        self.lap_start_dist = [0.0]
+        self.tyres = [(float("-inf"), -1)]
+
+    def last_time(self):
+        if not self.pos_t or not self.car_t:
+            return None
+        return min(self.pos_t[-1], self.car_t[-1])
+
+    def add_car_sample(self, t, values):
+        if self.car_t and t <= self.car_t[-1]:
+            return
+        speed = values.get("speed", 0.0)
+        if self.car_t:
+            dist = self.cum_dist[-1] + (self.car["speed"][-1] + speed) / 2 / 3.6 * (t - self.car_t[-1])
+        else:
+            dist = 0.0
+        self.car_t.append(t)
+        self.cum_dist.append(dist)
+        for channel in CAR_CHANNELS.values():
+            self.car[channel].append(values.get(channel, 0.0))
+
+    def set_lap(self, t, lap):
+        if lap > self.laps[-1][1]:
+            self.laps.append((t, lap))
+            self.lap_start_dist.append(self.distance_at(t))
+
+    def distance_at(self, t):
+        if not self.car_t:
+            return 0.0
+        return float(np.interp(t, self.car_t, self.cum_dist))
+
+    def trim(self, t):
+        """Drops samples older than t (they are in frames already)."""
+        for times, columns in ((self.pos_t, (self.x, self.y)),
+                               (self.car_t, [self.cum_dist] + list(self.car.values()))):
+            cut = max(0, bisect_right(times, t) - 1)
+            if cut:
+                del times[:cut]
+                for column in columns:
+                    del column[:cut]
+
+    def resample(self, timeline):
+        """{channel: array} on the timeline, as f1_data._assemble_frames expects them."""
+        car_t = np.asarray(self.car_t)
+        step_idx = np.clip(np.searchsorted(car_t, timeline, side="right") - 1, 0, len(car_t) - 1)
+        arrays = {
+            "x": np.interp(timeline, self.pos_t, self.x),
+            "y": np.interp(timeline, self.pos_t, self.y),
+            "speed": np.interp(timeline, car_t, self.car["speed"]),
+            "throttle": np.interp(timeline, car_t, self.car["throttle"]),
+            "brake": np.interp(timeline, car_t, self.car["brake"]),
+            "gear": np.asarray(self.car["gear"])[step_idx],
+            "drs": np.asarray(self.car["drs"])[step_idx],
+        }
+        lap_idx = np.searchsorted([t for t, _ in self.laps], timeline, side="right") - 1
+        laps = np.asarray([lap for _, lap in self.laps])[lap_idx]
+        arrays["lap"] = laps.astype(float)
+        arrays["dist"] = np.interp(timeline, car_t, self.cum_dist) - np.asarray(self.lap_start_dist)[lap_idx]
+        tyre_idx = np.searchsorted([t for t, _ in self.tyres], timeline, side="right") - 1
+        arrays["tyre"] = np.asarray([tyre for _, tyre in self.tyres], dtype=float)[tyre_idx]
+        return arrays
+
+class LiveFeedIngestor:
+    """
+    Tails a recorded live-timing file and appends frames to self.frames. poll() ingests what
+    was added since the last call; start() polls on a background thread every poll_interval.
+    """
+
+    def __init__(self, path, poll_interval=POLL_INTERVAL_S):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.frames = LiveFrames()
+        self.track_statuses = []
+        self.total_laps = None
+        self.driver_codes = {}
+        self.driver_colors = {}
+        self.driver_teams = {}
+        # Key of each racing number in the frames, fixed when the driver first appears in a frame
+        # so that it never changes mid-session (a late DriverList would otherwise switch "1" to "VER")
+        self._frame_keys = {}
+        self._offset = 0
+        self._partial = ""
+        self._drivers = {}
+        self._t0 = None
+        self._last_t = None
+        # Replay time 0, in feed seconds: the time of the first frame
+        self._t_start = None
+        self._next_t = None
+        self._weather = []
+        self._lap_lengths = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _time(self, unix_time):
+        if unix_time is None:
+            return None
+        if self._t0 is None:
+            self._t0 = unix_time
+        return unix_time - self._t0
+
+    def _driver(self, number):
+        buffer = self._drivers.get(number)
+        if buffer is None:
+            buffer = self._drivers[number] = _DriverBuffer()
+        return buffer
+
+    def _read_new_lines(self):
+        try:
+            with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+                f.seek(self._offset)
+                text = f.read()
+                self._offset = f.tell()
+        except FileNotFoundError:
+            return []
+        lines = (self._partial + text).split("\n")
+        # The writer may be halfway through the last line
+        self._partial = lines.pop()
+        return lines
+
+    def _handle(self, topic, message, t):
+        if topic == "Position.z":
+            for entry in _inflate(message).get("Position", []):
+                sample_t = self._time(_parse_time(entry.get("Timestamp")))
+                if sample_t is None:
+                    continue
+                for number, pos in entry.get("Entries", {}).items():
+                    buffer = self._driver(number)
+                    if buffer.pos_t and sample_t <= buffer.pos_t[-1]:
+                        continue
+                    buffer.pos_t.append(sample_t)
+                    buffer.x.append(float(pos.get("X", 0.0)))
+                    buffer.y.append(float(pos.get("Y", 0.0)))
+        elif topic == "CarData.z":
+            for entry in _inflate(message).get("Entries", []):
+                sample_t = self._time(_parse_time(entry.get("Utc")))
+                if sample_t is None:
+                    continue
+                for number, car in entry.get("Cars", {}).items():
+                    channels = car.get("Channels", {})
+                    values = {name: float(channels.get(key, 0) or 0) for key, name in CAR_CHANNELS.items()}
+                    values["brake"] = 1.0 if values["brake"] > 0 else 0.0
+                    self._driver(number).add_car_sample(sample_t, values)
+        elif topic == "TimingData" and t is not None:
+            for number, line in (message.get("Lines") or {}).items():
+                if isinstance(line, dict) and "NumberOfLaps" in line:
+                    buffer = self._driver(number)
+                    n_laps = len(buffer.laps)
+                    buffer.set_lap(t, int(line["NumberOfLaps"]) + 1)
+                    if n_laps > 1 and len(buffer.laps) > n_laps:
+                        # A full lap between two lap changes: used for rel_dist
+                        self._lap_lengths.append(buffer.lap_start_dist[-1] - buffer.lap_start_dist[-2])
+        elif topic == "TimingAppData":
+            for number, line in (message.get("Lines") or {}).items():
+                stints = line.get("Stints") if isinstance(line, dict) else None
+                if isinstance(stints, dict):
+                    stints = [stints[k] for k in sorted(stints, key=int)]
+                for stint in stints or []:
+                    if isinstance(stint, dict) and stint.get("Compound"):
+                        buffer = self._driver(number)
+                        compound = get_tyre_compound_int(stint["Compound"])
+                        if compound != buffer.tyres[-1][1]:
+                            buffer.tyres.append((t if t is not None else float("-inf"), compound))
+        elif topic == "DriverList":
+            for number, driver in message.items():
+                if not isinstance(driver, dict):
+                    continue
+                if driver.get("Tla"):
+                    self.driver_codes[number] = driver["Tla"]
+                if driver.get("TeamName"):
+                    self.driver_teams[number] = driver["TeamName"]
+                colour = driver.get("TeamColour")
+                if colour and len(colour) == 6:
+                    self.driver_colors[number] = tuple(int(colour[i:i + 2], 16) for i in (0, 2, 4))
+        elif topic == "LapCount":
+            if message.get("TotalLaps"):
+                self.total_laps = int(message["TotalLaps"])
+        elif topic == "TrackStatus" and t is not None:
+            if message.get("Status"):
+                self.track_statuses.append({"status": str(message["Status"]), "t": t})
+        elif topic == "WeatherData" and t is not None:
+            try:
+                self._weather.append((t, {
+                    "track_temp": float(message["TrackTemp"]),
+                    "air_temp": float(message["AirTemp"]),
+                    "humidity": float(message["Humidity"]),
+                    "wind_speed": float(message["WindSpeed"]),
+                    "wind_direction": float(message["WindDirection"]),
+                    "rainfall": float(message.get("Rainfall", 0) or 0),
+                }))
+            except (KeyError, ValueError, TypeError):
+                pass
+
+    def _live_edge(self):
+        """(first sample time, live edge) over the drivers with data, or None."""
+        last = {number: buffer.last_time() for number, buffer in self._drivers.items()}
+        last = {number: t for number, t in last.items() if t is not None}
+        if not last:
+            return None
+        newest = max(last.values())
+        edge = min(t for t in last.values() if t >= newest - STALE_DRIVER_S)
+        first = min(min(self._drivers[n].pos_t[0], self._drivers[n].car_t[0]) for n in last)
+        return first, edge
+
+    def _frame_key(self, number):
+        key = self._frame_keys.get(number)
+        if key is None:
+            key = self._frame_keys[number] = self.driver_codes.get(number, number)
+        return key
+
+    def _build_frames(self):
+        bounds = self._live_edge()
+        if bounds is None:
+            return 0
+        first, edge = bounds
+        if self._t_start is None:
+            missing_codes = [number for number, buffer in self._drivers.items()
+                             if buffer.last_time() is not None and number not in self.driver_codes]
+            if missing_codes and edge - first < DRIVER_LIST_WAIT_S:
+                return 0
+            self._t_start = first
+            self._next_t = first
+        timeline = np.arange(self._next_t, edge, DT)
+        if not len(timeline):
+            return 0
+
+        lap_length = float(np.median(self._lap_lengths)) if self._lap_lengths else None
+        driver_arrays = {}
+        for number, buffer in self._drivers.items():
+            if buffer.last_time() is None:
+                continue
+            arrays = buffer.resample(timeline)
+            arrays["rel_dist"] = np.clip(arrays["dist"] / lap_length, 0, 1) if lap_length else np.zeros(len(timeline))
+            driver_arrays[self._frame_key(number)] = arrays
+
+        weather = None
+        if self._weather:
+            idx = np.clip(np.searchsorted([t for t, _ in self._weather], timeline, side="right") - 1, 0, None)
+            weather = {key: np.asarray([w[key] for _, w in self._weather])[idx] for key in self._weather[0][1]}
+
+        new_frames = _assemble_frames((timeline - self._t_start, driver_arrays, weather))
+        self.frames.extend(new_frames)
+        self._next_t = timeline[-1] + DT
+        for buffer in self._drivers.values():
+            buffer.trim(self._next_t - LOOKBACK_S)
+        return len(new_frames)
+
+    def poll(self):
+        """Ingests the lines added to the recording since the last poll. Returns the number of new frames."""
+        for line in self._read_new_lines():
+            if not line.strip():
+                continue
+            parsed = _parse_line(line)
+            if parsed is None:
+                continue
+            topic, message, unix_time = parsed
+            # Lines without a timestamp (initial state) count as received with the previous line
+            t = self._time(unix_time)
+            if t is None:
+                t = self._last_t
+            self._last_t = t
+            try:
+                self._handle(topic, message, t)
+            except (ValueError, TypeError, KeyError, AttributeError, zlib.error) as e:
+                print(f"Live feed: skipped a {topic} message ({e})")
+        return self._build_frames()
+
+    def replay_track_statuses(self):
+        """Track status changes in the race cache format, on the replay timeline."""
+        t_start = self._t_start or 0.0
+        statuses = []
+        for change in self.track_statuses:
+            if statuses:
+                statuses[-1]["end_time"] = change["t"] - t_start
+            statuses.append({"status": change["status"], "start_time": change["t"] - t_start, "end_time": None})
+        return statuses
+
+    def driver_colors_by_code(self):
+        # Looked up, not fixed: only appearing in a frame fixes a driver's key
+        return {self._frame_keys.get(number, self.driver_codes.get(number, number)): colour
+                for number, colour in self.driver_colors.items()}
+
+    def start(self):
+        def run():
+            while not self._stop.is_set():
+                try:
+                    self.poll()
+                except OSError as e:
+                    print(f"Live feed: could not read {self.path} ({e})")
+                self._stop.wait(self.poll_interval)
+            self.frames.live = False
+
+        self._thread = threading.Thread(target=run, name="live-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def wait_for_frames(self, timeout=None):
+        """Polls until the first frames are built. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.frames:
+            self.poll()
+            if self.frames:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if not os.path.exists(self.path):
+                print(f"Waiting for {self.path}...")
+            time.sleep(self.poll_interval)
+        return True
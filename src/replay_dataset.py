@@ -0,0 +1,208 @@
+import os
+from bisect import bisect_right
+
+import numpy as np
+
+from src.f1_data import FPS, get_telemetry_cache_path
+from src.lib.export import EXPORT_CHANNELS, chunk_columns, column_chunks, frame_range
+from src.lib.frame_store import load_replay_cache
+from src.lib.laps import get_lap
+from src.lib.race_control import MESSAGE_DISPLAY_S, active_messages
+from src.lib.race_events import extract_race_events, race_order_from_frames, race_positions
+
+# Library access to race replay data, for notebooks and headless services.
+#
+#   from src.replay_dataset import ReplayDataset
+#
+#   ds = ReplayDataset.from_session(2025, 12)          # or ReplayDataset("computed_data/...pkl")
+#   ds.drivers, ds.total_laps, ds.duration
+#   ds.slice(["VER", "NOR"], ["x", "y", "speed"], from_lap=10, to_lap=12)
+#   ds.state_at(1234.5)                                # every driver at replay time t
+#   ds.laps("VER"), ds.lap("VER", 12), ds.events(), ds.messages_at(1234.5)
+#
+# It reads the same race/sprint cache in computed_data as the replay window, so the cache has to
+# be built first (by running the replay once, or `python main.py ... --refresh-data`). The cache
+# file is only read on first use, slices index the cache's column files (frames of older caches
+# are read a chunk at a time, see frame_store), and
+# nothing here imports arcade, PySide6 or FastF1 (from_session imports FastF1 to resolve the
+# event name, but loads no session data).
+#
+# Query results are dicts of NumPy arrays: "frame", "t" and "leader_lap" of shape (frames,),
+# "drivers" (driver codes, in column order) and one (frames, drivers) array per channel
+# (EXPORT_CHANNELS). Missing values are NaN for float channels and -1 for integer ones.
+
+class ReplayDataset:
+    def __init__(self, cache_path):
+        if not os.path.exists(cache_path):
+            raise FileNotFoundError(f"No replay cache at {cache_path}; run the replay of this session once first")
+        self.cache_path = cache_path
+        self.fps = FPS
+        self._data = None
+        self._events = None
+
+    @classmethod
+    def from_session(cls, year, round_number, session_type='R'):
+        """Dataset of a race ('R') or sprint ('S') from its replay cache in computed_data."""
+        if session_type not in ('R', 'S'):
+            raise ValueError("ReplayDataset covers races and sprints ('R' or 'S')")
+        from src.f1_data import enable_cache, get_session
+
+        enable_cache()
+        session = get_session(year, round_number, session_type)
+        return cls(get_telemetry_cache_path(session, session_type))
+
+    @property
+    def data(self):
+        if self._data is None:
+            data = load_replay_cache(self.cache_path)
+            if "frames" not in data:
+                raise ValueError(f"{self.cache_path} is not a race or sprint replay cache")
+            self._data = data
+        return self._data
+
+    @property
+    def frames(self):
+        return self.data["frames"]
+
+    @property
+    def n_frames(self):
+        return len(self.frames)
+
+    @property
+    def duration(self):
+        """Replay time (seconds) of the last frame."""
+        return self.frames[self.n_frames - 1]["t"] if self.n_frames else 0.0
+
+    @property
+    def drivers(self):
+        return list(self.frames[0]["drivers"].keys()) if self.n_frames else []
+
+    @property
+    def channels(self):
+        return list(EXPORT_CHANNELS)
+
+    @property
+    def total_laps(self):
+        return self.data.get("total_laps", 0)
+
+    @property
+    def track_statuses(self):
+        return self.data.get("track_statuses", [])
+
+    @property
+    def driver_colors(self):
+        return self.data.get("driver_colors", {})
+
+    @property
+    def driver_teams(self):
+        return self.data.get("driver_teams", {})
+
+    @property
+    def driver_names(self):
+        return self.data.get("driver_names", {})
+
+    @property
+    def lap_table(self):
+        return self.data.get("lap_table")
+
+    @property
+    def race_order(self):
+        """Order of the cars at every frame (see race_events); built from the frames for older caches."""
+        if self.data.get("race_order") is None:
+            self.data["race_order"] = race_order_from_frames(self.frames)
+        return self.data["race_order"]
+
+    @property
+    def sector_timing(self):
+        """Sector and mini-sector crossing times and status (see sectors.py); None for older caches."""
+        return self.data.get("sector_timing")
+
+    @property
+    def race_control(self):
+        """Time-sorted race control messages (see race_control.py); None for older caches."""
+        return self.data.get("race_control")
+
+    def messages_at(self, t, display_s=MESSAGE_DISPLAY_S):
+        """Race control messages issued in the display_s seconds up to replay time t, newest first."""
+        return active_messages(self.race_control, t, display_s)
+
+    def positions(self):
+        """(frames, drivers) array of race positions, with the driver codes of its columns."""
+        return race_positions(self.race_order), list(self.race_order["drivers"])
+
+    def frame_at(self, t):
+        """Index of the last frame at or before replay time t (seconds)."""
+        frames = self.frames
+        if not len(frames):
+            raise ValueError("Replay has no frames")
+        if getattr(frames, "times", None) is not None:
+            return frames.frame_at_time(t)
+        return max(0, bisect_right(frames, t, key=lambda frame: frame["t"]) - 1)
+
+    def slice(self, drivers=None, channels=None, start=None, end=None, from_lap=None, to_lap=None):
+        """
+        Drivers x time block of channels. start/end are replay seconds, from_lap/to_lap leader
+        laps (to_lap included); unset bounds don't restrict the range.
+        """
+        drivers = list(drivers) if drivers is not None else self.drivers
+        channels = self._check_channels(channels)
+        first, stop = frame_range(self.frames, start, end, from_lap, to_lap)
+
+        parts = [columns for _, columns in column_chunks(self.frames, first, stop, drivers, channels)]
+        if parts:
+            result = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        else:
+            result = chunk_columns([], drivers, channels)
+        result["frame"] = np.arange(first, first + len(result["t"]))
+        result["drivers"] = drivers
+        return result
+
+    def channel(self, name, drivers=None, **time_range):
+        """One channel as a (frames, drivers) array; time_range as for slice()."""
+        return self.slice(drivers, [name], **time_range)[name]
+
+    def state_at(self, t, channels=None):
+        """Every driver at replay time t: the block of slice() for the frame at or before t."""
+        index = self.frame_at(t)
+        channels = self._check_channels(channels)
+        frame = self.frames[index]
+        drivers = list(frame["drivers"].keys())
+        state = {name: values[0] for name, values in chunk_columns([frame], drivers, channels).items()}
+        state["frame"] = index
+        state["drivers"] = drivers
+        if "weather" in frame:
+            state["weather"] = dict(frame["weather"])
+        return state
+
+    def laps(self, driver=None):
+        """Lap table columns ({field: array indexed by lap number}) of a driver, or {driver: columns} of all."""
+        table = self.lap_table
+        if not table:
+            return {} if driver is None else None
+        if driver is None:
+            return table["drivers"]
+        return table["drivers"].get(driver)
+
+    def lap(self, driver, lap_number):
+        """{field: value} of one lap of a driver, or None (see laps.get_lap)."""
+        return get_lap(self.lap_table, driver, lap_number)
+
+    def events(self):
+        """
+        Race events as shown on the replay's progress bar (flags, retirements, leader changes,
+        overtakes, pit stops, fastest laps), each with a frame index. See race_events.
+        """
+        if self._events is None:
+            self._events = extract_race_events(self.frames, self.track_statuses, self.total_laps or 0,
+                                               race_order=self.race_order, lap_table=self.lap_table)
+        return self._events
+
+    def _check_channels(self, channels):
+        channels = list(channels) if channels is not None else list(EXPORT_CHANNELS)
+        unknown = [channel for channel in channels if channel not in EXPORT_CHANNELS]
+        if unknown:
+            raise ValueError(f"Unknown channel(s): {', '.join(unknown)}")
+        return channels
+
+    def __repr__(self):
+        return f"ReplayDataset({self.cache_path!r})"
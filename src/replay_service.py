@@ -0,0 +1,216 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from src.f1_data import (
+    enable_cache, get_session, get_telemetry_cache_path, prepare_replay_data_in_process,
+)
+
+# Long-lived local replay service.
+#
+# `python main.py --service` starts a daemon that prepares replay data on disk and opens replay
+# windows. The GUI and CLI send it requests as JSON lines over a local socket:
+#   {"cmd": "open", "year": 2025, "round": 12, "session_type": "R", "playback_speed": 1, ...}
+# and get one JSON line back: {"ok": true, ...} or {"ok": false, "error": "..."}.
+#
+# The service only warms the disk cache: it holds no replay data in memory. "prepare" and
+# "open" build a session's replay cache and circuit layout (in a spawned helper process, as the
+# race pipeline's Pool must not be forked from the service's socket threads) unless they are on
+# disk already. "open" then starts the replay window as a `main.py` subprocess, which reads them
+# like any launch: a repeated open skips the FastF1 load and the pipeline, not the window's own
+# imports and cache read. "window" reports whether a window the service opened is still running.
+
+DEFAULT_ADDRESS = os.environ.get("F1_REPLAY_SERVICE", "127.0.0.1:52425")
+
+def _session_key(year, round_number, session_type):
+    return (int(year), int(round_number), session_type)
+
+def _to_json(obj):
+    return json.dumps(obj, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+
+class ReplayService:
+    def __init__(self):
+        # Serialises cache builds; two requests for the same session build it once
+        self._prepare_lock = threading.Lock()
+        # Replay window processes by pid, until they exit
+        self._children = {}
+        self._children_lock = threading.Lock()
+
+    def prepare(self, year, round_number, session_type='R', progress_address=None):
+        """Makes sure the replay cache and circuit layout of a session are on disk. Returns the cache path."""
+        key = _session_key(year, round_number, session_type)
+        with self._prepare_lock:
+            start = time.perf_counter()
+            cache_path = prepare_replay_data_in_process(*key, progress_address=progress_address)
+            print(f"Service: prepared {key} in {time.perf_counter() - start:.1f}s")
+        return cache_path
+
+    def status(self):
+        with self._children_lock:
+            windows = sorted(self._children)
+        return {"windows": windows}
+
+    def frame(self, key, cache_path, index):
+        from src.replay_dataset import ReplayDataset
+
+        if key[2] not in ('R', 'S'):
+            raise ValueError("Frames are only available for races and sprints")
+        frames = ReplayDataset(cache_path).frames
+        index = int(index)
+        if not 0 <= index < len(frames):
+            raise ValueError(f"Frame index {index} out of range (0-{len(frames) - 1})")
+        return frames[index]
+
+    def open_window(self, key, visible_hud=True, progress_address=None, start_lap=None):
+        """
+        Opens a replay window for a prepared session in a main.py subprocess. Returns its pid.
+        """
+        year, round_number, session_type = key
+        cmd = [sys.executable, os.path.join(os.path.dirname(__file__), '..', 'main.py'),
+               "--year", str(year), "--round", str(round_number)]
+        cmd += {"Q": ["--qualifying"], "SQ": ["--sprint-qualifying"], "S": ["--sprint"]}.get(session_type, [])
+        if not visible_hud:
+            cmd.append("--no-hud")
+        if start_lap:
+            cmd += ["--start-lap", str(start_lap)]
+        if progress_address:
+            cmd += ["--progress", progress_address]
+        # close_fds (the default) keeps the listening and client sockets out of the window
+        proc = subprocess.Popen(cmd, close_fds=True)
+        self._watch_child(proc)
+        return proc.pid
+
+    def _watch_child(self, proc):
+        with self._children_lock:
+            self._children[proc.pid] = proc
+
+        def _reap():
+            try:
+                proc.wait()
+            finally:
+                with self._children_lock:
+                    self._children.pop(proc.pid, None)
+
+        threading.Thread(target=_reap, daemon=True).start()
+
+    def window_alive(self, pid):
+        """True while the window process with this pid, opened by this service, is running."""
+        with self._children_lock:
+            proc = self._children.get(int(pid))
+        return proc is not None and proc.poll() is None
+
+    def handle(self, request):
+        cmd = request.get("cmd")
+        if cmd == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if cmd == "status":
+            return {"ok": True, **self.status()}
+        if cmd == "window":
+            return {"ok": True, "alive": self.window_alive(request.get("pid"))}
+        if cmd == "shutdown":
+            return {"ok": True}
+
+        year, round_number = request.get("year"), request.get("round")
+        session_type = request.get("session_type", 'R')
+        if year is None or round_number is None:
+            return {"ok": False, "error": f"'{cmd}' needs a year and a round"}
+        key = _session_key(year, round_number, session_type)
+
+        if cmd == "frame":
+            # Read from the replay cache on disk; the service keeps no frames in memory
+            enable_cache()
+            cache_path = get_telemetry_cache_path(get_session(*key), session_type)
+            return {"ok": True, "frame": self.frame(key, cache_path, request.get("index", 0))}
+        if cmd not in ("prepare", "open"):
+            return {"ok": False, "error": f"Unknown command '{cmd}'"}
+
+        # The helper process reports the build stages to the launcher's progress channel
+        cache_path = self.prepare(*key, progress_address=request.get("progress"))
+        if cmd == "prepare":
+            return {"ok": True, "cache_path": cache_path}
+        pid = self.open_window(
+            key,
+            visible_hud=request.get("visible_hud", True),
+            progress_address=request.get("progress"),
+            start_lap=request.get("start_lap"),
+        )
+        return {"ok": True, "pid": pid}
+
+def run_service(address=DEFAULT_ADDRESS):
+    """Runs the replay service until a "shutdown" request arrives."""
+    enable_cache()
+
+    service = ReplayService()
+    host, port = address.rsplit(":", 1)
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, int(port)))
+    server.listen()
+    stop = threading.Event()
+    print(f"Replay service listening on {address}")
+
+    def _serve(conn):
+        with conn, conn.makefile("r", encoding="utf-8") as stream:
+            for line in stream:
+                try:
+                    request = json.loads(line)
+                    response = service.handle(request)
+                except Exception as e:
+                    request, response = {}, {"ok": False, "error": str(e)}
+                try:
+                    conn.sendall((_to_json(response) + "\n").encode("utf-8"))
+                except OSError:
+                    return
+                if request.get("cmd") == "shutdown":
+                    stop.set()
+                    return
+
+    # accept() times out regularly so a "shutdown" request is noticed
+    server.settimeout(0.5)
+    with server:
+        while not stop.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.settimeout(None)
+            threading.Thread(target=_serve, args=(conn,), daemon=True).start()
+    print("Replay service stopped")
+
+def request(cmd, address=None, timeout=None, **params):
+    """
+    Sends one request to the replay service and returns its response dict.
+    Raises OSError when the service isn't running.
+    """
+    host, port = (address or DEFAULT_ADDRESS).rsplit(":", 1)
+    with socket.create_connection((host, int(port)), timeout=1.0) as sock:
+        # Loading a cold session can take minutes, so only connecting is time limited
+        sock.settimeout(timeout)
+        sock.sendall((_to_json({"cmd": cmd, **params}) + "\n").encode("utf-8"))
+        with sock.makefile("r", encoding="utf-8") as stream:
+            line = stream.readline()
+    if not line:
+        raise ConnectionError("Replay service closed the connection")
+    return json.loads(line)
+
+def window_alive(pid, address=None):
+    """
+    True while a replay window process opened by the service is still running. The service
+    tracks its windows, so this works the same on every platform.
+    """
+    try:
+        return request("window", address=address, timeout=5.0, pid=pid).get("alive", False)
+    except (OSError, ValueError):
+        return False
+
+def is_running(address=None):
+    try:
+        return request("ping", address=address, timeout=1.0).get("ok", False)
+    except (OSError, ValueError):
+        return False
@@ -2,6 +2,10 @@ import arcade
 from typing import List, Literal, Tuple, Optional
 from typing import Sequence, Optional, Tuple
 from src.lib.time import format_time
+from src.lib.laps import get_lap
+from src.lib import race_events
+from src.lib import sectors
+from src.lib.circuit import build_circuit_layout, find_drs_zones
 import numpy as np
 import os
 
@@ -239,6 +243,13 @@ class WeatherComponent(BaseComponent):
         window.weather_bottom = last_y - 20
 
 class LeaderboardComponent(BaseComponent):
+    # Colour of the strip next to each row: status of the driver's last completed sector
+    SECTOR_COLORS = {
+        sectors.STATUS_SLOWER: (255, 210, 0),
+        sectors.STATUS_PERSONAL_BEST: (0, 200, 80),
+        sectors.STATUS_OVERALL_BEST: (170, 70, 255),
+    }
+
     def __init__(self, x: int, right_margin: int = 260, width: int = 240, visible=True):
         self.x = x
         self.width = width
@@ -304,6 +315,14 @@ class LeaderboardComponent(BaseComponent):
         else:
             new_entries = self.entries
 
+        # Sector status of every driver at the current frame: one row of the cache's matrix
+        sector_row = None
+        timing = getattr(window, "sector_timing", None)
+        if timing is not None and len(timing["sector_status"]):
+            frame = min(int(window.frame_index), len(timing["sector_status"]) - 1)
+            sector_row = timing["sector_status"][frame]
+            sector_columns = window.sector_columns
+
         for i, (code, color, pos, progress_m) in enumerate(new_entries):
             current_pos = i + 1
             top_y = leaderboard_y - 30 - ((current_pos - 1) * self.row_height)
@@ -318,6 +337,11 @@ class LeaderboardComponent(BaseComponent):
                 text_color = arcade.color.BLACK
             else:
                 text_color = color
+            if sector_row is not None and code in sector_columns:
+                sector_color = self.SECTOR_COLORS.get(int(sector_row[sector_columns[code]]))
+                if sector_color:
+                    strip = arcade.XYWH(left_x - 6, (top_y + bottom_y) / 2, 4, self.row_height - 6)
+                    arcade.draw_rect_filled(strip, sector_color)
             text = f"{current_pos}. {code}" if pos.get("rel_dist",0) != 1 else f"{current_pos}. {code}   OUT"
             arcade.Text(text, left_x, top_y, text_color, 16, anchor_x="left", anchor_y="top").draw()
 
@@ -729,6 +753,13 @@ class DriverInfoComponent(BaseComponent):
         cursor_y -= 22
         arcade.Text(gap_behind, left_text_x, cursor_y, arcade.color.LIGHT_GRAY, 11, anchor_y="center").draw()
 
+        # Last completed lap, straight from the cached lap table
+        last_lap = get_lap(getattr(window, "lap_table", None), code, int(driver_pos.get("lap", 1)) - 1)
+        if last_lap and last_lap["lap_time"] is not None:
+            cursor_y -= 22
+            arcade.Text(f"Last lap: {format_time(last_lap['lap_time'])}", left_text_x, cursor_y,
+                        arcade.color.LIGHT_GRAY, 11, anchor_y="center").draw()
+
         # Graphs
         thr, brk = driver_pos.get('throttle', 0), driver_pos.get('brake', 0)
         t_r, b_r = max(0.0, min(1.0, thr / 100.0)), max(0.0, min(1.0, brk / 100.0 if brk > 1.0 else brk))
@@ -830,6 +861,7 @@ class ControlsPopupComponent(BaseComponent):
             "[R]    Restart",
             "[D]    Toggle DRS Zones",
             "[B]    Toggle Progress Bar",
+            "[L]    Jump to live edge (live mode)",
             "[H]    Toggle Help Popup",
         ]
         
@@ -867,11 +899,75 @@ class ControlsPopupComponent(BaseComponent):
 
 
 
+class RaceControlMessagesComponent(BaseComponent):
+    """
+    Race control messages issued in the last few seconds of replay time, newest on top, shown
+    as banners at the top of the track area.
+    """
+    MAX_MESSAGES = 3
+    FLAG_COLORS = {
+        "GREEN": arcade.color.GREEN,
+        "CLEAR": arcade.color.GREEN,
+        "YELLOW": arcade.color.YELLOW,
+        "DOUBLE YELLOW": arcade.color.YELLOW,
+        "RED": arcade.color.RED,
+        "BLUE": arcade.color.BLUE,
+        "CHEQUERED": arcade.color.WHITE,
+        "BLACK AND WHITE": arcade.color.WHITE,
+    }
+
+    def __init__(self, top_offset=20, row_height=26, visible=True):
+        self.top_offset = top_offset
+        self.row_height = row_height
+        self.messages = []
+        self._visible: bool = visible
+        self._text = arcade.Text("", 0, 0, arcade.color.WHITE, 13, anchor_x="left", anchor_y="center")
+
+    @property
+    def visible(self) -> bool:
+        return self._visible
+
+    @visible.setter
+    def visible(self, value: bool):
+        self._visible = value
+
+    def set_messages(self, messages):
+        self.messages = messages[:self.MAX_MESSAGES]
+
+    def draw(self, window):
+        if not self._visible or not self.messages:
+            return
+        left = getattr(window, "left_ui_margin", 340)
+        right = window.width - getattr(window, "right_ui_margin", 260)
+        width = min(620, max(200, right - left - 40))
+        center_x = (left + right) / 2
+        top = window.height - self.top_offset
+
+        for i, message in enumerate(self.messages):
+            center_y = top - (i + 0.5) * self.row_height
+            rect = arcade.XYWH(center_x, center_y, width, self.row_height - 4)
+            arcade.draw_rect_filled(rect, (20, 20, 20, 210))
+            accent = self.FLAG_COLORS.get(message.get("flag", "").upper(), arcade.color.LIGHT_GRAY)
+            arcade.draw_rect_filled(arcade.XYWH(center_x - width / 2 + 3, center_y, 6, self.row_height - 4), accent)
+
+            lap = f"LAP {message['lap']}  " if message.get("lap", -1) > 0 else ""
+            self._text.text = f"{lap}{message.get('message', '')}"
+            self._text.x = center_x - width / 2 + 14
+            self._text.y = center_y
+            # Long messages (penalties, investigations) are cut to the banner
+            if self._text.content_width > width - 24:
+                keep = int(len(self._text.text) * (width - 24) / self._text.content_width) - 3
+                self._text.text = self._text.text[:max(keep, 1)] + "..."
+            self._text.draw()
+
+
 # Feature: race progress bar with event markers
 class RaceProgressBarComponent(BaseComponent):
     """
     A visual progress bar showing race timeline with event markers:
     - DNF markers (red X)
+    - Leader changes (gold triangles), fastest laps (purple dots)
+    - Pit stops and overtakes (short ticks)
     - Lap transition markers (vertical lines)
     - Flag markers (red/yellow rectangles)
     
@@ -882,12 +978,16 @@ class RaceProgressBarComponent(BaseComponent):
     """
     
     # Event type constants for clear identification
-    EVENT_DNF = "dnf"
-    EVENT_LAP = "lap"
-    EVENT_YELLOW_FLAG = "yellow_flag"
-    EVENT_RED_FLAG = "red_flag"
-    EVENT_SAFETY_CAR = "safety_car"
-    EVENT_VSC = "vsc"
+    EVENT_DNF = race_events.EVENT_DNF
+    EVENT_LAP = race_events.EVENT_LAP
+    EVENT_YELLOW_FLAG = race_events.EVENT_YELLOW_FLAG
+    EVENT_RED_FLAG = race_events.EVENT_RED_FLAG
+    EVENT_SAFETY_CAR = race_events.EVENT_SAFETY_CAR
+    EVENT_VSC = race_events.EVENT_VSC
+    EVENT_LEADER_CHANGE = race_events.EVENT_LEADER_CHANGE
+    EVENT_OVERTAKE = race_events.EVENT_OVERTAKE
+    EVENT_PIT_STOP = race_events.EVENT_PIT_STOP
+    EVENT_FASTEST_LAP = race_events.EVENT_FASTEST_LAP
     
     # Color palette following F1 conventions
     COLORS = {
@@ -900,6 +1000,10 @@ class RaceProgressBarComponent(BaseComponent):
         "red_flag": (220, 30, 30),
         "safety_car": (255, 140, 0),
         "vsc": (255, 165, 0),
+        "leader_change": (255, 215, 0),
+        "overtake": (120, 200, 255),
+        "pit_stop": (200, 200, 200),
+        "fastest_lap": (170, 60, 255),
         "text": (220, 220, 220),
         "current_position": (255, 255, 255),
     }
@@ -1120,6 +1224,21 @@ class RaceProgressBarComponent(BaseComponent):
         elif event_type == self.EVENT_VSC:
             # Draw amber segment for VSC
             self._draw_flag_segment(event, self.COLORS["vsc"])
+
+        elif event_type == self.EVENT_LEADER_CHANGE:
+            # Gold triangle pointing down at the bar
+            y = marker_bottom + 9
+            arcade.draw_triangle_filled(x - 4, y + 5, x + 4, y + 5, x, y - 2, self.COLORS["leader_change"])
+
+        elif event_type == self.EVENT_FASTEST_LAP:
+            arcade.draw_circle_filled(x, marker_bottom + 12, 3, self.COLORS["fastest_lap"])
+
+        elif event_type == self.EVENT_PIT_STOP:
+            arcade.draw_line(x, marker_bottom + 8, x, marker_bottom + 15, self.COLORS["pit_stop"], 2)
+
+        elif event_type == self.EVENT_OVERTAKE:
+            # Overtakes are frequent: a thin tick only
+            arcade.draw_line(x, marker_bottom + 8, x, marker_bottom + 12, self.COLORS["overtake"], 1)
             
     def _draw_flag_segment(self, event: dict, color: tuple):
         start_frame = event.get("frame", 0)
@@ -1175,6 +1294,10 @@ class RaceProgressBarComponent(BaseComponent):
             self.EVENT_RED_FLAG: "Red Flag",
             self.EVENT_SAFETY_CAR: "Safety Car",
             self.EVENT_VSC: "Virtual SC",
+            self.EVENT_LEADER_CHANGE: "Lead",
+            self.EVENT_OVERTAKE: "Overtake",
+            self.EVENT_PIT_STOP: "Pit stop",
+            self.EVENT_FASTEST_LAP: "Fastest lap",
         }
         
         tooltip_text = type_names.get(event_type, "Event")
@@ -1257,6 +1380,9 @@ class RaceProgressBarComponent(BaseComponent):
             for event in self._events:
                 event_frame = event.get("frame", 0)
                 dist = abs(event_frame - mouse_frame)
+                if event.get("type") == self.EVENT_OVERTAKE:
+                    # Overtakes are everywhere: only show one when nothing else is close
+                    dist += self._total_frames * 0.01
                 if dist < min_dist and dist < self._total_frames * 0.02:  # Within 2% of timeline
                     min_dist = dist
                     nearest_event = event
@@ -1571,164 +1697,16 @@ class RaceControlsComponent(BaseComponent):
         left, bottom, right, top = rect
         return left <= x <= right and bottom <= y <= top
 
-def extract_race_events(frames: List[dict], track_statuses: List[dict], total_laps: int) -> List[dict]:
-    """
-    Extract race events from frame data for the progress bar.
-    
-    This function analyzes the telemetry frames to identify:
-    - DNF events (when a driver stops appearing)
-    - Leader changes (when the P1 position changes hands)
-    - Flag events (from track_statuses)
-    
-    Args:
-        frames: List of frame dictionaries from telemetry
-        track_statuses: List of track status events
-        total_laps: Total number of laps in the race
-        
-    Returns:
-        List of event dictionaries for the progress bar
-    """
-    events = []
-    
-    if not frames:
-        return events
-        
-    n_frames = len(frames)
-    
-    # Track drivers present in each frame
-    prev_drivers = set()
-    
-    # Sample frames at regular intervals for performance (every 25 frames = 1 second)
-    sample_rate = 25
-    
-    for i in range(0, n_frames, sample_rate):
-        frame = frames[i]
-        drivers_data = frame.get("drivers", {})
-        current_drivers = set(drivers_data.keys())
-        
-        # Detect DNFs (drivers who disappeared)
-        if prev_drivers:
-            dnf_drivers = prev_drivers - current_drivers
-            for driver_code in dnf_drivers:
-                # Get the lap from previous frame if available
-                prev_frame = frames[max(0, i - sample_rate)]
-                driver_info = prev_frame.get("drivers", {}).get(driver_code, {})
-                lap = driver_info.get("lap", "?")
-                
-                events.append({
-                    "type": RaceProgressBarComponent.EVENT_DNF,
-                    "frame": i,
-                    "label": driver_code,
-                    "lap": lap,
-                })
-        
-        prev_drivers = current_drivers
-    
-    # Add flag events from track_statuses
-    for status in track_statuses:
-        status_code = str(status.get("status", ""))
-        start_time = status.get("start_time", 0)
-        end_time = status.get("end_time")
-        
-        # Convert time to frame (assuming 25 FPS)
-        fps = 25
-        start_frame = int(start_time * fps)
-        end_frame = int(end_time * fps) if end_time else start_frame + 250  # Default 10 seconds
-        
-        # This prevents rendering artifacts from pre-race track status events
-        # that shouldn't appear on the timeline... Events that span frame 0
-        # (start < 0 but end > 0) are kept; the drawing code will clamp them
-        if end_frame <= 0:
-            continue
-        
-        # Note: The drawing code also clamps, but normalizing here improves data quality
-        if n_frames > 0:
-            end_frame = min(end_frame, n_frames)
-        
-        event_type = None
-        if status_code == "2":  # Yellow flag
-            event_type = RaceProgressBarComponent.EVENT_YELLOW_FLAG
-        elif status_code == "4":  # Safety Car
-            event_type = RaceProgressBarComponent.EVENT_SAFETY_CAR
-        elif status_code == "5":  # Red flag
-            event_type = RaceProgressBarComponent.EVENT_RED_FLAG
-        elif status_code in ("6", "7"):  # VSC
-            event_type = RaceProgressBarComponent.EVENT_VSC
-            
-        if event_type:
-            events.append({
-                "type": event_type,
-                "frame": start_frame,
-                "end_frame": end_frame,
-                "label": "",
-                "lap": None,
-            })
-    
-    return events
-
 # Build track geometry from example lap telemetry
 def build_track_from_example_lap(example_lap, track_width=200):
-    drs_zones = plotDRSzones(example_lap)
-    plot_x_ref = example_lap["X"]
-    plot_y_ref = example_lap["Y"]
-
-    # compute tangents
-    dx = np.gradient(plot_x_ref)
-    dy = np.gradient(plot_y_ref)
-
-    norm = np.sqrt(dx**2 + dy**2)
-    norm[norm == 0] = 1.0
-    dx /= norm
-    dy /= norm
-
-    nx = -dy
-    ny = dx
-
-    x_outer = plot_x_ref + nx * (track_width / 2)
-    y_outer = plot_y_ref + ny * (track_width / 2)
-    x_inner = plot_x_ref - nx * (track_width / 2)
-    y_inner = plot_y_ref - ny * (track_width / 2)
-
-    # world bounds
-    x_min = min(plot_x_ref.min(), x_inner.min(), x_outer.min())
-    x_max = max(plot_x_ref.max(), x_inner.max(), x_outer.max())
-    y_min = min(plot_y_ref.min(), y_inner.min(), y_outer.min())
-    y_max = max(plot_y_ref.max(), y_inner.max(), y_outer.max())
-
-    return (plot_x_ref, plot_y_ref, x_inner, y_inner, x_outer, y_outer,
-            x_min, x_max, y_min, y_max, drs_zones)
+    layout = build_circuit_layout(example_lap, track_width=track_width)
+    return (layout["x_ref"], layout["y_ref"], layout["x_inner"], layout["y_inner"],
+            layout["x_outer"], layout["y_outer"], layout["x_min"], layout["x_max"],
+            layout["y_min"], layout["y_max"], layout["drs_zones"])
 
 # Plot DRS Zones along the track sides to show DRS Zones on the track
 def plotDRSzones(example_lap):
-   x_val = example_lap["X"]
-   y_val = example_lap["Y"]
-   drs_zones = []
-   drs_start = None
-
-   for i, val in enumerate(example_lap["DRS"]):
-       if val in [10, 12, 14]:
-           if drs_start is None:
-               drs_start = i
-       else:
-           if drs_start is not None:
-               drs_end = i - 1
-               zone = {
-                   "start": {"x": x_val.iloc[drs_start], "y": y_val.iloc[drs_start], "index": drs_start},
-                   "end": {"x": x_val.iloc[drs_end], "y": y_val.iloc[drs_end], "index": drs_end}
-               }
-               drs_zones.append(zone)
-               drs_start = None
-   
-   # Handle case where DRS zone extends to end of lap
-   if drs_start is not None:
-       drs_end = len(example_lap["DRS"]) - 1
-       zone = {
-           "start": {"x": x_val.iloc[drs_start], "y": y_val.iloc[drs_start], "index": drs_start},
-           "end": {"x": x_val.iloc[drs_end], "y": y_val.iloc[drs_end], "index": drs_end}
-       }
-       drs_zones.append(zone)
-   
-   return drs_zones
+   return find_drs_zones(example_lap["X"], example_lap["Y"], example_lap["DRS"])
 
 def draw_finish_line(self, session_type = 'R'):
     if(session_type not in ['R', 'Q']):
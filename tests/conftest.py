@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def race_cache(tmp_path_factory):
+    """Path of a race replay cache built by the real pipeline from a small synthetic race."""
+    from benchmarks.synthetic_session import make_session
+    from src.f1_data import get_race_telemetry, get_telemetry_cache_path
+
+    session = make_session('R', n_drivers=4, n_laps=3, lap_s=60.0, red_flags=[(60.0, 30.0)], retirements=1)
+    work_dir = tmp_path_factory.mktemp("race")
+    cwd = os.getcwd()
+    # The pipeline writes to computed_data/ in the working directory
+    os.chdir(work_dir)
+    try:
+        get_race_telemetry(session)
+    finally:
+        os.chdir(cwd)
+    return os.path.join(str(work_dir), get_telemetry_cache_path(session, 'R'))
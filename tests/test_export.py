@@ -0,0 +1,100 @@
+import csv
+
+import numpy as np
+import pytest
+
+from src.lib.export import EXPORT_CHANNELS, chunk_columns, export_replay, frame_range
+from src.lib.frame_store import FrameChunkWriter
+
+
+def make_frames(n):
+    """n frames 0.5 s apart, a new leader lap every 4 frames; NOR retires (leaves the frames) at frame 10."""
+    frames = []
+    for i in range(n):
+        drivers = {"VER": {channel: i for channel in EXPORT_CHANNELS}}
+        if i < 10:
+            drivers["NOR"] = {channel: -i for channel in EXPORT_CHANNELS}
+        frames.append({"t": i * 0.5, "lap": 1 + i // 4, "drivers": drivers})
+    return frames
+
+
+def chunked(tmp_path, frames, size=5):
+    writer = FrameChunkWriter(str(tmp_path / "race_frames_1"))
+    for lo in range(0, len(frames), size):
+        writer.add_chunk(frames[lo:lo + size])
+    return writer.finish()
+
+
+@pytest.mark.parametrize("store", ["list", "chunked"])
+@pytest.mark.parametrize("bounds, expected", [
+    ({}, (0, 23)),
+    ({"start_time": 2.2, "end_time": 5.0}, (5, 10)),
+    ({"start_time": 2.0}, (4, 23)),
+    ({"from_lap": 2, "to_lap": 3}, (4, 12)),
+    ({"from_lap": 2, "start_time": 4.5}, (9, 23)),
+    ({"to_lap": 0}, (0, 0)),
+    ({"from_lap": 9}, (23, 23)),
+    ({"start_time": 20.0, "end_time": 1.0}, (23, 23)),
+])
+def test_frame_range(tmp_path, store, bounds, expected):
+    frames = make_frames(23)
+    if store == "chunked":
+        frames = chunked(tmp_path, frames)
+
+    assert frame_range(frames, **bounds) == expected
+
+
+def test_chunk_columns_fills_missing_drivers():
+    columns = chunk_columns(make_frames(12)[8:], ["NOR", "VER", "HAM"], ["x", "gear"])
+
+    np.testing.assert_array_equal(columns["t"], [4.0, 4.5, 5.0, 5.5])
+    np.testing.assert_array_equal(columns["leader_lap"], [3, 3, 3, 3])
+    np.testing.assert_array_equal(columns["x"], [[-8, 8, np.nan], [-9, 9, np.nan], [np.nan, 10, np.nan],
+                                                 [np.nan, 11, np.nan]])
+    assert columns["gear"].dtype == np.int16
+    np.testing.assert_array_equal(columns["gear"][:, 2], [-1, -1, -1, -1])
+
+
+@pytest.mark.parametrize("store", ["list", "chunked"])
+def test_npz_export(tmp_path, store):
+    frames = make_frames(23)
+    data = {"frames": chunked(tmp_path, frames) if store == "chunked" else frames}
+    path = str(tmp_path / "out.npz")
+
+    assert export_replay(data, path, "npz", drivers=["VER", "NOR"], channels=["x", "lap"], from_lap=2) == 19
+
+    with np.load(path) as npz:
+        assert sorted(npz.files) == ["drivers", "frame", "lap", "leader_lap", "t", "x"]
+        np.testing.assert_array_equal(npz["frame"], np.arange(4, 23))
+        np.testing.assert_array_equal(npz["t"], np.arange(4, 23) * 0.5)
+        assert list(npz["drivers"]) == ["VER", "NOR"]
+        np.testing.assert_array_equal(npz["x"][:, 0], np.arange(4, 23))
+        np.testing.assert_array_equal(npz["x"][:6, 1], -np.arange(4, 10))
+        assert np.isnan(npz["x"][6:, 1]).all()
+        assert (npz["lap"][6:, 1] == -1).all()
+
+
+def test_csv_export(tmp_path):
+    path = str(tmp_path / "out.csv")
+
+    assert export_replay({"frames": make_frames(23)}, path, "csv", channels=["speed"], start_time=4.0, end_time=5.0) == 2
+
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [
+        ["frame", "t", "leader_lap", "driver", "speed"],
+        ["8", "4.0", "3", "VER", "8.0"],
+        ["8", "4.0", "3", "NOR", "-8.0"],
+        ["9", "4.5", "3", "VER", "9.0"],
+        ["9", "4.5", "3", "NOR", "-9.0"],
+    ]
+
+
+def test_export_rejects_unknown_formats_and_channels(tmp_path):
+    data = {"frames": make_frames(3)}
+    with pytest.raises(ValueError, match="format"):
+        export_replay(data, str(tmp_path / "out.parquet"), "parquet")
+    with pytest.raises(ValueError, match="wind"):
+        export_replay(data, str(tmp_path / "out.csv"), channels=["x", "wind"])
+    with pytest.raises(ValueError, match="qualifying"):
+        export_replay({"results": []}, str(tmp_path / "out.csv"))
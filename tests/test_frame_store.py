@@ -0,0 +1,139 @@
+import os
+import pickle
+import shutil
+
+import pytest
+
+from src.lib.cache_io import atomic_pickle_dump
+from src.lib.frame_store import (
+    RESIDENT_CHUNKS, ChunkedFrames, FrameChunkWriter, find_chunk_dir, load_replay_cache, new_chunk_dir,
+    remove_stale_chunk_dirs,
+)
+
+
+def make_frames(n, laps_every=4):
+    """n frames 0.5 s apart; the leader starts a new lap every laps_every frames, from lap 1."""
+    return [{"t": i * 0.5, "lap": 1 + i // laps_every,
+             "drivers": {"VER": {"x": float(i), "position": 1}, "NOR": {"x": i - 1.0, "position": 2}}}
+            for i in range(n)]
+
+
+def write_chunks(directory, frames, size, keep_resident=True):
+    writer = FrameChunkWriter(directory, keep_resident=keep_resident)
+    for lo in range(0, len(frames), size):
+        writer.add_chunk(frames[lo:lo + size])
+    return writer.finish()
+
+
+def read_chunk_files(directory):
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), "rb") as f:
+            frames += pickle.load(f)
+    return frames
+
+
+def test_chunked_frames_index_like_the_frame_list(tmp_path):
+    frames = make_frames(23)
+    chunked = write_chunks(str(tmp_path / "race_frames_1"), frames, 5)
+
+    assert len(chunked) == 23 and chunked.n_chunks == 5
+    assert sorted(os.listdir(tmp_path / "race_frames_1")) == [f"chunk_{k:05d}.pkl" for k in range(5)]
+    assert [chunked[i] for i in range(23)] == frames
+    assert chunked[-1] == frames[-1]
+    assert chunked[3:12:2] == frames[3:12:2]
+    with pytest.raises(IndexError):
+        chunked[23]
+
+
+def test_lap_and_time_index(tmp_path):
+    frames = make_frames(23)
+    chunked = write_chunks(str(tmp_path / "race_frames_1"), frames, 5)
+
+    assert [chunked.frame_for_lap(lap) for lap in range(7)] == [0, 0, 4, 8, 12, 16, 20]
+    # Clamped to the race
+    assert chunked.frame_for_lap(99) == 20
+    assert chunked.frame_at_time(3.2) == 6
+    assert chunked.frame_at_time(3.0) == 6
+    assert chunked.frame_at_time(-1.0) == 0
+    assert chunked.frame_at_time(100.0) == 22
+
+
+def test_iter_chunks_covers_a_range(tmp_path):
+    frames = make_frames(23)
+    chunked = write_chunks(str(tmp_path / "race_frames_1"), frames, 5)
+
+    parts = list(chunked.iter_chunks(3, 17))
+    assert [first for first, _ in parts] == [3, 5, 10, 15]
+    assert [frame for _, chunk in parts for frame in chunk] == frames[3:17]
+    assert list(chunked.iter_chunks(10, 10)) == []
+
+
+def test_cache_round_trip_from_another_directory(tmp_path):
+    frames = make_frames(23)
+    cache_path = str(tmp_path / "race.pkl")
+    chunk_dir = new_chunk_dir(cache_path)
+    atomic_pickle_dump({"frames": write_chunks(chunk_dir, frames, 5), "total_laps": 6}, cache_path)
+
+    # The cache file references its chunks, not their contents
+    with open(cache_path, "rb") as f:
+        assert len(pickle.load(f)["frames"]._chunks) == 0
+    assert find_chunk_dir(cache_path) == chunk_dir
+
+    moved = tmp_path / "copy"
+    moved.mkdir()
+    shutil.copy(cache_path, moved / "race.pkl")
+    shutil.copytree(chunk_dir, moved / os.path.basename(chunk_dir))
+    shutil.rmtree(chunk_dir)
+
+    data = load_replay_cache(str(moved / "race.pkl"))
+    assert isinstance(data["frames"], ChunkedFrames)
+    assert data["frames"].directory == str(moved / os.path.basename(chunk_dir))
+    assert list(data["frames"]) == frames
+    assert data["frames"].frame_for_lap(3) == 8
+
+
+def test_memory_budget_mode_keeps_few_chunks(tmp_path):
+    frames = make_frames(60)
+    chunked = write_chunks(str(tmp_path / "race_frames_1"), frames, 5, keep_resident=False)
+
+    assert chunked.resident_chunks == RESIDENT_CHUNKS
+    assert chunked.loaded_chunks() == 0
+    assert list(chunked) == frames
+    assert chunked.loaded_chunks() == RESIDENT_CHUNKS
+    # Only frames of chunks kept in memory are loaded in the background
+    assert chunked.start_background_load() is False
+
+
+def test_background_load_reads_every_chunk(tmp_path):
+    frames = make_frames(23)
+    write_chunks(str(tmp_path / "race_frames_1"), frames, 5)
+    chunked = pickle.loads(pickle.dumps(ChunkedFrames(str(tmp_path / "race_frames_1"), [0, 5, 10, 15, 20], 23)))
+
+    assert chunked.start_background_load(12) is True
+    chunked._loader.join(10)
+    assert chunked.fully_loaded()
+
+
+def test_writer_never_replaces_a_directory(tmp_path):
+    directory = str(tmp_path / "race_frames_1")
+    write_chunks(directory, make_frames(10), 5)
+
+    writer = FrameChunkWriter(directory)
+    writer.add_chunk(make_frames(3))
+    with pytest.raises(OSError):
+        writer.finish()
+    writer.abort()
+    assert sorted(os.listdir(tmp_path)) == ["race_frames_1"]
+    assert read_chunk_files(directory) == make_frames(10)
+
+
+def test_remove_stale_chunk_dirs_keeps_the_current_build(tmp_path):
+    cache_path = str(tmp_path / "race.pkl")
+    old, current = new_chunk_dir(cache_path), new_chunk_dir(cache_path)
+    for directory in (old, current, str(tmp_path / "race_frames"), str(tmp_path / "other_frames_1")):
+        os.makedirs(directory)
+
+    remove_stale_chunk_dirs(cache_path, keep=current)
+
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(current), "other_frames_1"])
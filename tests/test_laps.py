@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from src.lib.laps import LAP_FIELDS, build_lap_table, get_lap, get_lap_column
+
+
+def _laps():
+    s = lambda *values: pd.to_timedelta(values, unit="s")
+    return pd.DataFrame({
+        "DriverNumber": ["1", "1", "1", "4"],
+        "LapNumber": [1.0, 2.0, 9.0, 1.0],
+        "LapTime": s(95.0, 90.5, 90.0, np.nan),
+        "Sector1Time": s(30.0, 29.0, 29.0, np.nan),
+        "Sector2Time": s(35.0, 33.0, 33.0, 34.0),
+        "Sector3Time": s(30.0, 28.5, 28.0, 30.0),
+        "LapStartTime": s(99.0, 195.0, 900.0, 100.0),
+        "Time": s(195.0, 285.5, 990.0, 200.0),
+        "Compound": ["SOFT", "HARD", "HARD", None],
+        "TyreLife": [1.0, 1.0, 8.0, np.nan],
+        "Stint": [1.0, 2.0, 2.0, 1.0],
+        "Position": [1.0, 2.0, 1.0, 2.0],
+        "PitInTime": s(190.0, np.nan, np.nan, np.nan),
+        "PitOutTime": s(np.nan, 196.0, np.nan, np.nan),
+        "IsPersonalBest": [False, True, True, False],
+    })
+
+
+def test_lap_table_is_indexed_by_lap_number():
+    table = build_lap_table(_laps(), {"1": "VER", "4": "NOR", "16": "LEC"}, 100.0, 3, 25)
+
+    assert table["fields"] == list(LAP_FIELDS)
+    ver = table["drivers"]["VER"]
+    assert all(len(column) == 4 and column.dtype == LAP_FIELDS[name] for name, column in ver.items())
+    np.testing.assert_allclose(ver["lap_time"][1:3], [95.0, 90.5])
+    np.testing.assert_allclose(ver["lap_start"][1:3], [-1.0, 95.0])
+    np.testing.assert_allclose(ver["lap_end"][1:3], [95.0, 185.5])
+    # Frames are counted from the first replay frame, never before it
+    assert list(ver["start_frame"]) == [-1, 0, 2375, -1]
+    assert list(ver["stint"]) == [-1, 1, 2, -1]
+    assert list(ver["pit_in"]) == [False, True, False, False]
+    assert list(ver["pit_out"]) == [False, False, True, False]
+    assert list(ver["personal_best"]) == [False, False, True, False]
+    # Lap 9 is beyond total_laps and index 0 is never used
+    assert np.isnan(ver["lap_time"][0]) and np.isnan(ver["lap_time"][3])
+
+    nor = table["drivers"]["NOR"]
+    assert np.isnan(nor["lap_time"][1]) and nor["compound"][1] == -1 and nor["tyre_life"][1] == -1
+    # Drivers without laps get empty columns
+    assert np.isnan(table["drivers"]["LEC"]["lap_time"]).all()
+
+
+def test_get_lap_returns_python_values_and_none_for_missing():
+    table = build_lap_table(_laps(), {"1": "VER", "4": "NOR"}, 100.0, 3, 25)
+
+    lap = get_lap(table, "NOR", 1)
+    assert lap["lap_time"] is None and lap["compound"] is None and lap["tyre_life"] is None
+    assert lap["sector2"] == 34.0 and lap["position"] == 2 and lap["pit_in"] is False
+    assert get_lap(table, "VER", 0) is None
+    assert get_lap(table, "VER", 4) is None
+    assert get_lap(table, "HAM", 1) is None
+    assert get_lap(None, "VER", 1) is None
+    assert get_lap_column(table, "VER", "sector1")[2] == 29.0
+    assert get_lap_column(table, "HAM", "sector1") is None
@@ -0,0 +1,118 @@
+import base64
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from src.f1_data import DT
+from src.live_feed import DRIVER_LIST_WAIT_S, LiveFeedIngestor, _parse_line
+
+START = datetime(2025, 7, 6, 14, 0, tzinfo=timezone.utc)
+
+
+def stamp(t):
+    return (START + timedelta(seconds=t)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def deflate(message):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    raw = compressor.compress(json.dumps(message).encode()) + compressor.flush()
+    return base64.b64encode(raw).decode()
+
+
+def line(topic, message, t=None):
+    """A line as FastF1's SignalRClient records it; t None records an initial state."""
+    if t is None:
+        return repr([topic, json.dumps(message), ""]) + "\n"
+    return repr([topic, message, stamp(t)]) + "\n"
+
+
+def car_lines(numbers, t0, t1, hz=4):
+    """Position and car data of cars driving at 36 km/h (10 m/s) along x, one 0.5 m apart from the next."""
+    lines = []
+    for t in np.arange(t0, t1, 1 / hz):
+        position = {"Position": [{"Timestamp": stamp(t), "Entries": {
+            number: {"X": 10.0 * t - 0.5 * i, "Y": 0.0, "Z": 0.0} for i, number in enumerate(numbers)}}]}
+        cars = {"Entries": [{"Utc": stamp(t), "Cars": {
+            number: {"Channels": {"2": 36, "3": 4, "4": 50, "5": 0, "45": 0}} for number in numbers}}]}
+        lines += [line("Position.z", deflate(position), t), line("CarData.z", deflate(cars), t)]
+    return lines
+
+
+DRIVER_LIST = {"1": {"Tla": "VER", "TeamName": "Red Bull Racing", "TeamColour": "3671C6"},
+               "4": {"Tla": "NOR", "TeamName": "McLaren", "TeamColour": "FF8000"}}
+
+
+def test_parse_line():
+    assert _parse_line(line("LapCount", {"CurrentLap": 3}, 1.0)) == ("LapCount", {"CurrentLap": 3}, START.timestamp() + 1)
+    # Initial states are JSON strings without a timestamp
+    assert _parse_line(line("DriverList", DRIVER_LIST)) == ("DriverList", DRIVER_LIST, None)
+    assert _parse_line("['TrackStatus', {'Status': '1'}") is None
+    assert _parse_line("not a recording") is None
+
+
+def test_frames_grow_as_the_recording_grows(tmp_path):
+    path = tmp_path / "race.txt"
+    path.write_text(line("DriverList", DRIVER_LIST) + line("LapCount", {"TotalLaps": 57}, 0.0)
+                    + line("TrackStatus", {"Status": "1", "Message": "AllClear"}, 0.0)
+                    + "".join(car_lines(["1", "4"], 0.0, 4.0)))
+    feed = LiveFeedIngestor(str(path))
+
+    n = feed.poll()
+    assert n == len(feed.frames) > 0
+    assert feed.total_laps == 57
+    frames = list(feed.frames)
+    np.testing.assert_allclose([frame["t"] for frame in frames], np.round(np.arange(n) * DT, 3))
+    last = frames[-1]["drivers"]
+    assert set(last) == {"VER", "NOR"}
+    assert last["VER"]["position"] == 1 and last["NOR"]["position"] == 2
+    assert last["VER"]["speed"] == 36.0 and last["VER"]["gear"] == 4
+    assert last["VER"]["dist"] == pytest.approx(10.0 * frames[-1]["t"], abs=0.5)
+
+    # A line written in two parts is only read once it is complete
+    more = "".join(car_lines(["1", "4"], 4.0, 8.0)) + line("TrackStatus", {"Status": "4"}, 6.0)
+    with open(path, "a") as f:
+        f.write(more[:-20])
+    feed.poll()
+    with open(path, "a") as f:
+        f.write(more[-20:])
+    feed.poll()
+
+    assert feed.frames[:len(frames)] == frames
+    assert feed.frames[-1]["t"] > 7.0
+    assert feed.replay_track_statuses() == [{"status": "1", "start_time": 0.0, "end_time": 6.0},
+                                            {"status": "4", "start_time": 6.0, "end_time": None}]
+    assert feed.driver_colors_by_code() == {"VER": (0x36, 0x71, 0xC6), "NOR": (0xFF, 0x80, 0x00)}
+
+
+def test_drivers_without_a_code_keep_their_racing_number(tmp_path):
+    path = tmp_path / "race.txt"
+    path.write_text("".join(car_lines(["1", "4"], 0.0, 10.0)))
+    feed = LiveFeedIngestor(str(path))
+
+    # Frames wait for DriverList for a while
+    assert feed.poll() == 0
+    with open(path, "a") as f:
+        f.write("".join(car_lines(["1", "4"], 10.0, DRIVER_LIST_WAIT_S + 2)))
+    assert feed.poll() > 0
+    assert set(feed.frames[-1]["drivers"]) == {"1", "4"}
+
+    # A late DriverList doesn't rename drivers already in the frames
+    with open(path, "a") as f:
+        f.write(line("DriverList", DRIVER_LIST, DRIVER_LIST_WAIT_S + 2)
+                + "".join(car_lines(["1", "4"], DRIVER_LIST_WAIT_S + 2, DRIVER_LIST_WAIT_S + 4)))
+    feed.poll()
+    assert set(feed.frames[-1]["drivers"]) == {"1", "4"}
+    assert set(feed.driver_colors_by_code()) == {"1", "4"}
+
+
+def test_bad_messages_are_skipped(tmp_path, capsys):
+    path = tmp_path / "race.txt"
+    path.write_text(line("DriverList", DRIVER_LIST) + line("CarData.z", "bm90IGRlZmxhdGU=", 0.0)
+                    + "garbage\n" + "".join(car_lines(["1", "4"], 0.0, 2.0)))
+    feed = LiveFeedIngestor(str(path))
+
+    assert feed.poll() > 0
+    assert "skipped a CarData.z message" in capsys.readouterr().out
@@ -0,0 +1,134 @@
+import io
+import json
+import os
+import tarfile
+
+import pytest
+
+from tools import offline_cache
+
+
+def _tmp_with_files(tmp_path, *names):
+    tmp = tmp_path / "extracted"
+    for name in names:
+        path = tmp / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"data")
+    return str(tmp)
+
+
+def _archive(path, members, manifest=None):
+    """Writes a tar.gz of (name, bytes) members (bytes None: a symlink out of the archive)."""
+    with tarfile.open(path, "w:gz") as tar:
+        if manifest is not None:
+            members = [(offline_cache.MANIFEST_NAME, json.dumps(manifest).encode())] + list(members)
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            if data is None:
+                info.type = tarfile.SYMTYPE
+                info.linkname = "../../outside"
+                tar.addfile(info)
+            else:
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    return str(path)
+
+
+def test_unpack_destinations_maps_cache_and_computed_files(tmp_path):
+    tmp = _tmp_with_files(tmp_path, "fastf1-cache/2025/race/car_data.ff1pkl", "computed_data/race.pkl")
+    cache_dir = str(tmp_path / "cache")
+    manifest = {"files": ["fastf1-cache/2025/race/car_data.ff1pkl", "computed_data/race.pkl"]}
+
+    moves = offline_cache._unpack_destinations(manifest, tmp, cache_dir)
+
+    assert moves == [
+        (os.path.join(tmp, "fastf1-cache/2025/race/car_data.ff1pkl"),
+         os.path.join(cache_dir, "2025", "race", "car_data.ff1pkl")),
+        (os.path.join(tmp, "computed_data/race.pkl"), os.path.join(offline_cache.ROOT, "computed_data/race.pkl")),
+    ]
+
+
+@pytest.mark.parametrize("arcname", [
+    "fastf1-cache/../escape.ff1pkl",
+    "computed_data/../main.py",
+    "main.py",
+    "computed_data",
+])
+def test_unpack_destinations_rejects_entries_outside_the_targets(tmp_path, arcname):
+    tmp = _tmp_with_files(tmp_path, "computed_data/race.pkl")
+    # The source file is in the archive, so only the destination check can reject it
+    src = os.path.normpath(os.path.join(tmp, arcname))
+    if not os.path.isdir(src):
+        with open(src, "wb") as f:
+            f.write(b"data")
+
+    with pytest.raises(ValueError):
+        offline_cache._unpack_destinations({"files": [arcname]}, tmp, str(tmp_path / "cache"))
+
+
+@pytest.mark.parametrize("arcname", ["computed_data/missing.pkl", "/etc/passwd", "computed_data/../../../etc/passwd"])
+def test_unpack_destinations_rejects_entries_not_in_the_archive(tmp_path, arcname):
+    tmp = _tmp_with_files(tmp_path, "computed_data/race.pkl")
+
+    with pytest.raises(ValueError):
+        offline_cache._unpack_destinations({"files": [arcname]}, tmp, str(tmp_path / "cache"))
+
+
+def test_unpack_destinations_rejects_symlinks_out_of_the_archive(tmp_path):
+    tmp = _tmp_with_files(tmp_path, "computed_data/race.pkl")
+    (tmp_path / "secret").write_bytes(b"secret")
+    os.symlink(tmp_path / "secret", os.path.join(tmp, "computed_data", "link.pkl"))
+
+    with pytest.raises(ValueError):
+        offline_cache._unpack_destinations({"files": ["computed_data/link.pkl"]}, tmp, str(tmp_path / "cache"))
+
+
+@pytest.mark.parametrize("data_filter", [True, False])
+@pytest.mark.parametrize("member", [("../escape.pkl", b"data"), ("computed_data/link", None)])
+def test_extract_rejects_unsafe_members(tmp_path, monkeypatch, data_filter, member):
+    if not data_filter:
+        # Pythons before 3.11.4 have no extraction filters
+        monkeypatch.delattr(tarfile, "data_filter", raising=False)
+    elif not hasattr(tarfile, "data_filter"):
+        pytest.skip("tarfile has no extraction filters")
+    archive = _archive(tmp_path / "bad.tar.gz", [member])
+    out = tmp_path / "out"
+    out.mkdir()
+
+    with pytest.raises((tarfile.TarError, ValueError)):
+        offline_cache._extract(archive, str(out))
+    assert not (tmp_path / "escape.pkl").exists()
+
+
+@pytest.mark.parametrize("manifest", [None, [], {"files": "computed_data/race.pkl"}, {"files": [1]}])
+def test_unpack_refuses_bad_manifests(tmp_path, capsys, manifest):
+    members = [("computed_data/race.pkl", b"data")]
+    if manifest is None:
+        archive = _archive(tmp_path / "bad.tar.gz", members)
+    else:
+        archive = _archive(tmp_path / "bad.tar.gz", members, manifest=manifest)
+
+    assert offline_cache.unpack(archive, str(tmp_path / "cache")) == 1
+    assert "Not unpacking" in capsys.readouterr().out
+    assert not (tmp_path / "cache").exists()
+
+
+def test_unpack_refuses_the_whole_archive_for_one_bad_entry(tmp_path, capsys):
+    cache_dir = tmp_path / "cache"
+    archive = _archive(tmp_path / "bad.tar.gz",
+                       [("fastf1-cache/2025/car_data.ff1pkl", b"data"), ("fastf1-cache/../../escape", b"data")],
+                       manifest={"files": ["fastf1-cache/2025/car_data.ff1pkl", "fastf1-cache/../../escape"]})
+
+    assert offline_cache.unpack(archive, str(cache_dir)) == 1
+    # Nothing is moved before every entry is checked
+    assert not cache_dir.exists()
+
+
+def test_unpack_moves_cache_files(tmp_path, capsys):
+    cache_dir = tmp_path / "cache"
+    archive = _archive(tmp_path / "good.tar.gz", [("fastf1-cache/2025/car_data.ff1pkl", b"data")],
+                       manifest={"files": ["fastf1-cache/2025/car_data.ff1pkl"], "sessions": ["2025 R1"]})
+
+    assert offline_cache.unpack(archive, str(cache_dir)) == 0
+    assert (cache_dir / "2025" / "car_data.ff1pkl").read_bytes() == b"data"
+    assert "Unpacked 1 files for 2025 R1" in capsys.readouterr().out
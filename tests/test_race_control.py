@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.lib.race_control import active_messages, build_race_control, message_range
+
+T0 = pd.Timestamp("2025-07-06 13:00:00")
+
+
+class Session:
+    t0_date = T0
+
+    def __init__(self, messages):
+        self.race_control_messages = messages
+
+
+def messages():
+    at = lambda seconds: T0 + pd.Timedelta(seconds=seconds)
+    return pd.DataFrame({
+        "Time": [at(200), at(100), at(150), pd.NaT],
+        "Category": ["Flag", "Other", "CarEvent", "Flag"],
+        "Message": ["YELLOW IN TRACK SECTOR 3", "DRS ENABLED", "CAR 4 (NOR) TIME PENALTY", "LOST"],
+        "Flag": ["YELLOW", None, None, "GREEN"],
+        "Scope": ["Sector", None, "Driver", "Track"],
+        "Sector": [3.0, np.nan, np.nan, np.nan],
+        "RacingNumber": [None, None, "4", None],
+        "Lap": [5, 3, 4, 6],
+    })
+
+
+def test_messages_are_sorted_on_the_replay_timeline():
+    race_control = build_race_control(Session(messages()), 50.0, {"1": "VER", "4": "NOR"})
+
+    np.testing.assert_array_equal(race_control["t"], [50.0, 100.0, 150.0])
+    assert race_control["message"] == ["DRS ENABLED", "CAR 4 (NOR) TIME PENALTY", "YELLOW IN TRACK SECTOR 3"]
+    assert race_control["driver"] == ["", "NOR", ""]
+    assert race_control["flag"] == ["", "", "YELLOW"]
+    assert race_control["sector"].tolist() == [-1, -1, 3]
+    assert race_control["lap"].tolist() == [3, 4, 5]
+
+
+def test_missing_messages_give_an_empty_timeline():
+    for session in (Session(None), Session(pd.DataFrame())):
+        race_control = build_race_control(session, 0.0, {})
+        assert len(race_control["t"]) == 0 and race_control["message"] == []
+        assert active_messages(race_control, 100.0) == []
+
+
+def test_active_messages():
+    race_control = build_race_control(Session(messages()), 50.0, {"4": "NOR"})
+
+    assert message_range(race_control, 49.9) == (0, 0)
+    assert message_range(race_control, 50.0) == (0, 1)
+    assert message_range(race_control, 100.0) == (1, 2)
+    # Shown for MESSAGE_DISPLAY_S (20 s) after they are issued
+    assert message_range(race_control, 119.9) == (1, 2)
+    assert message_range(race_control, 120.0) == (2, 2)
+    assert [m["message"] for m in active_messages(race_control, 155.0, display_s=60.0)] == \
+        ["YELLOW IN TRACK SECTOR 3", "CAR 4 (NOR) TIME PENALTY"]
+    assert [m["t"] for m in active_messages(race_control, 155.0, display_s=200.0, limit=1)] == [150.0]
+    assert active_messages(race_control, 155.0)[0] == {
+        "t": 150.0, "lap": 5, "sector": 3, "driver": "", "category": "Flag", "flag": "YELLOW",
+        "scope": "Sector", "message": "YELLOW IN TRACK SECTOR 3"}
+
+
+def test_import_does_not_load_pandas():
+    code = "import sys; import src.lib.race_control; print('pandas' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.strip() == "False"
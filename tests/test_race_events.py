@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from src.lib.race_events import (
+    FPS, MIN_HOLD_FRAMES, build_race_order, extend_race_order, extract_race_events, race_order_from_frames,
+    race_positions,
+)
+
+DRIVERS = ["AAA", "BBB", "CCC"]
+LAP_LENGTH = 1000.0
+
+
+def race(seconds=120):
+    """
+    (lap, dist, tyre) of a race of three cars: AAA starts 100.5 m ahead (no ties) at 40 m/s, BBB from the
+    line at 60 m/s, CCC 50 m ahead at 45 m/s until it stops for good at 30 s. AAA changes tyres at 70 s.
+    """
+    t = np.arange(seconds * FPS) / FPS
+    total = np.column_stack([100.5 + 40 * t, 60 * t, 50 + 45 * np.minimum(t, 30)])
+    tyre = np.zeros_like(total)
+    tyre[t >= 70, 0] = 2
+    return total // LAP_LENGTH + 1, total % LAP_LENGTH, tyre
+
+
+def frames_of(lap, dist, tyre):
+    """Frames with the layout of the race cache for the same cars."""
+    frames = []
+    for i in range(len(lap)):
+        cars = sorted(range(len(DRIVERS)), key=lambda j: (lap[i, j], dist[i, j]), reverse=True)
+        frames.append({"t": i / FPS, "lap": int(lap[i, cars[0]]), "drivers": {
+            DRIVERS[j]: {"lap": int(lap[i, j]), "dist": float(dist[i, j]), "tyre": float(tyre[i, j]),
+                         "position": p + 1} for p, j in enumerate(cars)}})
+    return frames
+
+
+def test_race_order_matches_the_frames():
+    lap, dist, tyre = race(20)
+    race_order = build_race_order(DRIVERS, lap, dist, tyre)
+    frames = frames_of(lap, dist, tyre)
+
+    positions = race_positions(race_order)
+    assert positions.tolist() == [[frame["drivers"][code]["position"] for code in DRIVERS] for frame in frames]
+    assert race_order["lap"].tolist() == lap.astype(int).tolist()
+
+    from_frames = race_order_from_frames(frames)
+    # Frames list the cars in position order; the matrices follow their own driver order
+    assert sorted(from_frames["drivers"]) == DRIVERS
+    columns = [from_frames["drivers"].index(code) for code in DRIVERS]
+    np.testing.assert_array_equal(race_positions(from_frames)[:, columns], positions)
+
+
+def test_extending_the_race_order_equals_building_it_at_once():
+    lap, dist, tyre = race()
+    whole = build_race_order(DRIVERS, lap, dist, tyre)
+
+    parts = build_race_order(DRIVERS, lap[:1000], dist[:1000], tyre[:1000])
+    parts = extend_race_order(parts, lap[1000:1001], dist[1000:1001], tyre[1000:1001])
+    parts = extend_race_order(parts, lap[1001:], dist[1001:], tyre[1001:])
+
+    for name in ("order", "lap", "last_moving", "last_key", "last_tyre"):
+        np.testing.assert_array_equal(parts[name], whole[name])
+    assert all(np.array_equal(parts["pit_frames"][code], whole["pit_frames"][code]) for code in DRIVERS)
+
+
+def test_race_events():
+    lap, dist, tyre = race()
+    race_order = build_race_order(DRIVERS, lap, dist, tyre)
+    track_statuses = [{"status": "1", "start_time": 0.0, "end_time": 40.0},
+                      {"status": "4", "start_time": 40.0, "end_time": 60.0}]
+
+    events = extract_race_events([], track_statuses, 8, race_order=race_order)
+
+    assert [(event["type"], event["frame"], event["label"]) for event in events] == [
+        ("overtake", 84, "BBB passes CCC for P2"),
+        ("leader_change", 126, "BBB takes the lead from AAA"),
+        ("overtake", 126, "BBB passes AAA for P1"),
+        ("overtake", 253, "CCC passes AAA for P2"),
+        # AAA passing the stopped CCC later is not an overtake
+        ("dnf", 751, "CCC"),
+        ("fastest_lap", 834, "BBB 00:16.680"),
+        ("safety_car", 1000, ""),
+        ("pit_stop", 1750, "AAA"),
+        # Laps overlapping the safety car don't count
+        ("fastest_lap", 2500, "BBB 00:16.640"),
+    ]
+    assert events[6]["end_frame"] == 1500
+
+
+def test_events_from_frames_match_events_from_the_race_order():
+    lap, dist, tyre = race()
+    expected = extract_race_events([], [], 8, race_order=build_race_order(DRIVERS, lap, dist, tyre))
+
+    events = extract_race_events(frames_of(lap, dist, tyre), [], 8)
+
+    assert [(event["type"], event["frame"], event["label"]) for event in events] == \
+        [(event["type"], event["frame"], event["label"]) for event in expected]
+
+
+@pytest.mark.parametrize("swap_frames, overtakes", [(MIN_HOLD_FRAMES - 1, 0), (MIN_HOLD_FRAMES + 1, 2)])
+def test_short_swaps_are_not_overtakes(swap_frames, overtakes):
+    # Two cars side by side: BBB is ahead of AAA only for swap_frames frames
+    n = 20 * FPS
+    dist = np.column_stack([np.arange(n) * 2.0 + 1, np.arange(n) * 2.0])
+    dist[5 * FPS:5 * FPS + swap_frames, 1] += 2
+    race_order = build_race_order(DRIVERS[:2], np.ones((n, 2)), dist)
+
+    events = extract_race_events([], [], 1, race_order=race_order)
+
+    assert sum(event["type"] == "overtake" for event in events) == overtakes
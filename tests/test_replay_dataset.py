@@ -0,0 +1,107 @@
+import glob
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from src.lib.export import EXPORT_CHANNELS, chunk_columns, export_replay
+from src.lib.frame_store import FrameChunkWriter
+from src.replay_dataset import ReplayDataset
+
+
+def assert_columns_equal(actual, expected):
+    assert actual.keys() == expected.keys()
+    for name in expected:
+        if isinstance(expected[name], np.ndarray):
+            assert actual[name].dtype == expected[name].dtype, name
+            np.testing.assert_array_equal(actual[name], expected[name], err_msg=name)
+        else:
+            assert actual[name] == expected[name], name
+
+
+def frame_dict_columns(frames, first, stop, drivers, channels):
+    columns = chunk_columns([frames[i] for i in range(first, stop)], drivers, channels)
+    columns["frame"] = np.arange(first, stop)
+    columns["drivers"] = drivers
+    return columns
+
+
+@pytest.fixture
+def legacy_cache(race_cache, tmp_path):
+    """Copy of the race cache without column files, as written before they existed."""
+    path = str(tmp_path / os.path.basename(race_cache))
+    shutil.copy(race_cache, path)
+    chunk_dir = glob.glob(os.path.splitext(race_cache)[0] + "_frames_*")[0]
+    shutil.copytree(chunk_dir, str(tmp_path / os.path.basename(chunk_dir)),
+                    ignore=shutil.ignore_patterns("column_*"))
+    return path
+
+
+def test_cache_has_column_files(race_cache):
+    ds = ReplayDataset(race_cache)
+    columns = ds.frames.columns()
+
+    assert sorted(columns["drivers"]) == ["LEC", "NOR", "PIA", "VER"]
+    assert columns["t"].shape == (ds.n_frames,)
+    for channel, dtype in EXPORT_CHANNELS.items():
+        assert columns[channel].shape == (ds.n_frames, 4) and columns[channel].dtype == dtype
+
+
+def test_full_slice_matches_the_frames(race_cache):
+    ds = ReplayDataset(race_cache)
+    drivers = ["LEC", "VER", "HAM", "NOR", "PIA"]
+
+    assert_columns_equal(ds.slice(drivers), frame_dict_columns(ds.frames, 0, ds.n_frames, drivers, ds.channels))
+
+
+@pytest.mark.parametrize("bounds", [{"from_lap": 2, "to_lap": 2}, {"start": 75.3, "end": 130.0}, {"to_lap": 0},
+                                    {"from_lap": 99}])
+def test_slice_bounds_match_the_frames_with_and_without_column_files(race_cache, legacy_cache, bounds):
+    ds, legacy = ReplayDataset(race_cache), ReplayDataset(legacy_cache)
+    assert legacy.frames.columns() is None
+
+    block = ds.slice(["NOR", "VER"], ["x", "position", "rel_dist"], **bounds)
+    first = block["frame"][0] if len(block["frame"]) else 0
+    expected = frame_dict_columns(ds.frames, first, first + len(block["t"]), ["NOR", "VER"], ["x", "position", "rel_dist"])
+    assert_columns_equal(block, expected)
+    assert_columns_equal(legacy.slice(["NOR", "VER"], ["x", "position", "rel_dist"], **bounds), block)
+    if "from_lap" in bounds and len(block["t"]):
+        assert block["leader_lap"].min() >= bounds["from_lap"]
+
+
+def test_channel_state_at_and_unknown_channels(race_cache):
+    ds = ReplayDataset(race_cache)
+    np.testing.assert_array_equal(ds.channel("speed", ["VER"], from_lap=1, to_lap=1),
+                                  ds.slice(["VER"], ["speed"], from_lap=1, to_lap=1)["speed"])
+
+    t = ds.duration / 2
+    state = ds.state_at(t)
+    frame = ds.frames[state["frame"]]
+    assert frame["t"] <= t < ds.frames[state["frame"] + 1]["t"]
+    assert state["position"].tolist() == [frame["drivers"][code]["position"] for code in state["drivers"]]
+
+    with pytest.raises(ValueError, match="wind"):
+        ds.slice(channels=["wind"])
+
+
+def test_export_reads_the_column_files(race_cache, legacy_cache, tmp_path):
+    exported = []
+    for name, path in (("columns", race_cache), ("legacy", legacy_cache)):
+        out = str(tmp_path / f"{name}.npz")
+        export_replay(ReplayDataset(path).data, out, "npz", drivers=["PIA", "XXX"], from_lap=2)
+        with np.load(out) as npz:
+            exported.append({key: npz[key] for key in npz.files})
+
+    assert_columns_equal(*exported)
+    assert np.isnan(exported[0]["x"][:, 1]).all()
+
+
+def test_writer_checks_the_number_of_column_frames(tmp_path):
+    writer = FrameChunkWriter(str(tmp_path / "race_frames_1"), n_frames=3, drivers=["VER"])
+    writer.add_chunk([{"t": 0.0, "lap": 1, "drivers": {}}] * 2,
+                     {"t": np.zeros(2), "x": np.zeros((2, 1))})
+
+    with pytest.raises(ValueError):
+        writer.finish()
+    writer.abort()
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from src.lib.laps import LAP_FIELDS, _empty_column
+from src.lib.sectors import (
+    MINIS, SECTORS, STATUS_NONE, STATUS_OVERALL_BEST, STATUS_PERSONAL_BEST, STATUS_SLOWER, build_sector_timing,
+    sector_status_at,
+)
+
+FPS = 25
+LAP_LENGTH = 1000.0
+
+
+def race(seconds=80.0):
+    """
+    Timeline, lap and dist of two cars on a 1 km lap: AAA at 50 m/s (20 s laps) except at
+    25 m/s from 26 s to 33 s (its second lap's middle third), BBB at 40 m/s (25 s laps).
+    """
+    timeline = np.arange(int(seconds * FPS)) / FPS
+    speed_a = np.where((timeline >= 26.0) & (timeline < 33.0), 25.0, 50.0)
+    total = np.column_stack([np.concatenate([[0.0], np.cumsum(speed_a[:-1]) / FPS]), 40.0 * timeline])
+    return timeline, total // LAP_LENGTH + 1, total % LAP_LENGTH
+
+
+def lap_table(sector1, sector2, laps=4):
+    """Lap table of AAA with 20 s laps and sector 1 and 2 times on lap 1."""
+    columns = {name: _empty_column(dtype, laps + 1) for name, dtype in LAP_FIELDS.items()}
+    columns["lap_start"][1:] = np.arange(laps) * 20.0
+    # AAA's slow stretch moves the sector ends of the later laps
+    columns["sector1"][1] = sector1
+    columns["sector2"][1] = sector2
+    return {"fields": list(LAP_FIELDS), "drivers": {"AAA": columns}}
+
+
+def test_crossings_and_times():
+    timeline, lap, dist = race()
+    timing = build_sector_timing(["AAA", "BBB"], timeline, lap, dist, None, FPS)
+
+    # Without sector times from the lap table, sectors are equal thirds
+    np.testing.assert_allclose(timing["sector_bounds"], [0, 1 / 3, 2 / 3, 1], atol=1e-6)
+    # Both cars reach lap 4
+    assert timing["crossings"].shape == (2, 5, MINIS + 1)
+    assert timing["sector_times"].shape == (2, 5, SECTORS)
+    assert np.isnan(timing["crossings"][:, 0]).all()
+
+    # BBB crosses every boundary at a constant 40 m/s. The start of lap 1 is its first sample,
+    # so no crossing is known there
+    expected = (np.arange(1, 5)[:, None] - 1 + timing["mini_bounds"][None, :]) * 25.0
+    expected[0, 0] = np.nan
+    np.testing.assert_allclose(timing["crossings"][1, 1:], np.where(expected < 80.0 - 1 / FPS, expected, np.nan),
+                               atol=1 / FPS)
+    np.testing.assert_allclose(timing["sector_times"][1, 2], [25 / 3] * 3, atol=1 / FPS)
+    np.testing.assert_allclose(timing["sector_times"][0, 3], [20 / 3] * 3, atol=1 / FPS)
+    # AAA's slow stretch makes its second lap's sector 2 longer
+    assert timing["sector_times"][0, 2, 1] > 20 / 3 + 2
+    np.testing.assert_allclose(timing["mini_times"][0, 3].sum(), 20.0, atol=1 / FPS)
+
+
+def test_sector_status():
+    timeline, lap, dist = race()
+    timing = build_sector_timing(["AAA", "BBB"], timeline, lap, dist, None, FPS)
+
+    # AAA sets the fastest sectors on lap 1, BBB only its own best times. The first timed
+    # sector is sector 2: lap 1 starts at the first sample
+    first_sector_end = int(np.ceil(timing["crossings"][0, 1, 2 * MINIS // SECTORS] * FPS))
+    assert sector_status_at(timing, first_sector_end - 1) == {"AAA": STATUS_NONE, "BBB": STATUS_NONE}
+    assert sector_status_at(timing, first_sector_end)["AAA"] == STATUS_OVERALL_BEST
+    assert sector_status_at(timing, 30 * FPS)["BBB"] == STATUS_PERSONAL_BEST
+
+    # AAA's slow second sector of lap 2 is slower than its lap 1
+    slow_sector_end = int(np.ceil(timing["crossings"][0, 2, 2 * MINIS // SECTORS] * FPS))
+    assert timing["sector_status"][slow_sector_end, 0] == STATUS_SLOWER
+    # The status holds until the next sector ends
+    assert (timing["sector_status"][slow_sector_end:slow_sector_end + 3 * FPS, 0] == STATUS_SLOWER).all()
+    # Frames are clamped to the race
+    assert sector_status_at(timing, 10 ** 6) == sector_status_at(timing, len(timeline) - 1)
+    assert sector_status_at(None, 0) == {}
+
+
+def test_sector_bounds_from_the_lap_table():
+    timeline, lap, dist = race()
+
+    timing = build_sector_timing(["AAA", "BBB"], timeline, lap, dist, lap_table(5.0, 7.0), FPS)
+
+    # Sectors 2 and 3 start where AAA is when its sector 1 and 1 + 2 times run out (lap 1)
+    assert timing["sector_bounds"][1] == pytest.approx(0.25, abs=0.01)
+    assert timing["sector_bounds"][2] == pytest.approx(0.6, abs=0.01)
+    assert timing["mini_bounds"][MINIS // SECTORS] == timing["sector_bounds"][1]
+
+
+def test_sector_bounds_fall_back_to_thirds_for_inconsistent_sector_times():
+    timeline, lap, dist = race()
+
+    timing = build_sector_timing(["AAA", "BBB"], timeline, lap, dist, lap_table(15.0, -10.0), FPS)
+
+    np.testing.assert_allclose(timing["sector_bounds"], [0, 1 / 3, 2 / 3, 1], atol=1e-6)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from benchmarks.synthetic_session import make_session
+from src.f1_data import LOAD_PROFILES
+from src.lib import snapshot
+
+
+def _missing_as_nan(df):
+    """The snapshot stores missing values of object columns (None or NaN) as NaN."""
+    df = pd.DataFrame(df).copy()
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].where(df[column].notna(), np.nan)
+    return df
+
+
+def test_table_round_trip_keeps_values_and_dtypes(tmp_path):
+    df = pd.DataFrame({
+        "float": [1.5, np.nan, 3.0],
+        "int": np.array([1, 2, 3], dtype=np.int64),
+        "text": ["VER", None, "NOR"],
+        "nullable_int": pd.array([1, None, 3], dtype="Int64"),
+        "nullable_bool": pd.array([True, None, False], dtype="boolean"),
+        "category": pd.Categorical(["SOFT", "HARD", "SOFT"]),
+        "timedelta": pd.to_timedelta([1.0, 2.5, np.nan], unit="s"),
+        "datetime": pd.to_datetime(["2025-07-06 14:00", None, "2025-07-06 15:00"]),
+        "datetime_tz": pd.to_datetime(["2025-07-06 14:00", "2025-07-06 14:30", None]).tz_localize("UTC"),
+        "lists": [[1], [2, 3], []],
+    }, index=pd.Index([10, 11, 12], name="row"))
+    path = str(tmp_path / "table.npz")
+
+    dtypes = snapshot._save_table(df, path)
+
+    tm.assert_frame_equal(snapshot._load_table(path, dtypes), _missing_as_nan(df))
+
+
+def test_session_snapshot_round_trip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    parts = LOAD_PROFILES["race"]
+    session = make_session('R', n_drivers=3, n_laps=2, lap_s=60.0)
+    snapshot.save_session_snapshot(session, parts)
+
+    # A session of the same event with other data, as before session.load
+    restored = make_session('R', n_drivers=3, n_laps=2, lap_s=60.0, seed=1)
+    assert snapshot.restore_session_snapshot(restored, parts) == parts
+
+    tm.assert_frame_equal(pd.DataFrame(restored.laps), _missing_as_nan(session.laps))
+    tm.assert_frame_equal(pd.DataFrame(restored.results), pd.DataFrame(session.results))
+    tm.assert_frame_equal(restored.track_status, session.track_status)
+    tm.assert_frame_equal(restored.race_control_messages, _missing_as_nan(session.race_control_messages))
+    assert restored.total_laps == session.total_laps
+    for driver in session.car_data:
+        tm.assert_frame_equal(pd.DataFrame(restored.car_data[driver]), pd.DataFrame(session.car_data[driver]))
+        tm.assert_frame_equal(pd.DataFrame(restored.pos_data[driver]), pd.DataFrame(session.pos_data[driver]))
+
+
+@pytest.mark.parametrize("change", ["version", "missing_part"])
+def test_snapshot_is_not_restored_when_stale_or_incomplete(tmp_path, monkeypatch, change):
+    monkeypatch.chdir(tmp_path)
+    session = make_session('R', n_drivers=2, n_laps=1, lap_s=60.0)
+    parts = dict(LOAD_PROFILES["layout"])
+    snapshot.save_session_snapshot(session, parts)
+    if change == "version":
+        monkeypatch.setattr(snapshot, "SNAPSHOT_VERSION", snapshot.SNAPSHOT_VERSION + 1)
+    else:
+        # The race profile also needs weather and messages, which this snapshot doesn't have
+        parts = LOAD_PROFILES["race"]
+
+    assert snapshot.restore_session_snapshot(make_session('R', n_drivers=2, n_laps=1, lap_s=60.0), parts) is None
@@ -0,0 +1,77 @@
+"""
+Streaming export of race replay data to CSV, NPZ or Arrow IPC.
+
+Reads a race or sprint replay cache from computed_data (built by running the replay once, or by
+`python main.py ... --refresh-data`) and writes the selected drivers, channels and time range.
+Frames are read and written one chunk at a time, so memory use doesn't grow with the length of
+the race. Arrow IPC needs pyarrow.
+
+Usage:
+    python tools/export_replay.py 2025:12 -o silverstone.csv
+    python tools/export_replay.py 2025:12:S --format npz -o sprint.npz --drivers VER NOR --channels x y speed
+    python tools/export_replay.py --cache computed_data/<name>_race_telemetry.pkl --format arrow \\
+        --from-lap 10 --to-lap 20 -o laps_10_20.arrow
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from src.lib.export import EXPORT_CHANNELS, EXPORT_FORMATS, export_replay
+from src.lib.frame_store import load_replay_cache
+
+def parse_session_spec(spec):
+    parts = spec.split(":")
+    if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] not in ('R', 'S')):
+        raise argparse.ArgumentTypeError(f"Invalid session '{spec}', expected YEAR:ROUND[:R|S]")
+    return int(parts[0]), int(parts[1]), parts[2] if len(parts) == 3 else 'R'
+
+def resolve_cache_path(spec):
+    from src.f1_data import enable_cache, get_session, get_telemetry_cache_path
+
+    enable_cache()
+    year, round_number, session_type = spec
+    return get_telemetry_cache_path(get_session(year, round_number, session_type), session_type)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export race replay data to CSV, NPZ or Arrow IPC")
+    parser.add_argument("session", nargs="?", type=parse_session_spec, help="YEAR:ROUND[:R|S]")
+    parser.add_argument("--cache", help="path of a race replay cache file (instead of a session)")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--format", choices=EXPORT_FORMATS,
+                        help="output format (default: from the output file extension, else csv)")
+    parser.add_argument("--drivers", nargs="+", help="driver codes (default: all)")
+    parser.add_argument("--channels", nargs="+", choices=list(EXPORT_CHANNELS), help="default: all")
+    parser.add_argument("--start", type=float, help="start of the time range, in replay seconds")
+    parser.add_argument("--end", type=float, help="end of the time range, in replay seconds")
+    parser.add_argument("--from-lap", type=int, help="first leader lap")
+    parser.add_argument("--to-lap", type=int, help="last leader lap (included)")
+    args = parser.parse_args()
+
+    if not args.cache and not args.session:
+        parser.error("give a session (YEAR:ROUND[:R|S]) or --cache")
+    cache_path = args.cache or resolve_cache_path(args.session)
+    if not os.path.exists(cache_path):
+        sys.exit(f"No replay cache at {cache_path}; run the replay of this session once first")
+
+    fmt = args.format
+    if fmt is None:
+        ext = os.path.splitext(args.output)[1].lstrip(".").lower()
+        fmt = {"npz": "npz", "arrow": "arrow", "feather": "arrow", "ipc": "arrow"}.get(ext, "csv")
+
+    data = load_replay_cache(cache_path)
+
+    start = time.perf_counter()
+    try:
+        n_frames = export_replay(data, args.output, fmt=fmt, drivers=args.drivers, channels=args.channels,
+                                 start_time=args.start, end_time=args.end,
+                                 from_lap=args.from_lap, to_lap=args.to_lap)
+    except (ValueError, RuntimeError) as e:
+        sys.exit(f"Export failed: {e}")
+    print(f"Exported {n_frames} frames to {args.output} ({fmt}) in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
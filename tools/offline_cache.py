@@ -0,0 +1,379 @@
+"""
+Offline FastF1 cache verifier and packager.
+
+For machines without internet access. Given a list of sessions (YEAR:ROUND[:TYPE], TYPE is
+R, S, Q or SQ and defaults to R), this tool:
+
+- verify: checks that every FastF1 cache entry those sessions need is present, and reports
+  which sessions also have their replay data precomputed in computed_data
+- pack:   writes a portable archive of those cache entries, a trimmed copy of FastF1's HTTP
+  cache (schedules, results, circuit info) and the matching computed_data files
+- unpack: extracts such an archive into the local cache directories, merging HTTP caches
+
+FastF1 runs in offline mode throughout, so no network requests are attempted.
+
+Usage:
+    python tools/offline_cache.py verify 2025:12 2025:12:Q --deep
+    python tools/offline_cache.py pack 2025:12 2025:12:Q -o silverstone_2025.tar.gz
+    python tools/offline_cache.py unpack silverstone_2025.tar.gz
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+from urllib.parse import urlparse
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from src.f1_data import LOAD_PROFILES, get_telemetry_cache_path, get_schedule_cache_path
+from src.lib.circuit import get_circuit_cache_path
+from src.lib.snapshot import get_snapshot_dir
+from src.lib.frame_store import find_chunk_dir
+
+HTTP_CACHE_NAME = "fastf1_http_cache.sqlite"
+MANIFEST_NAME = "manifest.json"
+
+# FastF1 API functions (one .ff1pkl each, under the session's api path) per session.load part.
+# Entries marked optional are loaded with soft failures by FastF1 and only produce a warning.
+FASTF1_CACHE_ENTRIES = {
+    "session": [("session_info", False), ("driver_info", False)],
+    "laps": [("_extended_timing_data", False), ("timing_app_data", False),
+             ("track_status_data", False), ("session_status_data", False), ("lap_count", True)],
+    "telemetry": [("car_data", False), ("position_data", False)],
+    "weather": [("weather_data", True)],
+    "messages": [("race_control_messages", True)],
+}
+
+def parse_session_spec(spec):
+    parts = spec.split(":")
+    if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] not in ('R', 'S', 'Q', 'SQ')):
+        raise argparse.ArgumentTypeError(f"Invalid session '{spec}', expected YEAR:ROUND[:R|S|Q|SQ]")
+    return int(parts[0]), int(parts[1]), parts[2] if len(parts) == 3 else 'R'
+
+def session_requirements(year, round_number, session_type):
+    """(year, round, type, load profile) of every FastF1 session a replay of this session loads."""
+    if session_type in ('Q', 'SQ'):
+        return [(year, round_number, session_type, "quali")]
+    # Races and sprints also load the qualifying session for the circuit layout
+    return [(year, round_number, session_type, "race"), (year, round_number, 'Q', "layout")]
+
+def enable_offline_cache(cache_dir):
+    import fastf1
+
+    os.makedirs(cache_dir, exist_ok=True)
+    fastf1.Cache.enable_cache(cache_dir)
+    fastf1.Cache.offline_mode(True)
+
+def required_cache_files(session, profile):
+    """[(path relative to the cache dir, optional)] of the .ff1pkl files a load profile needs."""
+    parts = ["session"] + [part for part, needed in LOAD_PROFILES[profile].items() if needed]
+    api_dir = session.api_path[len("/static/"):]
+    return [
+        (os.path.join(api_dir, f"{name}.ff1pkl"), optional)
+        for part in parts for name, optional in FASTF1_CACHE_ENTRIES[part]
+    ]
+
+def computed_files(session, session_type):
+    """Replay cache (and its frame chunks), circuit layout, schedule and session snapshot files of a session in computed_data."""
+    paths = [
+        get_telemetry_cache_path(session, session_type),
+        get_circuit_cache_path(session.event.year, session.event['Location']),
+        get_schedule_cache_path(session.event.year),
+    ]
+    # Only the chunk directory the replay cache references, not those of earlier builds
+    for directory in (get_snapshot_dir(session), find_chunk_dir(get_telemetry_cache_path(session, session_type))):
+        if directory and os.path.isdir(directory):
+            paths += [os.path.join(directory, name) for name in sorted(os.listdir(directory))]
+    return paths
+
+def deep_check(session, profile):
+    """Loads the session from the cache (offline) and returns a list of problems found."""
+    from src.f1_data import ensure_session_loaded
+
+    try:
+        ensure_session_loaded(session, profile)
+    except Exception as e:
+        return [f"offline load failed: {e}"]
+
+    problems = []
+    if session.results is None or session.results.empty:
+        problems.append("no session results")
+    if session.laps is None or session.laps.empty:
+        problems.append("no laps")
+    elif LOAD_PROFILES[profile]["telemetry"] and not session.car_data:
+        problems.append("no car data")
+    return problems
+
+def verify(specs, cache_dir, deep=False):
+    """
+    Checks the cache for every session. Returns (report, files) where files maps archive paths
+    to local paths of everything found, for packing.
+    """
+    import fastf1
+
+    report = []
+    files = {}
+    for year, round_number, session_type in specs:
+        entry = {"session": f"{year}:{round_number}:{session_type}", "missing": [], "warnings": [],
+                 "computed": []}
+        report.append(entry)
+
+        for req_year, req_round, req_type, profile in session_requirements(year, round_number, session_type):
+            try:
+                session = fastf1.get_session(req_year, req_round, req_type)
+            except Exception as e:
+                entry["missing"].append(f"{req_year} round {req_round} {req_type}: schedule not cached ({e})")
+                continue
+
+            for rel_path, optional in required_cache_files(session, profile):
+                path = os.path.join(cache_dir, rel_path)
+                if os.path.isfile(path) and os.path.getsize(path) > 0:
+                    files[os.path.join("fastf1-cache", rel_path)] = path
+                elif optional:
+                    entry["warnings"].append(f"{rel_path} (optional)")
+                else:
+                    entry["missing"].append(rel_path)
+
+            if deep:
+                entry["missing"] += [f"{session}: {p}" for p in deep_check(session, profile)]
+
+            if (req_year, req_round, req_type) == (year, round_number, session_type):
+                entry["name"] = str(session)
+                chunk_dir = find_chunk_dir(get_telemetry_cache_path(session, session_type))
+                for path in computed_files(session, session_type):
+                    if os.path.isfile(os.path.join(ROOT, path)):
+                        files[path] = os.path.join(ROOT, path)
+                        if os.path.dirname(path) == get_snapshot_dir(session):
+                            entry["snapshot"] = True
+                        elif chunk_dir and os.path.dirname(path) == chunk_dir:
+                            if os.path.basename(path).startswith("chunk_"):
+                                entry["frame_chunks"] = entry.get("frame_chunks", 0) + 1
+                        else:
+                            entry["computed"].append(path)
+            else:
+                # snapshot of the layout reference session
+                snapshot_dir = get_snapshot_dir(session)
+                if os.path.isdir(snapshot_dir):
+                    for name in sorted(os.listdir(snapshot_dir)):
+                        files[os.path.join(snapshot_dir, name)] = os.path.join(ROOT, snapshot_dir, name)
+
+        entry["ok"] = not entry["missing"]
+    return report, files
+
+def print_report(report):
+    for entry in report:
+        status = "OK" if entry["ok"] else "MISSING"
+        print(f"[{status}] {entry['session']} {entry.get('name', '')}")
+        for item in entry["missing"]:
+            print(f"    missing: {item}")
+        for item in entry["warnings"]:
+            print(f"    warning: {item}")
+        if entry["computed"]:
+            print(f"    precomputed: {', '.join(os.path.basename(p) for p in entry['computed'])}")
+        if entry.get("snapshot"):
+            print("    parsed session snapshot: yes")
+        if entry.get("frame_chunks"):
+            print(f"    frame chunks: {entry['frame_chunks']}")
+
+def _is_raw_session_data(url):
+    # Raw live timing streams of a session (/static/<year>/<event>/<session>/...) are already
+    # parsed into the .ff1pkl files, so they are left out of the packed HTTP cache
+    parsed = urlparse(url)
+    segments = [s for s in parsed.path.split("/") if s]
+    return parsed.netloc.startswith("livetiming") and len(segments) >= 5
+
+def trim_http_cache(src_path, dst_path):
+    """Copies the HTTP cache without raw session data. Returns the number of responses kept."""
+    from requests_cache import SQLiteCache
+
+    src = SQLiteCache(src_path)
+    dst = SQLiteCache(dst_path)
+    kept = 0
+    try:
+        for key, response in src.responses.items():
+            if not _is_raw_session_data(response.url):
+                dst.responses[key] = response
+                kept += 1
+        for key, value in src.redirects.items():
+            dst.redirects[key] = value
+    finally:
+        src.close()
+        dst.close()
+    return kept
+
+def merge_http_cache(src_path, dst_path):
+    from requests_cache import SQLiteCache
+
+    src = SQLiteCache(src_path)
+    dst = SQLiteCache(dst_path)
+    try:
+        for key, response in src.responses.items():
+            dst.responses[key] = response
+        for key, value in src.redirects.items():
+            dst.redirects[key] = value
+    finally:
+        src.close()
+        dst.close()
+
+def pack(specs, cache_dir, output, allow_missing=False, deep=False):
+    import fastf1
+
+    report, files = verify(specs, cache_dir, deep=deep)
+    print_report(report)
+    if not all(entry["ok"] for entry in report) and not allow_missing:
+        print("Not packing: cache entries are missing (use --allow-missing to pack anyway)")
+        return 1
+
+    manifest = {
+        "sessions": [entry["session"] for entry in report],
+        "fastf1_version": fastf1.__version__,
+        "files": sorted(files),
+    }
+    with tempfile.TemporaryDirectory() as tmp, tarfile.open(output, "w:gz", compresslevel=6) as tar:
+        http_cache = os.path.join(cache_dir, HTTP_CACHE_NAME)
+        if os.path.isfile(http_cache):
+            trimmed = os.path.join(tmp, HTTP_CACHE_NAME)
+            kept = trim_http_cache(http_cache, trimmed)
+            tar.add(trimmed, arcname=os.path.join("fastf1-cache", HTTP_CACHE_NAME))
+            print(f"HTTP cache: {kept} responses")
+        for arcname, path in sorted(files.items()):
+            tar.add(path, arcname=arcname)
+
+        manifest_path = os.path.join(tmp, MANIFEST_NAME)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        tar.add(manifest_path, arcname=MANIFEST_NAME)
+
+    print(f"Packed {len(files)} files into {output} ({os.path.getsize(output) / 1024 / 1024:.1f} MB)")
+    return 0
+
+def _is_within(path, directory):
+    """True if path resolves (symlinks included) to somewhere inside directory."""
+    path, directory = os.path.realpath(path), os.path.realpath(directory)
+    return path != directory and os.path.commonpath([path, directory]) == directory
+
+def _unpack_destinations(manifest, tmp, cache_dir):
+    """
+    (extracted file, destination) of every manifest entry. Raises ValueError for entries that
+    would be read from outside the extracted archive or written outside computed_data and the
+    FastF1 cache.
+    """
+    moves = []
+    for arcname in manifest["files"]:
+        src = os.path.join(tmp, arcname)
+        if arcname.startswith("fastf1-cache" + os.sep) or arcname.startswith("fastf1-cache/"):
+            base = cache_dir
+            dst = os.path.join(cache_dir, os.path.relpath(arcname, "fastf1-cache"))
+        else:
+            # pack only writes computed_data files besides the FastF1 cache
+            base = os.path.join(ROOT, "computed_data")
+            dst = os.path.join(ROOT, arcname)
+        if os.path.isabs(arcname) or not _is_within(src, tmp) or not os.path.isfile(src):
+            raise ValueError(f"Archive entry {arcname!r} is not a file of the archive")
+        if not _is_within(dst, base):
+            raise ValueError(f"Archive entry {arcname!r} would be written outside {base}")
+        moves.append((src, dst))
+    return moves
+
+def _checked_members(tar, tmp):
+    """
+    Members of an archive, for Pythons without tarfile's extraction filters (before 3.11.4).
+    Raises ValueError for anything the "data" filter would reject: links, devices, and paths
+    that leave tmp.
+    """
+    members = tar.getmembers()
+    for member in members:
+        if not (member.isfile() or member.isdir()):
+            raise ValueError(f"Archive member {member.name!r} is not a regular file or directory")
+        if os.path.isabs(member.name) or not _is_within(os.path.join(tmp, member.name), tmp):
+            raise ValueError(f"Archive member {member.name!r} would be extracted outside the archive")
+    return members
+
+def _extract(archive, tmp):
+    with tarfile.open(archive, "r:*") as tar:
+        if hasattr(tarfile, "data_filter"):
+            # The "data" filter rejects absolute paths, links out of tmp and device files
+            tar.extractall(tmp, filter="data")
+        else:
+            tar.extractall(tmp, members=_checked_members(tar, tmp))
+
+def _read_manifest(tmp):
+    with open(os.path.join(tmp, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("files"), list) \
+            or not all(isinstance(name, str) for name in manifest["files"]):
+        raise ValueError(f"{MANIFEST_NAME} has no list of files")
+    return manifest
+
+def unpack(archive, cache_dir):
+    with tempfile.TemporaryDirectory() as tmp:
+        # Every entry is checked before anything is moved, so a bad archive changes nothing
+        try:
+            _extract(archive, tmp)
+            manifest = _read_manifest(tmp)
+            moves = _unpack_destinations(manifest, tmp, cache_dir)
+        except (tarfile.TarError, OSError, ValueError) as e:
+            print(f"Not unpacking {archive}: {e}")
+            return 1
+
+        for src, dst in moves:
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.move(src, dst)
+
+        http_cache = os.path.join(tmp, "fastf1-cache", HTTP_CACHE_NAME)
+        if os.path.isfile(http_cache):
+            target = os.path.join(cache_dir, HTTP_CACHE_NAME)
+            os.makedirs(cache_dir, exist_ok=True)
+            if os.path.isfile(target):
+                merge_http_cache(http_cache, target)
+            else:
+                shutil.move(http_cache, target)
+
+    print(f"Unpacked {len(manifest['files'])} files for {', '.join(map(str, manifest.get('sessions', [])))}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify, pack and unpack offline FastF1 caches")
+    parser.add_argument("--cache-dir", default=os.path.join(ROOT, ".fastf1-cache"))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("verify", "pack"):
+        command = commands.add_parser(name)
+        command.add_argument("sessions", nargs="*", type=parse_session_spec, help="YEAR:ROUND[:R|S|Q|SQ]")
+        command.add_argument("--sessions-file", help="file with one session per line")
+        command.add_argument("--deep", action="store_true", help="also load every session from the cache")
+        if name == "pack":
+            command.add_argument("-o", "--output", default="f1_offline_cache.tar.gz")
+            command.add_argument("--allow-missing", action="store_true")
+
+    command = commands.add_parser("unpack")
+    command.add_argument("archive")
+
+    args = parser.parse_args()
+
+    if args.command == "unpack":
+        sys.exit(unpack(args.archive, args.cache_dir))
+
+    specs = list(args.sessions)
+    if args.sessions_file:
+        with open(args.sessions_file) as f:
+            specs += [parse_session_spec(line.strip()) for line in f if line.strip() and not line.startswith("#")]
+    if not specs:
+        parser.error("no sessions given")
+
+    # computed_data paths are relative to the repository root
+    os.chdir(ROOT)
+    enable_offline_cache(args.cache_dir)
+
+    if args.command == "verify":
+        report, _ = verify(specs, args.cache_dir, deep=args.deep)
+        print_report(report)
+        sys.exit(0 if all(entry["ok"] for entry in report) else 1)
+    sys.exit(pack(specs, args.cache_dir, args.output, allow_missing=args.allow_missing, deep=args.deep))
+
+if __name__ == "__main__":
+    main()